@@ -0,0 +1,163 @@
+﻿"""Seeded synthetic corpus: meeting memos, candidate decisions, decisions and answer messages.
+
+The same seed always yields the same corpus, so timings are comparable across runs.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Any
+
+SIZES: dict[str, dict[str, int]] = {
+    "small": {"blocks": 3, "candidates": 10, "answers": 3, "notes": 2},
+    "medium": {"blocks": 20, "candidates": 50, "answers": 7, "notes": 5},
+    "large": {"blocks": 100, "candidates": 200, "answers": 20, "notes": 10},
+}
+
+_TOPICS_JA = ["ベンダー選定", "採用計画", "価格改定", "リリース日程", "広告予算", "オフィス移転", "SaaS 更新", "品質基準"]
+_TOPICS_EN = ["vendor selection", "hiring plan", "pricing update", "release schedule", "ad budget", "office move", "saas renewal", "quality bar"]
+_OPTIONS = ["A案", "B案", "C案", "option A", "option B", "keep as is", "outsource", "in-house"]
+_CRITERIA = ["コスト", "スケジュール", "品質", "リスク", "cost", "schedule", "quality", "customer impact"]
+_PEOPLE = ["佐藤", "鈴木", "高橋", "田中", "alice", "bob", "carol"]
+_NOTES_JA = ["前回の議論を踏まえて再検討", "至急対応が必要", "予算は据え置き", "関係部署と調整中", "後で検討"]
+_NOTES_EN = ["follow up with finance", "urgent for the launch", "blocking the roadmap", "revisit later", "waiting on legal"]
+_STATUSES = ["NEEDS_INFO", "READY_TO_DECIDE", "REOPEN", "DECIDED"]
+_FIELDS = ["owner", "dueAt", "criteria", "options", "rationale", "assumptions", "reopenTriggers"]
+
+
+@dataclass
+class Corpus:
+    size: str
+    memo: str
+    titles: list[str]
+    candidates: list[dict[str, Any]]
+    decision: dict[str, Any]
+    answer_message: dict[str, Any]
+    text_message: dict[str, Any]
+
+
+def _date(rng: random.Random) -> str:
+    return f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _pick(rng: random.Random, items: list[str], k: int) -> list[str]:
+    return rng.sample(items, min(k, len(items)))
+
+
+def _block(rng: random.Random, idx: int, notes: int) -> tuple[str, list[str]]:
+    japanese = rng.random() < 0.5
+    topic = rng.choice(_TOPICS_JA if japanese else _TOPICS_EN)
+    title = f"{topic} {idx}"
+    lines = [f"決裁: {title}" if japanese else f"Decision: {title}"]
+    # leave some fields out so the gap questioner has work to do
+    if rng.random() < 0.8:
+        sep = "、" if japanese else ", "
+        lines.append(("選択肢: " if japanese else "options: ") + sep.join(_pick(rng, _OPTIONS, rng.randint(1, 3))))
+    if rng.random() < 0.7:
+        lines.append(("基準: " if japanese else "criteria: ") + ", ".join(_pick(rng, _CRITERIA, rng.randint(1, 3))))
+    if rng.random() < 0.6:
+        lines.append(("決裁者: " if japanese else "owner: ") + rng.choice(_PEOPLE))
+    if rng.random() < 0.6:
+        lines.append(("期限: " if japanese else "due: ") + _date(rng))
+    if rng.random() < 0.5:
+        lines.append(("理由+: " if japanese else "pros: ") + rng.choice(_NOTES_JA if japanese else _NOTES_EN))
+    if rng.random() < 0.3:
+        lines.append(("理由-: " if japanese else "cons: ") + rng.choice(_NOTES_JA if japanese else _NOTES_EN))
+    for _ in range(rng.randint(0, notes)):
+        lines.append(rng.choice(_NOTES_JA if japanese else _NOTES_EN))
+    return title, lines
+
+
+def make_memo(rng: random.Random, blocks: int, notes: int) -> tuple[str, list[str]]:
+    lines = ["定例会議メモ", "参加者: " + ", ".join(_pick(rng, _PEOPLE, 4)), ""]
+    titles: list[str] = []
+    for idx in range(blocks):
+        title, block_lines = _block(rng, idx, notes)
+        titles.append(title)
+        lines.extend(block_lines)
+        lines.append("")
+    return "\n".join(lines), titles
+
+
+def make_candidates(rng: random.Random, titles: list[str], count: int) -> list[dict[str, Any]]:
+    candidates = []
+    for idx in range(count):
+        # roughly a third of candidates match a memo title (exactly or loosely)
+        if titles and rng.random() < 0.33:
+            title = rng.choice(titles)
+            if rng.random() < 0.5:
+                title = title + " 再検討"
+        else:
+            title = f"{rng.choice(_TOPICS_JA + _TOPICS_EN)} backlog {idx}"
+        candidates.append({"decisionId": f"dcs_{idx:05d}", "title": title, "status": rng.choice(_STATUSES)})
+    return candidates
+
+
+def make_decision(rng: random.Random, decision_id: str = "dcs_bench") -> dict[str, Any]:
+    missing = _pick(rng, _FIELDS, rng.randint(1, 4))
+    return {
+        "decisionId": decision_id,
+        "projectId": "prj_bench",
+        "title": rng.choice(_TOPICS_JA + _TOPICS_EN),
+        "status": "NEEDS_INFO",
+        "owner": None if "owner" in missing else {"displayName": rng.choice(_PEOPLE)},
+        "dueAt": None if "dueAt" in missing else _date(rng) + "T00:00:00Z",
+        "priority": rng.choice(["LOW", "MEDIUM", "HIGH"]),
+        "options": [] if "options" in missing else [{"label": o} for o in _pick(rng, _OPTIONS, 2)],
+        "criteria": None if "criteria" in missing else _pick(rng, _CRITERIA, 2),
+        "completeness": {"score": 100 - 20 * len(missing), "missingFields": missing},
+    }
+
+
+def make_answer_message(rng: random.Random, answers: int) -> dict[str, Any]:
+    items = []
+    for idx in range(answers):
+        field = rng.choice(_FIELDS)
+        if field == "dueAt":
+            value: Any = _date(rng)
+        elif field in ("criteria", "options", "assumptions", "reopenTriggers"):
+            value = _pick(rng, _CRITERIA + _OPTIONS, rng.randint(1, 3))
+        else:
+            value = rng.choice(_PEOPLE + _NOTES_EN)
+        items.append({"qid": f"{field}:{idx}", "value": value})
+    return {
+        "messageId": "msg_answers",
+        "threadId": "thr_bench",
+        "senderType": "USER",
+        "format": "ANSWER_SET",
+        "content": "",
+        "metadata": {"answers": items},
+    }
+
+
+def make_text_message(rng: random.Random, lines: int) -> dict[str, Any]:
+    body = [
+        f"決裁者: {rng.choice(_PEOPLE)}",
+        f"期限は {_date(rng)} でお願いします",
+        "基準: " + "、".join(_pick(rng, _CRITERIA, 3)),
+        "選択肢: " + "、".join(_pick(rng, _OPTIONS, 2)),
+    ]
+    body.extend(rng.choice(_NOTES_JA + _NOTES_EN) for _ in range(max(0, lines - len(body))))
+    return {
+        "messageId": "msg_text",
+        "threadId": "thr_bench",
+        "senderType": "USER",
+        "format": "TEXT",
+        "content": "\n".join(body),
+    }
+
+
+def build_corpus(size: str, seed: int = 42) -> Corpus:
+    params = SIZES[size]
+    rng = random.Random(f"{seed}:{size}")
+    memo, titles = make_memo(rng, params["blocks"], params["notes"])
+    return Corpus(
+        size=size,
+        memo=memo,
+        titles=titles,
+        candidates=make_candidates(rng, titles, params["candidates"]),
+        decision=make_decision(rng),
+        answer_message=make_answer_message(rng, params["answers"]),
+        text_message=make_text_message(rng, params["answers"]),
+    )
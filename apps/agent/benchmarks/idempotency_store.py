@@ -0,0 +1,84 @@
+﻿"""Idempotency store benchmark.
+
+Usage: python -m benchmarks.idempotency_store [--sizes 100000,1000000] [--ops 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.utils.idempotency import MemoryIdempotencyBackend
+
+
+class FullScanStore:
+    """Previous implementation (full dict scan on every call), kept for comparison."""
+
+    def __init__(self, ttl_minutes: int = 120) -> None:
+        self._ttl = timedelta(minutes=ttl_minutes)
+        self._data: dict[str, datetime] = {}
+
+    def _cleanup(self, now: datetime) -> None:
+        expired = [k for k, v in self._data.items() if now - v > self._ttl]
+        for key in expired:
+            self._data.pop(key, None)
+
+    def seen(self, key: str) -> bool:
+        self._cleanup(datetime.now(timezone.utc))
+        return key in self._data
+
+    def mark(self, key: str) -> None:
+        now = datetime.now(timezone.utc)
+        self._cleanup(now)
+        self._data[key] = now
+
+
+class _BackendStore:
+    """seen/mark straight on the memory backend, without the store's async wrapper."""
+
+    def __init__(self, backend: MemoryIdempotencyBackend) -> None:
+        self.backend = backend
+
+    def seen(self, key: str) -> bool:
+        return self.backend.contains(key)
+
+    def mark(self, key: str) -> None:
+        self.backend.complete(key, None)
+
+
+def _bench(store, size: int, ops: int) -> float:
+    if isinstance(store, _BackendStore):
+        for i in range(size):
+            store.mark(f"prefill:{i}")
+    else:
+        stamp = datetime.now(timezone.utc)
+        for i in range(size):
+            store._data[f"prefill:{i}"] = stamp
+    started = time.perf_counter()
+    for i in range(ops):
+        key = f"op:{i}"
+        store.seen(key)
+        store.mark(key)
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--legacy-ops", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        store = _BackendStore(MemoryIdempotencyBackend(180 * 60.0, max_entries=size + args.ops))
+        per_op = _bench(store, size, args.ops)
+        print(f"ordered  size={size:>8} seen+mark={per_op:8.2f} us  stats={store.backend.stats()}")
+
+        legacy = FullScanStore(ttl_minutes=180)
+        per_op = _bench(legacy, size, args.legacy_ops)
+        print(f"fullscan size={size:>8} seen+mark={per_op:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+﻿"""Offline end-to-end load test: mock Kimeboard API + agent server + open-loop task driver.
+
+Usage:
+  python -m benchmarks.load --rate 20 --duration 30 \
+    --mix meeting_structurer=0.3,reply_integrator=0.5,draft_actions_skill=0.2 \
+    --duplicate-rate 0.1 --latency-ms 20 --error-rate 0.01 \
+    [--agent-env TASK_ASYNC_MODE=true] [--output load_results.json]
+
+Both servers run as local uvicorn subprocesses on free ports; nothing leaves the machine.
+Requests are sent at a fixed arrival rate regardless of response time, so queueing shows up
+in the latency percentiles instead of lowering the offered load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _parse_mix(raw: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for part in raw.split(","):
+        if "=" in part:
+            name, weight = part.split("=", 1)
+            mix[name.strip()] = float(weight)
+    return mix
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summary(latencies: list[float]) -> dict[str, float]:
+    return {
+        "count": len(latencies),
+        "p50Ms": round(_percentile(latencies, 50), 1),
+        "p95Ms": round(_percentile(latencies, 95), 1),
+        "p99Ms": round(_percentile(latencies, 99), 1),
+        "maxMs": round(max(latencies, default=0.0), 1),
+    }
+
+
+def _payload(workflow: str, rng: random.Random, seq: int) -> dict[str, Any]:
+    project_id = f"prj_{rng.randint(0, 4)}"
+    if workflow == "meeting_structurer":
+        return {"projectId": project_id, "meetingId": f"mtg_{seq}", "idempotencyKey": f"load-mtg-{seq}"}
+    if workflow == "reply_integrator":
+        return {
+            "projectId": project_id,
+            "decisionId": f"dcs_{seq % 50}",
+            "threadId": f"thr_{seq % 50}",
+            "messageId": f"msg_{seq}",
+            "idempotencyKey": f"load-msg-{seq}",
+        }
+    if workflow == "draft_actions_project":
+        return {"projectId": project_id, "idempotencyKey": f"load-prj-{seq}"}
+    return {"projectId": project_id, "decisionId": f"dcs_{seq}", "idempotencyKey": f"load-dcs-{seq}"}
+
+
+def _spawn(module_app: str, port: int, env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+async def drive(args: argparse.Namespace, agent_url: str, mock_url: str) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    mix = _parse_mix(args.mix)
+    workflows, weights = list(mix), list(mix.values())
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    sent: list[tuple[str, dict[str, Any]]] = []
+    duplicates = 0
+
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await client.post(f"{mock_url}/_reset")
+
+        async def _one(workflow: str, payload: dict[str, Any]) -> None:
+            started = time.perf_counter()
+            try:
+                resp = await client.post(f"{agent_url}/tasks/{workflow}", json=payload)
+                statuses[f"{workflow}:{resp.status_code}"] += 1
+            except httpx.HTTPError as exc:
+                statuses[f"{workflow}:{type(exc).__name__}"] += 1
+            latencies[workflow].append((time.perf_counter() - started) * 1000)
+
+        tasks: list[asyncio.Task] = []
+        total = int(args.rate * args.duration)
+        interval = 1.0 / args.rate
+        started = time.perf_counter()
+        for seq in range(total):
+            target = started + seq * interval
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if sent and rng.random() < args.duplicate_rate:
+                # redelivery of an earlier task, as Cloud Tasks does on retries
+                workflow, payload = rng.choice(sent[-50:])
+                duplicates += 1
+            else:
+                workflow = rng.choices(workflows, weights)[0]
+                payload = _payload(workflow, rng, seq)
+                sent.append((workflow, payload))
+            tasks.append(asyncio.create_task(_one(workflow, payload)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        # async mode answers 202 before callbacks land; give the workers a moment to finish
+        await asyncio.sleep(args.settle)
+        upstream = (await client.get(f"{mock_url}/_stats")).json()
+
+    everything = [v for values in latencies.values() for v in values]
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "requests": len(everything),
+        "duplicates": duplicates,
+        "elapsedSeconds": round(elapsed, 2),
+        "throughputRps": round(len(everything) / elapsed, 2) if elapsed else 0.0,
+        "latency": _summary(everything),
+        "latencyByWorkflow": {name: _summary(values) for name, values in latencies.items()},
+        "statuses": dict(statuses),
+        "upstream": upstream,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> dict[str, Any]:
+    mock_port, agent_port = _free_port(), _free_port()
+    mock_url, agent_url = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{agent_port}"
+    mock_env = {
+        "MOCK_LATENCY_MS": str(args.latency_ms),
+        "MOCK_JITTER_MS": str(args.jitter_ms),
+        "MOCK_ERROR_RATE": str(args.error_rate),
+        "MOCK_MEMO_BLOCKS": str(args.memo_blocks),
+        "MOCK_SEED": str(args.seed),
+    }
+    agent_env = {
+        "API_BASE_URL": mock_url,
+        "TASK_AUTH_MODE": "NONE",
+        "LOG_LEVEL": "WARNING",
+        **dict(item.split("=", 1) for item in args.agent_env),
+    }
+    procs = [_spawn("benchmarks.mock_api:app", mock_port, mock_env), _spawn("src.main:app", agent_port, agent_env)]
+    try:
+        async with httpx.AsyncClient() as probe:
+            await _wait_ready(probe, f"{mock_url}/api/healthz")
+            await _wait_ready(probe, f"{agent_url}/healthz")
+        return await drive(args, agent_url, mock_url)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=20.0, help="task requests per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", default="meeting_structurer=0.3,reply_integrator=0.5,draft_actions_skill=0.2")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--memo-blocks", type=int, default=10)
+    parser.add_argument("--max-outstanding", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--settle", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--agent-env", action="append", default=[], help="KEY=VALUE passed to the agent server")
+    parser.add_argument("--output", default="load_results.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(json.dumps({k: report[k] for k in ("requests", "throughputRps", "latency", "statuses")}, indent=2))
+    print(f"upstream calls={report['upstream']['totalCalls']} callbacks={report['upstream']['totalCallbacks']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+﻿"""Microbenchmarks for the workflow hot paths over the seeded corpus.
+
+Usage:
+  python -m benchmarks.micro [--sizes small,medium,large] [--output bench_results.json]
+  python -m benchmarks.micro --baseline benchmarks/baseline.json [--threshold 0.25]
+  python -m benchmarks.micro --update-baseline
+
+Each case reports the best per-call time over several repeats. With --baseline the run
+exits non-zero when a case is slower than baseline * (1 + threshold).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.corpus import SIZES, Corpus, build_corpus
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.agents.workflows.gap_questioner import generate_question_set
+from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
+from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow
+from src.config import Settings
+from src.models.schemas import (
+    Decision,
+    GetMeetingResponse,
+    ListDecisionsResponse,
+    MeetingStructurerCallback,
+    MeetingStructurerExtracted,
+    Message,
+)
+from src.observability.logger import get_logger
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def _cases(corpus: Corpus) -> dict[str, Callable[[], object]]:
+    settings = Settings()
+    logger = get_logger("bench")
+    structurer = MeetingStructurerWorkflow(None, settings, logger)
+    integrator = ReplyIntegratorWorkflow(None, settings, logger)
+    drafts = DraftActionsSkillWorkflow(None, settings, logger)
+
+    candidates = ListDecisionsResponse.model_validate({"decisions": corpus.candidates}).decisions
+    decision = Decision.model_validate(corpus.decision)
+    answer_message = Message.model_validate(corpus.answer_message)
+    text_message = Message.model_validate(corpus.text_message)
+    meeting_payload = {
+        "meeting": {
+            "meetingId": "mtg_bench",
+            "projectId": "prj_bench",
+            "title": "定例",
+            "status": "UPLOADED",
+            "raw": {"storage": "INLINE", "text": corpus.memo},
+        }
+    }
+    extracted = structurer._extract_from_text(corpus.memo, "定例", candidates)
+    callback = MeetingStructurerCallback(
+        projectId="prj_bench",
+        runId="run_bench",
+        kind="meeting_structurer",
+        status="SUCCEEDED",
+        meetingId="mtg_bench",
+        extracted=MeetingStructurerExtracted(
+            decisions=[item["decision"] for item in extracted],
+            questionSets=[q for q in (generate_question_set(item["decision_model"]) for item in extracted) if q],
+        ),
+    )
+    titles = corpus.titles
+
+    return {
+        "extract_blocks": lambda: structurer._extract_blocks(corpus.memo),
+        "match_existing_decision": lambda: [structurer._match_existing_decision(t, candidates) for t in titles],
+        "extract_from_text": lambda: structurer._extract_from_text(corpus.memo, "定例", candidates),
+        "generate_question_set": lambda: generate_question_set(decision),
+        "build_patch_answers": lambda: integrator._build_patch(decision, answer_message),
+        "build_patch_free_text": lambda: integrator._build_patch(decision, text_message),
+        "build_action_drafts": lambda: drafts._build_action_drafts(decision),
+        "validate_meeting": lambda: GetMeetingResponse.model_validate(meeting_payload),
+        "validate_decision_list": lambda: ListDecisionsResponse.model_validate({"decisions": corpus.candidates}),
+        "serialize_callback": lambda: callback.model_dump(mode="json", exclude_none=True),
+    }
+
+
+def _time(fn: Callable[[], object], min_seconds: float, repeats: int) -> tuple[float, int]:
+    fn()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_seconds / elapsed) + 1))
+    best = elapsed / loops
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6, loops
+
+
+def run(sizes: list[str], seed: int, min_seconds: float, repeats: int) -> dict:
+    results: dict[str, dict[str, float | int]] = {}
+    for size in sizes:
+        corpus = build_corpus(size, seed)
+        for name, fn in _cases(corpus).items():
+            per_call, loops = _time(fn, min_seconds, repeats)
+            results[f"{name}[{size}]"] = {"usPerCall": round(per_call, 3), "loops": loops}
+            print(f"{name + '[' + size + ']':<40} {per_call:12.2f} us", flush=True)
+    return {
+        "meta": {
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions: list[str] = []
+    for name, base in baseline.get("results", {}).items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        ratio = now["usPerCall"] / base["usPerCall"] if base["usPerCall"] else 1.0
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:<40} {base['usPerCall']:12.2f} -> {now['usPerCall']:12.2f} us  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    current = run([s for s in args.sizes.split(",") if s], args.seed, args.min_seconds, args.repeats)
+    Path(args.output).write_text(json.dumps(current, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"baseline written to {BASELINE_PATH}")
+        return
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+﻿"""Local stand-in for the Kimeboard API used by the load harness.
+
+Implements the paths in `src/api_client/endpoints.py` with canned corpus data. Behaviour is
+configured through environment variables so it can be started with uvicorn:
+
+  MOCK_LATENCY_MS=20 MOCK_JITTER_MS=10 MOCK_ERROR_RATE=0.01 MOCK_MEMO_BLOCKS=10 \
+    python -m uvicorn benchmarks.mock_api:app --port 3001
+
+`GET /_stats` returns per-route call counts and callback counts; `POST /_reset` clears them.
+Decision reads honour a `fields=decision.dueAt,actions` projection, as the real API may.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Request
+
+from benchmarks.corpus import make_answer_message, make_candidates, make_decision, make_memo
+from src.api_client import endpoints as ep
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    memo_blocks: int = 10
+    candidates: int = 20
+    seed: int = 42
+
+    @classmethod
+    def from_env(cls) -> MockConfig:
+        return cls(
+            latency_ms=float(os.getenv("MOCK_LATENCY_MS", "20")),
+            jitter_ms=float(os.getenv("MOCK_JITTER_MS", "10")),
+            error_rate=float(os.getenv("MOCK_ERROR_RATE", "0")),
+            memo_blocks=int(os.getenv("MOCK_MEMO_BLOCKS", "10")),
+            candidates=int(os.getenv("MOCK_CANDIDATES", "20")),
+            seed=int(os.getenv("MOCK_SEED", "42")),
+        )
+
+
+@dataclass
+class MockStats:
+    calls: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    callbacks: Counter = field(default_factory=Counter)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+            "callbacks": dict(self.callbacks),
+            "totalCalls": sum(self.calls.values()),
+            "totalCallbacks": sum(self.callbacks.values()),
+        }
+
+
+def _pick(value: Any, tree: dict[str, Any]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_pick(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _pick(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def project_fields(payload: dict[str, Any], fields: str | None) -> dict[str, Any]:
+    """Keep only the dotted `fields` paths of a response; lists apply the path to each item."""
+    if not fields:
+        return payload
+    tree: dict[str, Any] = {}
+    for path in fields.split(","):
+        node = tree
+        for part in path.strip().split("."):
+            node = node.setdefault(part, {})
+    return _pick(payload, tree)
+
+
+def create_mock_api(config: MockConfig | None = None) -> FastAPI:
+    config = config or MockConfig.from_env()
+    stats = MockStats()
+    rng = random.Random(config.seed)
+    api = FastAPI(title="kimeboard-mock-api")
+    api.state.stats = stats
+
+    async def _upstream(route: str) -> None:
+        stats.calls[route] += 1
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats.errors[route] += 1
+            raise HTTPException(status_code=503, detail="injected error")
+
+    @lru_cache(maxsize=1024)
+    def _memo(meeting_id: str) -> str:
+        memo, _ = make_memo(random.Random(f"{config.seed}:{meeting_id}"), config.memo_blocks, 3)
+        return memo
+
+    @lru_cache(maxsize=1024)
+    def _candidates(project_id: str) -> list[dict[str, Any]]:
+        return make_candidates(random.Random(f"{config.seed}:{project_id}"), [], config.candidates)
+
+    @api.get(ep.PATH_HEALTHZ)
+    async def healthz():
+        return {"ok": True}
+
+    @api.get(ep.PATH_LIST_PROJECTS)
+    async def list_projects():
+        await _upstream(ep.PATH_LIST_PROJECTS)
+        return {"projects": [{"projectId": f"prj_{i}", "name": f"project {i}"} for i in range(5)]}
+
+    @api.get(ep.PATH_GET_MEETING)
+    async def get_meeting(project_id: str, meeting_id: str):
+        await _upstream(ep.PATH_GET_MEETING)
+        return {
+            "meeting": {
+                "meetingId": meeting_id,
+                "projectId": project_id,
+                "title": "定例",
+                "status": "UPLOADED",
+                "raw": {"storage": "INLINE", "text": _memo(meeting_id)},
+            }
+        }
+
+    @api.get(ep.PATH_LIST_DECISIONS)
+    async def list_decisions(
+        project_id: str,
+        limit: int = 20,
+        status: str | None = None,
+        cursor: str | None = None,
+        fields: str | None = None,
+    ):
+        await _upstream(ep.PATH_LIST_DECISIONS)
+        decisions = [d for d in _candidates(project_id) if not status or d["status"] == status]
+        start = int(cursor or 0)
+        page = {"decisions": decisions[start : start + limit]}
+        if start + limit < len(decisions):
+            page["cursor"] = str(start + limit)
+        return project_fields(page, fields)
+
+    @api.get(ep.PATH_GET_DECISION)
+    async def get_decision(project_id: str, decision_id: str, fields: str | None = None):
+        await _upstream(ep.PATH_GET_DECISION)
+        decision = make_decision(random.Random(f"{config.seed}:{decision_id}"), decision_id)
+        payload = {"decision": {**decision, "projectId": project_id}, "actions": [], "threadId": f"thr_{decision_id}"}
+        return project_fields(payload, fields)
+
+    @api.get(ep.PATH_GET_MESSAGE)
+    async def get_message(thread_id: str, message_id: str):
+        await _upstream(ep.PATH_GET_MESSAGE)
+        message = make_answer_message(random.Random(f"{config.seed}:{message_id}"), 5)
+        return {"message": {**message, "messageId": message_id, "threadId": thread_id}}
+
+    @api.post(ep.PATH_MEETING_LOG)
+    async def meeting_log(project_id: str, meeting_id: str):
+        await _upstream(ep.PATH_MEETING_LOG)
+        return {"ok": True}
+
+    @api.post(ep.PATH_CALLBACK)
+    async def callback(request: Request):
+        await _upstream(ep.PATH_CALLBACK)
+        payload = await request.json()
+        stats.callbacks[f"{payload.get('kind')}:{payload.get('status')}"] += 1
+        return {"ok": True}
+
+    @api.post(ep.PATH_CREATE_DECISION)
+    async def create_decision(project_id: str):
+        await _upstream(ep.PATH_CREATE_DECISION)
+        return {"ok": True, "decisionId": f"dcs_{rng.getrandbits(32):08x}"}
+
+    @api.patch(ep.PATH_PATCH_DECISION)
+    async def patch_decision(project_id: str, decision_id: str):
+        await _upstream(ep.PATH_PATCH_DECISION)
+        return {"ok": True}
+
+    @api.post(ep.PATH_LINK_MEETING)
+    async def link_meeting(project_id: str, decision_id: str):
+        await _upstream(ep.PATH_LINK_MEETING)
+        return {"ok": True}
+
+    @api.post(ep.PATH_CREATE_THREAD)
+    async def create_thread(project_id: str, decision_id: str):
+        await _upstream(ep.PATH_CREATE_THREAD)
+        return {"ok": True, "threadId": f"thr_{decision_id}"}
+
+    @api.post(ep.PATH_POST_MESSAGE)
+    async def post_message(thread_id: str):
+        await _upstream(ep.PATH_POST_MESSAGE)
+        return {"ok": True, "messageId": f"msg_{rng.getrandbits(32):08x}"}
+
+    @api.post(ep.PATH_ACTIONS_BULK)
+    async def actions_bulk(project_id: str, decision_id: str, request: Request):
+        await _upstream(ep.PATH_ACTIONS_BULK)
+        body = await request.json()
+        return {"ok": True, "created": len(body.get("actions", []))}
+
+    @api.post(ep.PATH_PROJECT_ACTIONS_BULK)
+    async def project_actions_bulk(project_id: str, request: Request):
+        await _upstream(ep.PATH_PROJECT_ACTIONS_BULK)
+        items = (await request.json()).get("items", [])
+        results = [{"decisionId": item["decisionId"], "created": len(item.get("actions", []))} for item in items]
+        return {"ok": True, "created": sum(r["created"] for r in results), "results": results}
+
+    @api.post(ep.PATH_NOTIFY)
+    async def notify(project_id: str):
+        await _upstream(ep.PATH_NOTIFY)
+        return {"ok": True}
+
+    @api.get("/_stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    @api.post("/_reset")
+    async def reset_stats():
+        stats.calls.clear()
+        stats.errors.clear()
+        stats.callbacks.clear()
+        return {"ok": True}
+
+    return api
+
+
+app = create_mock_api()
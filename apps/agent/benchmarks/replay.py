@@ -0,0 +1,125 @@
+﻿"""Replay recorded runs offline against their cassettes.
+
+Usage:
+  python -m benchmarks.replay <cassette.json | directory> [...] [--repeat 5] [--output replay_results.json]
+
+Cassettes are written by the agent when API_CASSETTE_DIR is set. Each one is replayed
+through the real workflow with its upstream responses served from the file, so the run
+takes only the agent's own time. The report shows the best and median wall time per
+cassette, and whether the replayed writes (callbacks, patches, posts) match the recorded
+ones (see `compare_writes`). The run exits non-zero on a mismatch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from src.agents.root_agent import KimeboardRootAgent
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
+from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow
+from src.api_client.cassette import ReplayTransport, compare_writes, load_cassette
+from src.api_client.client import ApiClient
+from src.config import Settings
+from src.models.schemas import (
+    TaskDraftActionsProjectRequest,
+    TaskDraftActionsRequest,
+    TaskMeetingStructurerRequest,
+    TaskReplyIntegratorBatchRequest,
+    TaskReplyIntegratorRequest,
+)
+from src.observability.logger import get_logger
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+TASKS = {
+    "meeting_structurer": (TaskMeetingStructurerRequest, "run_meeting_structurer"),
+    "reply_integrator": (TaskReplyIntegratorRequest, "run_reply_integrator"),
+    "reply_integrator_batch": (TaskReplyIntegratorBatchRequest, "run_reply_integrator_batch"),
+    "draft_actions_skill": (TaskDraftActionsRequest, "run_draft_actions"),
+    "draft_actions_project": (TaskDraftActionsProjectRequest, "run_draft_actions_project"),
+}
+
+
+async def replay_once(cassette: dict[str, Any], settings: Settings) -> tuple[float, ReplayTransport]:
+    """Run the cassette's task once; returns the wall time and the transport holding what was sent."""
+    model, method = TASKS[cassette["workflow"]]
+    transport = ReplayTransport(cassette)
+    client = ApiClient(settings.api_base_url, settings.agent_callback_token, transport=transport)
+    tools = KimeboardApiToolset(client)
+    logger = get_logger("replay")
+    agent = KimeboardRootAgent(
+        meeting_structurer=MeetingStructurerWorkflow(tools, settings, logger),
+        reply_integrator=ReplyIntegratorWorkflow(tools, settings, logger),
+        draft_actions=DraftActionsSkillWorkflow(tools, settings, logger),
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=1),
+        logger=logger,
+    )
+    started = time.perf_counter()
+    try:
+        await getattr(agent, method)(model.model_validate(cassette["task"]))
+    except Exception:  # noqa: BLE001
+        # a run that failed when recorded fails again; its FAILED callback is still compared
+        pass
+    finally:
+        elapsed = time.perf_counter() - started
+        await client.close()
+    return elapsed, transport
+
+
+async def replay(path: Path, settings: Settings, repeat: int) -> dict[str, Any]:
+    cassette = load_cassette(str(path))
+    timings: list[float] = []
+    problems: list[str] = []
+    for _ in range(max(1, repeat)):
+        elapsed, transport = await replay_once(cassette, settings)
+        timings.append(elapsed * 1000)
+        problems = problems or compare_writes(cassette["interactions"], transport.sent)
+    return {
+        "cassette": str(path),
+        "workflow": cassette["workflow"],
+        "interactions": len(cassette["interactions"]),
+        "bestMs": round(min(timings), 3),
+        "medianMs": round(statistics.median(timings), 3),
+        "writesMatch": not problems,
+        "differences": problems[:20],
+    }
+
+
+def _cassette_paths(inputs: list[str]) -> list[Path]:
+    paths: list[Path] = []
+    for raw in inputs:
+        path = Path(raw)
+        paths.extend(sorted(path.glob("*.json")) if path.is_dir() else [path])
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cassettes", nargs="+", help="cassette files or directories of cassettes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="replay_results.json")
+    args = parser.parse_args()
+
+    # replays never reach the network; the base URL only has to be well formed
+    settings = Settings(API_BASE_URL="http://cassette.invalid", LOG_LEVEL="WARNING")
+    results = [asyncio.run(replay(path, settings, args.repeat)) for path in _cassette_paths(args.cassettes)]
+    Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    for result in results:
+        flag = "ok" if result["writesMatch"] else "MISMATCH"
+        print(f"{result['workflow']:<24} best={result['bestMs']:>9.3f}ms median={result['medianMs']:>9.3f}ms {flag}  {result['cassette']}")
+        for problem in result["differences"]:
+            print(f"    {problem}")
+    if not all(result["writesMatch"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
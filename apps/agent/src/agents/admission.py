@@ -0,0 +1,108 @@
+﻿from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run is shed; `status_code` is 429 (wait queue full) or 503 (waited too long)."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class _Gate:
+    limit: int
+    max_waiting: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    shed: int = 0
+
+    def __post_init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+
+def parse_limits(raw: str) -> dict[str, int]:
+    # "meeting_structurer=2,reply_integrator=8"
+    limits: dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value.strip())
+    return limits
+
+
+class AdmissionController:
+    """Per-workflow concurrency limit with a bounded wait queue in front of each workflow."""
+
+    def __init__(
+        self,
+        default_limit: int,
+        max_waiting: int,
+        wait_seconds: float,
+        limits: dict[str, int] | None = None,
+    ) -> None:
+        self._default_limit = max(1, default_limit)
+        self._max_waiting = max(0, max_waiting)
+        self._wait_seconds = wait_seconds
+        self._limits = limits or {}
+        self._gates: dict[str, _Gate] = {}
+
+    def _gate(self, workflow: str) -> _Gate:
+        gate = self._gates.get(workflow)
+        if gate is None:
+            limit = max(1, self._limits.get(workflow, self._default_limit))
+            gate = _Gate(limit=limit, max_waiting=self._max_waiting)
+            self._gates[workflow] = gate
+        return gate
+
+    @asynccontextmanager
+    async def admit(self, workflow: str, shed: bool = True) -> AsyncIterator[None]:
+        gate = self._gate(workflow)
+        if not gate.semaphore.locked():
+            # free slot: acquire completes without suspending
+            await gate.semaphore.acquire()
+        else:
+            if shed and gate.waiting >= gate.max_waiting:
+                gate.shed += 1
+                raise AdmissionRejected(429, f"{workflow} wait queue is full")
+            gate.waiting += 1
+            try:
+                if shed:
+                    await asyncio.wait_for(gate.semaphore.acquire(), timeout=self._wait_seconds)
+                else:
+                    await gate.semaphore.acquire()
+            except TimeoutError as exc:
+                gate.shed += 1
+                raise AdmissionRejected(503, f"{workflow} admission wait timed out") from exc
+            finally:
+                gate.waiting -= 1
+
+        gate.active += 1
+        gate.admitted += 1
+        try:
+            yield
+        finally:
+            gate.active -= 1
+            gate.semaphore.release()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {
+                "limit": gate.limit,
+                "active": gate.active,
+                "waiting": gate.waiting,
+                "maxWaiting": gate.max_waiting,
+                "admitted": gate.admitted,
+                "shed": gate.shed,
+            }
+            for name, gate in self._gates.items()
+        }
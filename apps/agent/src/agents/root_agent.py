@@ -1,17 +1,62 @@
 ﻿from __future__ import annotations
 
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+
+from src.agents.admission import AdmissionController, AdmissionRejected
+from src.agents.run_queue import RunQueue
+from src.agents.scheduler import FairScheduler
 from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
 from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
-from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow
+from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow, message_claim_key
+from src.api_client.cassette import CassetteRecorder
 from src.models.schemas import (
+    TaskDraftActionsProjectRequest,
     TaskDraftActionsRequest,
     TaskMeetingStructurerRequest,
+    TaskReplyIntegratorBatchRequest,
     TaskReplyIntegratorRequest,
 )
-from src.observability.runlog import RunContext, new_run_id
+from src.observability import metrics
+from src.observability.memory import MemoryTracker
+from src.observability.profiling import RunProfiler
+from src.observability.runlog import DeadlineExceeded, RunContext, new_run_id
 from src.utils.idempotency import InMemoryIdempotencyStore
 
 
+@dataclass
+class _Job:
+    key: str
+    run: RunContext
+    execute: Callable[[], Awaitable[dict]]
+    profile: bool = False
+    deadline_seconds: float | None = None
+    task: BaseModel | None = None
+    # thread batches claim per message: `claim` returns a response when nothing is left to
+    # run, and the keys it claimed replace store_key
+    claim: Callable[[], Awaitable[dict | None]] | None = None
+    claimed_keys: list[str] | None = None
+    # the idempotency-store key when it is not derived from workflow and key
+    claim_key: str | None = None
+    # fencing token per claimed key, so a run whose lease lapsed cannot complete or release a newer claim
+    tokens: dict[str, str] = field(default_factory=dict)
+    # posts the workflow's FAILED callback for a run that never got to execute
+    report_failed: Callable[[str], Awaitable[None]] | None = None
+
+    @property
+    def store_key(self) -> str:
+        return self.claim_key or f"{self.run.workflow}:{self.key}"
+
+    @property
+    def store_keys(self) -> list[str]:
+        return self.claimed_keys if self.claimed_keys is not None else [self.store_key]
+
+
 class KimeboardRootAgent:
     def __init__(
         self,
@@ -20,19 +65,217 @@ class KimeboardRootAgent:
         draft_actions: DraftActionsSkillWorkflow,
         idempotency_store: InMemoryIdempotencyStore,
         logger,
+        lease_seconds: float = 600.0,
+        run_queue: RunQueue | None = None,
+        admission: AdmissionController | None = None,
+        profiler: RunProfiler | None = None,
+        scheduler: FairScheduler | None = None,
+        memory: MemoryTracker | None = None,
+        recorder: CassetteRecorder | None = None,
     ) -> None:
         self.meeting_structurer = meeting_structurer
         self.reply_integrator = reply_integrator
         self.draft_actions = draft_actions
         self.idempotency_store = idempotency_store
         self.logger = logger
+        self.lease_seconds = lease_seconds
+        self.run_queue = run_queue
+        self.admission = admission
+        self.profiler = profiler
+        self.scheduler = scheduler
+        self.memory = memory
+        self.recorder = recorder
 
-    async def run_meeting_structurer(self, task: TaskMeetingStructurerRequest) -> dict:
-        key = task.idempotencyKey or task.meetingId
-        if self.idempotency_store.seen(f"meeting_structurer:{key}"):
-            self.logger.info("idempotent_skip", workflow="meeting_structurer", key=key)
-            return {"ok": True, "skipped": True, "reason": "idempotent"}
+    def _replay(self, job: _Job, result: dict | None) -> dict:
+        self.logger.info("idempotent_skip", workflow=job.run.workflow, key=job.key)
+        metrics.WORKFLOW_RUNS.inc(job.run.workflow, "idempotent_skip")
+        return {**(result or {}), "ok": True, "skipped": True, "reason": "idempotent"}
+
+    async def _run_once(self, job: _Job, profile: bool = False, deadline_seconds: float | None = None) -> dict:
+        job.profile = profile
+        # synchronous runs: the caller's budget includes time spent waiting for a duplicate or a slot
+        job.run.set_deadline(deadline_seconds)
+        if job.claim is not None:
+            skipped = await job.claim()
+            return skipped if skipped is not None else await self._execute_claimed(job)
+        # first delivery claims the key; concurrent duplicates wait for it, later ones replay its result
+        while True:
+            claim = await self.idempotency_store.claim(job.store_key, self.lease_seconds)
+            if claim.status == "claimed":
+                job.tokens[job.store_key] = claim.token
+                break
+            if claim.status == "completed":
+                return self._replay(job, claim.result)
+            self.logger.info("idempotent_wait", workflow=job.run.workflow, key=job.key)
+            await self.idempotency_store.wait(job.store_key, claim.lease_remaining)
+        return await self._execute_claimed(job)
+
+    async def _execute_claimed(self, job: _Job, shed: bool = True, scheduled: bool = False) -> dict:
+        # queued async runs wait for a slot instead of being shed; the run queue already bounds them
+        workflow = job.run.workflow
+        gate = self.admission.admit(workflow, shed=shed) if self.admission else nullcontext()
+        # admission sheds overload per workflow; the scheduler orders what is left fairly across projects
+        # (`scheduled`: the run queue already holds this run's scheduler slot)
+        use_slot = self.scheduler is not None and not scheduled
+        slot = self.scheduler.slot(job.run.project_id, workflow) if use_slot else nullcontext()
+        try:
+            async with gate, slot:
+                result = await self._timed(job)
+        except AdmissionRejected:
+            metrics.WORKFLOW_RUNS.inc(workflow, "shed")
+            await self._release(job)
+            raise
+        except BaseException:
+            await self._release(job)
+            raise
+        for store_key in job.store_keys:
+            if not await self.idempotency_store.complete(store_key, result, job.tokens.get(store_key)):
+                # the lease lapsed and another delivery claimed the key; its outcome stands
+                self.logger.warning("idempotency_claim_lost", workflow=workflow, key=store_key, run_id=job.run.run_id)
+        return result
+
+    async def _release(self, job: _Job) -> None:
+        for store_key in job.store_keys:
+            await self.idempotency_store.release(store_key, job.tokens.get(store_key))
+
+    async def _abandon(self, job: _Job) -> None:
+        """A queued async run the agent shut down before starting.
+
+        Cloud Tasks already got 202 for it and will not retry, so the API hears of it through
+        a FAILED callback; the claims are released so the task can be sent again.
+        """
+        metrics.WORKFLOW_RUNS.inc(job.run.workflow, "abandoned")
+        try:
+            if job.report_failed is not None:
+                await job.report_failed("abandoned: the agent shut down before the run started")
+            else:
+                self.logger.error("async_run_lost", run_id=job.run.run_id, workflow=job.run.workflow, key=job.key)
+        except Exception:  # noqa: BLE001
+            self.logger.exception("async_run_abandon_report_failed", run_id=job.run.run_id, workflow=job.run.workflow)
+        finally:
+            await self._release(job)
 
+    async def _claim_messages(self, job: _Job, task: TaskReplyIntegratorBatchRequest) -> dict | None:
+        """Claim each message of a thread batch under the key a single reply_integrator task claims.
+
+        Messages already integrated, or being integrated by another run, are left out of the
+        batch. Returns the response to send when no message is left to run.
+        """
+        claimed: list[str] = []
+        skipped: list[str] = []
+        for message_id in task.messageIds:
+            if message_id in claimed or message_id in skipped:
+                continue
+            claim = await self.idempotency_store.claim(message_claim_key(message_id), self.lease_seconds)
+            if claim.status == "claimed":
+                job.tokens[message_claim_key(message_id)] = claim.token
+                claimed.append(message_id)
+            else:
+                skipped.append(message_id)
+        job.claimed_keys = [message_claim_key(message_id) for message_id in claimed]
+
+        async def _execute() -> dict:
+            result = await self.reply_integrator.run_batch(task, job.run, claimed)
+            return {**result, "skippedMessageIds": skipped} if skipped else result
+
+        job.execute = _execute
+        job.report_failed = lambda error: self.reply_integrator.report_batch_failed(task, job.run, error, claimed)
+        if skipped:
+            self.logger.info("idempotent_skip", workflow=job.run.workflow, key=job.key, message_ids=skipped)
+        if claimed:
+            return None
+        metrics.WORKFLOW_RUNS.inc(job.run.workflow, "idempotent_skip")
+        return {"ok": True, "skipped": True, "reason": "idempotent", "skippedMessageIds": skipped}
+
+    async def _timed(self, job: _Job) -> dict:
+        run = job.run
+        run.set_deadline(job.deadline_seconds)
+        workflow = run.workflow
+        outcome = "failed"
+        scope = self._profile_scope(job)
+        recording = self.recorder.record(run, job.task) if self.recorder else nullcontext()
+        metrics.WORKFLOW_IN_FLIGHT.inc(workflow)
+        memory = self.memory.begin() if self.memory else None
+        started = time.perf_counter()
+        try:
+            with run.bind():
+                async with asyncio.timeout(run.remaining()) as budget:
+                    async with scope, recording:
+                        result = await job.execute()
+            outcome = "succeeded"
+            return result
+        except TimeoutError as exc:
+            if budget.expired():
+                outcome = "deadline_exceeded"
+                raise DeadlineExceeded(f"{workflow} run exceeded its deadline") from exc
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.WORKFLOW_IN_FLIGHT.dec(workflow)
+            metrics.WORKFLOW_RUN_SECONDS.observe(elapsed, workflow)
+            metrics.WORKFLOW_RUNS.inc(workflow, outcome)
+            usage = self.memory.end(memory, workflow) if memory else {}
+            self.logger.info(
+                "run_finished",
+                run_id=run.run_id,
+                workflow=workflow,
+                trace_id=run.trace_id,
+                outcome=outcome,
+                duration_ms=int(elapsed * 1000),
+                steps=run.step_durations(),
+                **usage,
+            )
+
+    def _profile_scope(self, job: _Job):
+        if not job.profile or self.profiler is None:
+            return nullcontext()
+        if not self.profiler.try_acquire():
+            self.logger.info("run_profile_skipped", run_id=job.run.run_id, workflow=job.run.workflow)
+            return nullcontext()
+        return self.profiler.profile(job.run.run_id)
+
+    async def _submit(self, job: _Job, profile: bool = False, deadline_seconds: float | None = None) -> dict:
+        job.profile = profile
+        # queued runs: the budget starts when the run gets its slot (see _timed)
+        job.deadline_seconds = deadline_seconds
+        # async mode: claim now, run on the worker pool, answer immediately
+        if self.run_queue is None:
+            raise RuntimeError("run queue is not configured")
+        if job.claim is not None:
+            skipped = await job.claim()
+            if skipped is not None:
+                return skipped
+        else:
+            claim = await self.idempotency_store.claim(job.store_key, self.lease_seconds)
+            if claim.status == "claimed":
+                job.tokens[job.store_key] = claim.token
+            if claim.status == "completed":
+                return self._replay(job, claim.result)
+            if claim.status == "in_flight":
+                self.logger.info("idempotent_in_flight", workflow=job.run.workflow, key=job.key)
+                metrics.WORKFLOW_RUNS.inc(job.run.workflow, "idempotent_skip")
+                return {"ok": True, "skipped": True, "reason": "in_flight"}
+        scheduled = self.run_queue.scheduler is not None
+        try:
+            record = self.run_queue.submit(
+                job.run.run_id,
+                job.run.workflow,
+                lambda: self._execute_claimed(job, shed=False, scheduled=scheduled),
+                on_abandon=lambda: self._abandon(job),
+                project_id=job.run.project_id,
+            )
+        except Exception:
+            await self._release(job)
+            raise
+        # GET /runs/{runId} shows steps as they finish
+        record.steps = job.run.steps
+        return {"ok": True, "accepted": True, "runId": job.run.run_id}
+
+    def _meeting_structurer_job(self, task: TaskMeetingStructurerRequest) -> _Job:
+        key = task.idempotencyKey or task.meetingId
         run = RunContext(
             run_id=new_run_id(),
             workflow="meeting_structurer",
@@ -40,16 +283,16 @@ class KimeboardRootAgent:
             meeting_id=task.meetingId,
             idempotency_key=key,
         )
-        result = await self.meeting_structurer.run(task, run)
-        self.idempotency_store.mark(f"meeting_structurer:{key}")
-        return result
+        return _Job(
+            key=key,
+            run=run,
+            execute=lambda: self.meeting_structurer.run(task, run),
+            task=task,
+            report_failed=lambda error: self.meeting_structurer.report_failed(task, run, error),
+        )
 
-    async def run_reply_integrator(self, task: TaskReplyIntegratorRequest) -> dict:
+    def _reply_integrator_job(self, task: TaskReplyIntegratorRequest) -> _Job:
         key = task.idempotencyKey or task.messageId
-        if self.idempotency_store.seen(f"reply_integrator:{key}"):
-            self.logger.info("idempotent_skip", workflow="reply_integrator", key=key)
-            return {"ok": True, "skipped": True, "reason": "idempotent"}
-
         run = RunContext(
             run_id=new_run_id(),
             workflow="reply_integrator",
@@ -57,16 +300,31 @@ class KimeboardRootAgent:
             decision_id=task.decisionId,
             idempotency_key=key,
         )
-        result = await self.reply_integrator.run(task, run)
-        self.idempotency_store.mark(f"reply_integrator:{key}")
-        return result
+        return _Job(
+            key=key,
+            run=run,
+            execute=lambda: self.reply_integrator.run(task, run),
+            task=task,
+            report_failed=lambda error: self.reply_integrator.report_failed(task, run, error),
+            # a message is integrated once, whichever key or batch delivers it
+            claim_key=message_claim_key(task.messageId),
+        )
 
-    async def run_draft_actions(self, task: TaskDraftActionsRequest) -> dict:
-        key = task.idempotencyKey or task.decisionId
-        if self.idempotency_store.seen(f"draft_actions_skill:{key}"):
-            self.logger.info("idempotent_skip", workflow="draft_actions_skill", key=key)
-            return {"ok": True, "skipped": True, "reason": "idempotent"}
+    def _reply_integrator_batch_job(self, task: TaskReplyIntegratorBatchRequest) -> _Job:
+        key = task.idempotencyKey or f"{task.threadId}:{','.join(task.messageIds)}"
+        run = RunContext(
+            run_id=new_run_id(),
+            workflow="reply_integrator_batch",
+            project_id=task.projectId,
+            decision_id=task.decisionId,
+            idempotency_key=key,
+        )
+        job = _Job(key=key, run=run, execute=lambda: self.reply_integrator.run_batch(task, run), task=task)
+        job.claim = lambda: self._claim_messages(job, task)
+        return job
 
+    def _draft_actions_job(self, task: TaskDraftActionsRequest) -> _Job:
+        key = task.idempotencyKey or task.decisionId
         run = RunContext(
             run_id=new_run_id(),
             workflow="draft_actions_skill",
@@ -74,6 +332,70 @@ class KimeboardRootAgent:
             decision_id=task.decisionId,
             idempotency_key=key,
         )
-        result = await self.draft_actions.run(task, run)
-        self.idempotency_store.mark(f"draft_actions_skill:{key}")
-        return result
+        return _Job(
+            key=key,
+            run=run,
+            execute=lambda: self.draft_actions.run(task, run),
+            task=task,
+            report_failed=lambda error: self.draft_actions.report_failed(task, run, error),
+        )
+
+    def _draft_actions_project_job(self, task: TaskDraftActionsProjectRequest) -> _Job:
+        key = task.idempotencyKey or task.projectId
+        run = RunContext(
+            run_id=new_run_id(),
+            workflow="draft_actions_project",
+            project_id=task.projectId,
+            idempotency_key=key,
+        )
+        return _Job(key=key, run=run, execute=lambda: self.draft_actions.run_project(task, run), task=task)
+
+    async def run_meeting_structurer(
+        self, task: TaskMeetingStructurerRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._run_once(self._meeting_structurer_job(task), profile, deadline_seconds)
+
+    async def run_reply_integrator(
+        self, task: TaskReplyIntegratorRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._run_once(self._reply_integrator_job(task), profile, deadline_seconds)
+
+    async def run_reply_integrator_batch(
+        self, task: TaskReplyIntegratorBatchRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._run_once(self._reply_integrator_batch_job(task), profile, deadline_seconds)
+
+    async def run_draft_actions(
+        self, task: TaskDraftActionsRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._run_once(self._draft_actions_job(task), profile, deadline_seconds)
+
+    async def run_draft_actions_project(
+        self, task: TaskDraftActionsProjectRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._run_once(self._draft_actions_project_job(task), profile, deadline_seconds)
+
+    async def submit_meeting_structurer(
+        self, task: TaskMeetingStructurerRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._submit(self._meeting_structurer_job(task), profile, deadline_seconds)
+
+    async def submit_reply_integrator(
+        self, task: TaskReplyIntegratorRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._submit(self._reply_integrator_job(task), profile, deadline_seconds)
+
+    async def submit_reply_integrator_batch(
+        self, task: TaskReplyIntegratorBatchRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._submit(self._reply_integrator_batch_job(task), profile, deadline_seconds)
+
+    async def submit_draft_actions(
+        self, task: TaskDraftActionsRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._submit(self._draft_actions_job(task), profile, deadline_seconds)
+
+    async def submit_draft_actions_project(
+        self, task: TaskDraftActionsProjectRequest, profile: bool = False, deadline_seconds: float | None = None
+    ) -> dict:
+        return await self._submit(self._draft_actions_project_job(task), profile, deadline_seconds)
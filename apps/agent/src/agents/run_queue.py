@@ -0,0 +1,183 @@
+﻿from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.agents.scheduler import FairScheduler
+from src.observability.runlog import now_iso
+
+
+class QueueFullError(Exception):
+    """Raised when the run queue cannot accept more work; callers should answer 503 with Retry-After."""
+
+
+@dataclass
+class RunRecord:
+    run_id: str
+    workflow: str
+    status: str = "QUEUED"
+    queued_at: str = field(default_factory=now_iso)
+    started_at: str | None = None
+    finished_at: str | None = None
+    queued_mono: float = field(default_factory=time.monotonic)
+    started_mono: float | None = None
+    finished_mono: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    steps: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        timings: dict[str, int] = {}
+        if self.started_mono is not None:
+            timings["queueMs"] = int((self.started_mono - self.queued_mono) * 1000)
+        if self.started_mono is not None and self.finished_mono is not None:
+            timings["runMs"] = int((self.finished_mono - self.started_mono) * 1000)
+        out: dict[str, Any] = {
+            "runId": self.run_id,
+            "workflow": self.workflow,
+            "status": self.status,
+            "queuedAt": self.queued_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "timings": timings,
+            "steps": self.steps,
+        }
+        if self.result is not None:
+            out["result"] = self.result
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+@dataclass
+class _QueuedRun:
+    record: RunRecord
+    execute: Callable[[], Awaitable[dict[str, Any]]]
+    on_abandon: Callable[[], Awaitable[None]] | None = None
+    project_id: str = ""
+
+
+class RunQueue:
+    """Bounded in-process pool for runs accepted with 202.
+
+    Every accepted run waits for an execution slot. With a `scheduler`, the scheduler decides
+    which queued run goes next (weighted fair queuing across projects, skipping projects at
+    their cap); without one, `workers` slots are handed out in arrival order.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        logger,
+        history: int = 1000,
+        scheduler: FairScheduler | None = None,
+    ) -> None:
+        self._max_queue = max(1, max_queue)
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._scheduler = scheduler
+        self._pending: dict[str, _QueuedRun] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._history: OrderedDict[str, RunRecord] = OrderedDict()
+        self._history_limit = max(1, history)
+        self._accepting = False
+        self.logger = logger
+
+    @property
+    def scheduler(self) -> FairScheduler | None:
+        return self._scheduler
+
+    def start(self) -> None:
+        self._accepting = True
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(
+        self,
+        run_id: str,
+        workflow: str,
+        execute: Callable[[], Awaitable[dict[str, Any]]],
+        on_abandon: Callable[[], Awaitable[None]] | None = None,
+        project_id: str = "",
+    ) -> RunRecord:
+        if not self._accepting:
+            raise QueueFullError("run queue is not accepting work")
+        if len(self._pending) >= self._max_queue:
+            raise QueueFullError("run queue is full")
+        record = RunRecord(run_id=run_id, workflow=workflow)
+        item = _QueuedRun(record=record, execute=execute, on_abandon=on_abandon, project_id=project_id)
+        self._pending[run_id] = item
+        self._tasks[run_id] = asyncio.create_task(self._run(item), name=f"run-{run_id}")
+        self._remember(record)
+        return record
+
+    def get(self, run_id: str) -> RunRecord | None:
+        return self._history.get(run_id)
+
+    def _remember(self, record: RunRecord) -> None:
+        self._history[record.run_id] = record
+        while len(self._history) > self._history_limit:
+            self._history.popitem(last=False)
+
+    def _slot(self, item: _QueuedRun):
+        if self._scheduler is not None:
+            return self._scheduler.slot(item.project_id, item.record.workflow)
+        return self._slots
+
+    async def _run(self, item: _QueuedRun) -> None:
+        record = item.record
+        try:
+            async with self._slot(item):
+                self._pending.pop(record.run_id, None)
+                record.status = "RUNNING"
+                record.started_at = now_iso()
+                record.started_mono = time.monotonic()
+                try:
+                    record.result = await item.execute()
+                    record.status = "SUCCEEDED"
+                except asyncio.CancelledError:
+                    record.status = "CANCELLED"
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    record.status = "FAILED"
+                    record.error = str(exc)
+                    self.logger.warning("async_run_failed", run_id=record.run_id, workflow=record.workflow, error=str(exc))
+                finally:
+                    record.finished_at = now_iso()
+                    record.finished_mono = time.monotonic()
+        finally:
+            self._tasks.pop(record.run_id, None)
+
+    async def drain(self, timeout: float) -> None:
+        """Stop accepting, wait up to `timeout` for accepted runs, then abandon what has not started.
+
+        Each abandoned run's `on_abandon` hook reports it (the root agent posts a FAILED
+        callback), since the 202 it was accepted with means nobody will send it again.
+        Runs still executing after that are cancelled.
+        """
+        self._accepting = False
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()), timeout=max(timeout, 0.0))
+
+        abandoned = list(self._pending.values())
+        self._pending.clear()
+        tasks = list(self._tasks.values())
+        for item in abandoned:
+            item.record.status = "ABANDONED"
+            item.record.finished_at = now_iso()
+            self.logger.warning("async_run_abandoned", run_id=item.record.run_id, workflow=item.record.workflow)
+            task = self._tasks.get(item.record.run_id)
+            if task is not None:
+                task.cancel()  # still waiting for a slot
+        # reported together: the instance is already inside its shutdown grace period
+        await asyncio.gather(*(item.on_abandon() for item in abandoned if item.on_abandon), return_exceptions=True)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
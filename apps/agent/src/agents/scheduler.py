@@ -0,0 +1,137 @@
+﻿from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from src.observability import metrics
+
+# reply_integrator answers a person waiting in the thread; the rest is bulk work
+WORKFLOW_CLASSES = {
+    "reply_integrator": "interactive",
+    "reply_integrator_batch": "interactive",
+    "meeting_structurer": "batch",
+    "draft_actions_skill": "batch",
+    "draft_actions_project": "batch",
+}
+
+
+def workflow_class(workflow: str) -> str:
+    return WORKFLOW_CLASSES.get(workflow, "batch")
+
+
+@dataclass
+class _Flow:
+    project_id: str
+    klass: str
+    weight: float
+    finish: float = 0.0
+    waiters: deque[asyncio.Future] = field(default_factory=deque)
+
+
+class FairScheduler:
+    """Weighted fair queuing of runs across (project, workflow class) flows.
+
+    Start-time fair queuing: each dispatch advances the flow's virtual finish time by
+    1/weight, and the backlogged flow with the smallest start tag runs next. A project
+    above its concurrency cap is skipped until one of its runs finishes.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        weights: dict[str, int] | None = None,
+        project_limit: int = 4,
+        project_limits: dict[str, int] | None = None,
+    ) -> None:
+        self._slots = max(1, slots)
+        self._weights = {"interactive": 4, "batch": 1, **(weights or {})}
+        self._project_limit = max(1, project_limit)
+        self._project_limits = project_limits or {}
+        self._flows: dict[tuple[str, str], _Flow] = {}
+        self._project_active: dict[str, int] = {}
+        self._active = 0
+        self._vclock = 0.0
+
+    def _flow(self, project_id: str, klass: str) -> _Flow:
+        flow = self._flows.get((project_id, klass))
+        if flow is None:
+            weight = max(1, self._weights.get(klass, 1))
+            flow = _Flow(project_id=project_id, klass=klass, weight=weight, finish=self._vclock)
+            self._flows[(project_id, klass)] = flow
+        return flow
+
+    def _project_has_room(self, project_id: str) -> bool:
+        limit = self._project_limits.get(project_id, self._project_limit)
+        return self._project_active.get(project_id, 0) < limit
+
+    def _dispatch(self) -> None:
+        while self._active < self._slots:
+            best: _Flow | None = None
+            best_start = 0.0
+            for flow in self._flows.values():
+                while flow.waiters and flow.waiters[0].done():
+                    flow.waiters.popleft()  # cancelled while queued
+                if not flow.waiters or not self._project_has_room(flow.project_id):
+                    continue
+                start = max(self._vclock, flow.finish)
+                if best is None or start < best_start:
+                    best, best_start = flow, start
+            if best is None:
+                return
+            waiter = best.waiters.popleft()
+            self._vclock = best_start
+            best.finish = best_start + 1.0 / best.weight
+            self._active += 1
+            self._project_active[best.project_id] = self._project_active.get(best.project_id, 0) + 1
+            waiter.set_result(None)
+
+    def _release(self, project_id: str) -> None:
+        self._active -= 1
+        remaining = self._project_active.get(project_id, 1) - 1
+        if remaining > 0:
+            self._project_active[project_id] = remaining
+        else:
+            self._project_active.pop(project_id, None)
+        # idle flows that are not ahead of the clock carry no fairness state worth keeping
+        for key in [k for k, f in self._flows.items() if not f.waiters and f.finish <= self._vclock]:
+            del self._flows[key]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, project_id: str, workflow: str) -> AsyncIterator[None]:
+        klass = workflow_class(workflow)
+        waiter = asyncio.get_running_loop().create_future()
+        self._flow(project_id, klass).waiters.append(waiter)
+        started = time.perf_counter()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # granted just as we were cancelled: hand the slot on
+                self._release(project_id)
+            else:
+                waiter.cancel()
+            raise
+        metrics.SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - started, project_id, klass)
+        try:
+            yield
+        finally:
+            self._release(project_id)
+
+    def stats(self) -> dict[str, object]:
+        waiting: dict[str, int] = {}
+        for flow in self._flows.values():
+            queued = sum(1 for w in flow.waiters if not w.done())
+            if queued:
+                waiting[f"{flow.project_id}:{flow.klass}"] = queued
+        return {
+            "slots": self._slots,
+            "active": self._active,
+            "activeByProject": dict(self._project_active),
+            "waiting": waiting,
+        }
@@ -0,0 +1,274 @@
+﻿from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.agents.workflows.gap_questioner import generate_question_set
+from src.config import Settings
+from src.models.schemas import GetDecisionResponse, ProjectSummary
+from src.observability.runlog import new_run_id
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+from src.utils.idempotency import InMemoryIdempotencyStore
+from src.utils.limits import MAX_PROJECT_DECISIONS
+
+
+_SWEEP_STATUSES = ("NEEDS_INFO", "REOPEN")
+
+
+def decision_fingerprint(decision: Any) -> str:
+    body = decision.model_dump(mode="json") if hasattr(decision, "model_dump") else decision
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SweepState:
+    """Watermarks persisted between sweeps: project -> lastDecisionUpdatedAt, decision -> content hash."""
+
+    def __init__(self, path: str) -> None:
+        self._path = Path(path)
+        self.projects: dict[str, str] = {}
+        self.decisions: dict[str, str] = {}
+        self._dirty = False
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        self.projects = dict(data.get("projects") or {})
+        self.decisions = dict(data.get("decisions") or {})
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"projects": self.projects, "decisions": self.decisions}), encoding="utf-8")
+        os.replace(tmp, self._path)
+        self._dirty = False
+
+    def project_unchanged(self, project: ProjectSummary) -> bool:
+        marker = project.lastDecisionUpdatedAt
+        return bool(marker) and self.projects.get(project.projectId) == marker
+
+    def mark_project(self, project: ProjectSummary) -> None:
+        if project.lastDecisionUpdatedAt:
+            self.projects[project.projectId] = project.lastDecisionUpdatedAt
+            self._dirty = True
+
+    def decision_changed(self, key: str, fingerprint: str) -> bool:
+        return self.decisions.get(key) != fingerprint
+
+    def mark_decision(self, key: str, fingerprint: str) -> None:
+        self.decisions[key] = fingerprint
+        self._dirty = True
+
+    def retain_decisions(self, project_id: str, keep: set[str]) -> None:
+        prefix = f"{project_id}:"
+        stale = [k for k in self.decisions if k.startswith(prefix) and k not in keep]
+        for key in stale:
+            self.decisions.pop(key, None)
+        if stale:
+            self._dirty = True
+
+
+class DecisionSweeper:
+    """Revisits NEEDS_INFO / REOPEN decisions whose content changed since they were last swept.
+
+    `state` is this instance's watermark file. With an `idempotency_store`, every swept
+    (decision, content hash) and (project, lastDecisionUpdatedAt) is also recorded there, and
+    a decision is claimed before it is processed. On a backend shared by the fleet (REDIS) a
+    cold instance then skips what another instance already swept, and two instances never
+    process the same decision version at once.
+    """
+
+    def __init__(
+        self,
+        tools: KimeboardApiToolset,
+        draft_actions: DraftActionsSkillWorkflow,
+        settings: Settings,
+        logger,
+        idempotency_store: InMemoryIdempotencyStore | None = None,
+    ) -> None:
+        self.tools = tools
+        self.draft_actions = draft_actions
+        self.settings = settings
+        self.logger = logger
+        self.state = SweepState(settings.sweep_state_path)
+        self.store = idempotency_store
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self.state.load()
+        self._task = asyncio.create_task(self._loop(), name="decision-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.state.save()
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.settings.sweep_jitter_seconds))
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                self.logger.exception("sweep_failed")
+            await asyncio.sleep(self.settings.sweep_interval_seconds + random.uniform(0, self.settings.sweep_jitter_seconds))
+
+    async def sweep_once(self) -> dict[str, Any]:
+        sweep_id = new_run_id("sweep")
+        started = time.monotonic()
+        stats = {
+            "projects": 0,
+            "projectsSkipped": 0,
+            "changed": 0,
+            "processed": 0,
+            "sweptElsewhere": 0,
+            "failed": 0,
+            "timedOut": False,
+        }
+
+        try:
+            async with asyncio.timeout(self.settings.sweep_budget_seconds):
+                for project in await self._projects():
+                    if self.state.project_unchanged(project) or await self._project_swept_elsewhere(project):
+                        stats["projectsSkipped"] += 1
+                        continue
+                    stats["projects"] += 1
+                    await self._sweep_project(project, stats, sweep_id)
+        except TimeoutError:
+            stats["timedOut"] = True
+        finally:
+            self.state.save()
+
+        self.logger.info(
+            "sweep_completed",
+            sweep_id=sweep_id,
+            elapsed_ms=int((time.monotonic() - started) * 1000),
+            **stats,
+        )
+        return stats
+
+    async def _projects(self) -> list[ProjectSummary]:
+        configured = [p.strip() for p in self.settings.sweep_project_ids.split(",") if p.strip()]
+        if configured:
+            return [ProjectSummary(projectId=p) for p in configured]
+        listed = await self.tools.list_projects()
+        return [p for p in listed.projects if (p.status or "ACTIVE") != "ARCHIVED"]
+
+    def _project_key(self, project: ProjectSummary) -> str:
+        return f"sweep_project:{project.projectId}:{project.lastDecisionUpdatedAt}"
+
+    async def _project_swept_elsewhere(self, project: ProjectSummary) -> bool:
+        if self.store is None or not project.lastDecisionUpdatedAt:
+            return False
+        if not await self.store.seen(self._project_key(project)):
+            return False
+        self.state.mark_project(project)
+        return True
+
+    async def _sweep_project(self, project: ProjectSummary, stats: dict[str, Any], sweep_id: str) -> None:
+        project_id = project.projectId
+        # every page of every status; the project is only marked swept once all of them were seen
+        listed = [
+            d async for d in self.tools.iter_decisions(project_id, _SWEEP_STATUSES, page_size=MAX_PROJECT_DECISIONS)
+        ]
+
+        current: dict[str, str] = {}
+        changed: list[tuple[str, str, str]] = []
+        for decision in listed:
+            key = f"{project_id}:{decision.decisionId}"
+            fingerprint = decision_fingerprint(decision)
+            current[key] = fingerprint
+            if self.state.decision_changed(key, fingerprint):
+                changed.append((decision.decisionId, decision.status, fingerprint))
+        self.state.retain_decisions(project_id, set(current))
+        stats["changed"] += len(changed)
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.sweep_concurrency))
+
+        async def _process(decision_id: str, status: str, fingerprint: str) -> str:
+            async with semaphore:
+                claim_key = f"sweep:{project_id}:{decision_id}:{fingerprint}"
+                token = None
+                if self.store is not None:
+                    claim = await self.store.claim(claim_key, self.settings.idempotency_lease_seconds)
+                    if claim.status == "completed":
+                        self.state.mark_decision(f"{project_id}:{decision_id}", fingerprint)
+                        return "elsewhere"
+                    if claim.status == "in_flight":
+                        return "busy"  # another instance is on it; looked at again next sweep
+                    token = claim.token
+                try:
+                    decision_res = await self.tools.get_decision(project_id, decision_id)
+                    if status == "NEEDS_INFO":
+                        await self._post_questions(project_id, decision_res)
+                    else:
+                        await self.draft_actions.create_drafts_for(project_id, decision_res)
+                except Exception as exc:  # noqa: BLE001
+                    if self.store is not None:
+                        await self.store.release(claim_key, token)
+                    self.logger.warning(
+                        "sweep_decision_failed",
+                        sweep_id=sweep_id,
+                        project_id=project_id,
+                        decision_id=decision_id,
+                        error=str(exc),
+                    )
+                    return "failed"
+                if self.store is not None:
+                    await self.store.complete(claim_key, {"sweepId": sweep_id}, token)
+                self.state.mark_decision(f"{project_id}:{decision_id}", fingerprint)
+                return "processed"
+
+        results = await asyncio.gather(*[_process(*item) for item in changed])
+        stats["processed"] += results.count("processed")
+        stats["sweptElsewhere"] += results.count("elsewhere")
+        stats["failed"] += results.count("failed")
+        if all(r in ("processed", "elsewhere") for r in results):
+            self.state.mark_project(project)
+            if self.store is not None and project.lastDecisionUpdatedAt:
+                await self.store.mark(self._project_key(project))
+
+    async def _post_questions(self, project_id: str, decision_res: GetDecisionResponse) -> None:
+        decision = decision_res.decision
+        qset = generate_question_set(decision)
+        if not qset:
+            return
+        thread_id = decision_res.threadId
+        if not thread_id:
+            created = await self.tools.create_thread_if_needed(project_id, decision.decisionId)
+            thread_id = created.get("threadId")
+        if not thread_id:
+            raise RuntimeError("thread could not be resolved")
+        await self.tools.post_question_set(
+            thread_id,
+            {
+                "senderType": "AGENT",
+                "format": "QUESTION_SET",
+                "content": qset.hint or "",
+                "metadata": {
+                    "questions": [q.model_dump(mode="json", exclude_none=True) for q in qset.questions],
+                    "missingFields": [q.maps_to.field for q in qset.questions],
+                    "contextLabel": "decision",
+                },
+                "relatesTo": {"projectId": project_id, "decisionId": decision.decisionId},
+            },
+        )
@@ -1,13 +1,46 @@
 ﻿from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 from src.config import Settings
-from src.models.schemas import ActionDraft, DraftActionsCallback, TaskDraftActionsRequest
+from src.models.schemas import (
+    ActionDraft,
+    DecisionForDraftsResponse,
+    DecisionForDraftsWithActionsResponse,
+    DecisionIdView,
+    DraftActionsCallback,
+    GetDecisionResponse,
+    TaskDraftActionsProjectRequest,
+    TaskDraftActionsRequest,
+)
 from src.observability.runlog import RunContext
 from src.tools.kimeboard_api_tools import KimeboardApiToolset
-from src.utils.limits import MAX_ACTIONS_TOTAL, MAX_EXEC_ACTIONS, MAX_PREP_ACTIONS
+from src.utils.limits import (
+    MAX_ACTIONS_TOTAL,
+    MAX_BULK_ACTIONS,
+    MAX_EXEC_ACTIONS,
+    MAX_PREP_ACTIONS,
+    MAX_PROJECT_DECISIONS,
+)
+
+
+_ACTIONABLE_STATUSES = {"NEEDS_INFO", "READY_TO_DECIDE", "REOPEN"}
+
+
+def _bulk_chunks(pending: list[tuple[str, list[dict[str, Any]]]], max_actions: int):
+    # a decision's drafts are never split across requests
+    chunk: list[tuple[str, list[dict[str, Any]]]] = []
+    size = 0
+    for decision_id, actions in pending:
+        if chunk and size + len(actions) > max_actions:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((decision_id, actions))
+        size += len(actions)
+    if chunk:
+        yield chunk
 
 
 class DraftActionsSkillWorkflow:
@@ -18,10 +51,12 @@ class DraftActionsSkillWorkflow:
 
     async def run(self, task: TaskDraftActionsRequest, run: RunContext) -> dict[str, Any]:
         try:
-            decision_res = await self.tools.get_decision(task.projectId, task.decisionId)
+            with run.step("fetch_decision"):
+                decision_res = await self.tools.get_decision(task.projectId, task.decisionId, DecisionForDraftsResponse)
             decision = decision_res.decision
 
-            drafts = self._build_action_drafts(decision)
+            with run.step("build_drafts"):
+                drafts = self._build_action_drafts(decision)
 
             callback = DraftActionsCallback(
                 projectId=task.projectId,
@@ -31,9 +66,11 @@ class DraftActionsSkillWorkflow:
                 status="SUCCEEDED",
                 decisionId=task.decisionId,
                 draftActions=drafts,
+                meta=run.callback_meta(),
             )
 
-            out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
+            with run.step("post_callback"):
+                out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
             self.logger.info(
                 "draft_actions_succeeded",
                 run_id=run.run_id,
@@ -43,20 +80,141 @@ class DraftActionsSkillWorkflow:
             )
 
             return {"ok": True, "runId": run.run_id, "actions": len(drafts), "callback": out}
-        except Exception as exc:  # noqa: BLE001
+        except (Exception, asyncio.CancelledError) as exc:  # noqa: BLE001
+            # cancellation (deadline or caller gone) still reports FAILED before propagating
             self.logger.exception("draft_actions_failed", run_id=run.run_id, project_id=task.projectId)
-            failed = DraftActionsCallback(
-                projectId=task.projectId,
-                runId=run.run_id,
-                idempotencyKey=task.idempotencyKey,
-                kind="draft_actions_skill",
-                status="FAILED",
-                decisionId=task.decisionId,
+            await self.report_failed(task, run, str(exc) or type(exc).__name__)
+            raise
+
+    async def report_failed(self, task: TaskDraftActionsRequest, run: RunContext, error: str) -> None:
+        failed = DraftActionsCallback(
+            projectId=task.projectId,
+            runId=run.run_id,
+            idempotencyKey=task.idempotencyKey,
+            kind="draft_actions_skill",
+            status="FAILED",
+            decisionId=task.decisionId,
+            error=error,
+            draftActions=[],
+            meta=run.callback_meta(),
+        )
+        await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+
+    async def run_project(self, task: TaskDraftActionsProjectRequest, run: RunContext) -> dict[str, Any]:
+        statuses = set(task.statuses or _ACTIONABLE_STATUSES)
+        limit = min(task.limit or MAX_PROJECT_DECISIONS, MAX_PROJECT_DECISIONS)
+
+        # paged per status until `limit` actionable decisions are found or the project runs out
+        with run.step("list_decisions"):
+            listed = await self.tools.collect_decisions(task.projectId, sorted(statuses), limit, DecisionIdView)
+        decision_ids = list(dict.fromkeys(d.decisionId for d in listed))
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.draft_actions_concurrency))
+        by_decision: dict[str, dict[str, Any]] = {}
+
+        def _failed(decision_id: str, exc: Exception) -> None:
+            self.logger.warning(
+                "draft_actions_project_item_failed",
+                run_id=run.run_id,
+                project_id=task.projectId,
+                decision_id=decision_id,
                 error=str(exc),
-                draftActions=[],
             )
-            await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
-            raise
+            by_decision[decision_id] = {"decisionId": decision_id, "status": "FAILED", "error": str(exc), "actions": 0}
+
+        async def _fetch_one(decision_id: str) -> DecisionForDraftsWithActionsResponse | None:
+            async with semaphore:
+                try:
+                    return await self.tools.get_decision(
+                        task.projectId, decision_id, DecisionForDraftsWithActionsResponse
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    _failed(decision_id, exc)
+                    return None
+
+        with run.step("fetch_decisions"):
+            fetched = await asyncio.gather(*[_fetch_one(decision_id) for decision_id in decision_ids])
+
+        pending: list[tuple[str, list[dict[str, Any]]]] = []
+        with run.step("build_drafts"):
+            for decision_id, decision_res in zip(decision_ids, fetched):
+                if decision_res is None:
+                    continue
+                if decision_res.actions:
+                    by_decision[decision_id] = {
+                        "decisionId": decision_id,
+                        "status": "SKIPPED",
+                        "reason": "has_actions",
+                        "actions": 0,
+                    }
+                    continue
+                drafts = self._build_action_drafts(decision_res.decision)
+                pending.append((decision_id, [self._to_create_action(d) for d in drafts]))
+
+        # every decision's drafts go out together: one bulk write per MAX_BULK_ACTIONS actions
+        with run.step("create_actions"):
+            for chunk in _bulk_chunks(pending, MAX_BULK_ACTIONS):
+                items = [{"decisionId": decision_id, "actions": actions} for decision_id, actions in chunk]
+                try:
+                    out = await self.tools.create_project_actions_bulk(task.projectId, items)
+                except Exception as exc:  # noqa: BLE001
+                    for decision_id, _ in chunk:
+                        _failed(decision_id, exc)
+                    continue
+                created = {item["decisionId"]: item.get("created") for item in out.get("results", [])}
+                for decision_id, actions in chunk:
+                    count = created.get(decision_id)
+                    by_decision[decision_id] = {
+                        "decisionId": decision_id,
+                        "status": "CREATED",
+                        "actions": len(actions) if count is None else count,
+                    }
+
+        results = [by_decision[decision_id] for decision_id in decision_ids]
+        counts = {"CREATED": 0, "SKIPPED": 0, "FAILED": 0}
+        for item in results:
+            counts[item["status"]] += 1
+
+        self.logger.info(
+            "draft_actions_project_succeeded",
+            run_id=run.run_id,
+            project_id=task.projectId,
+            decisions=len(results),
+            created=counts["CREATED"],
+            skipped=counts["SKIPPED"],
+            failed=counts["FAILED"],
+        )
+
+        return {
+            "ok": True,
+            "runId": run.run_id,
+            "decisions": len(results),
+            "created": counts["CREATED"],
+            "skipped": counts["SKIPPED"],
+            "failed": counts["FAILED"],
+            "results": list(results),
+        }
+
+    async def create_drafts_for(
+        self, project_id: str, decision_res: DecisionForDraftsWithActionsResponse | GetDecisionResponse
+    ) -> dict[str, Any]:
+        decision_id = decision_res.decision.decisionId
+        if decision_res.actions:
+            return {"decisionId": decision_id, "status": "SKIPPED", "reason": "has_actions", "actions": 0}
+
+        drafts = self._build_action_drafts(decision_res.decision)
+        out = await self.tools.create_actions_bulk(
+            project_id,
+            decision_id,
+            [self._to_create_action(d) for d in drafts],
+        )
+        return {"decisionId": decision_id, "status": "CREATED", "actions": out.get("created", len(drafts))}
+
+    def _to_create_action(self, draft: ActionDraft) -> dict[str, Any]:
+        body = draft.model_dump(mode="json", exclude_none=True, exclude={"assigneeDisplayName"})
+        if draft.assigneeDisplayName:
+            body["assignee"] = {"displayName": draft.assigneeDisplayName}
+        return body
 
     def _build_action_drafts(self, decision) -> list[ActionDraft]:
         prep: list[ActionDraft] = []
@@ -1,12 +1,15 @@
 ﻿from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import re
 import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from datetime import timezone
 from typing import Any
 
-from dateutil import parser as date_parser
-
 from src.agents.workflows.gap_questioner import generate_question_set
 from src.config import Settings
 from src.models.schemas import (
@@ -15,17 +18,51 @@ from src.models.schemas import (
     DecisionCompleteness,
     DecisionOption,
     DecisionRationale,
+    MeetingBlockRef,
     MeetingStructurerCallback,
     MeetingStructurerExtracted,
     QuestionSet,
     TaskMeetingStructurerRequest,
 )
+from src.observability import metrics
 from src.observability.runlog import RunContext
 from src.tools.kimeboard_api_tools import KimeboardApiToolset
 from src.utils.limits import MAX_MEETING_RAW_CHARS
 from src.utils.text import normalize_text, split_lines, truncate
 
 
+_LIST_SEPARATOR = re.compile(r"[、,/]")
+_NON_WORD = re.compile(r"\W+")
+_WHITESPACE = re.compile(r"\s+")
+
+_WARM_UP_MEMO = """決裁: warm-up
+選択肢: A, B
+基準: cost
+決裁者: owner
+期限: 2026-01-01
+理由+: fast"""
+
+
+def block_fingerprint(block: dict[str, Any]) -> str:
+    raw = json.dumps(block, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _StructuredBlock:
+    decision: AgentDecisionExtract
+    question_set: QuestionSet | None
+
+
+@dataclass
+class _BlockDelta:
+    emitted: list[_StructuredBlock]
+    unchanged_ids: list[str]
+    removed_ids: list[str]
+    blocks: list[MeetingBlockRef]
+    incremental: bool
+
+
 class MeetingStructurerWorkflow:
     def __init__(self, tools: KimeboardApiToolset, settings: Settings, logger) -> None:
         self.tools = tools
@@ -36,26 +73,24 @@ class MeetingStructurerWorkflow:
         try:
             await self._log(task, run, "meeting_structurer started")
 
-            meeting_res = await self.tools.get_meeting(task.projectId, task.meetingId)
+            with run.step("fetch_meeting"):
+                meeting_res = await self.tools.get_meeting(task.projectId, task.meetingId)
             meeting = meeting_res.meeting
             raw_text = truncate(normalize_text(meeting.raw.text or ""), MAX_MEETING_RAW_CHARS)
             await self._log(task, run, f"meeting fetched: {meeting.meetingId}")
 
-            candidate_res = await self.tools.list_candidate_decisions(task.projectId, self.settings.max_context_decisions)
+            with run.step("list_candidates"):
+                candidate_res = await self.tools.list_candidate_decisions(task.projectId, self.settings.max_context_decisions)
             candidates = candidate_res.decisions
             await self._log(task, run, f"candidate decisions fetched: {len(candidates)}")
 
-            extracted_with_missing = self._extract_from_text(raw_text, meeting.title, candidates)
-            extracted_decisions = [item["decision"] for item in extracted_with_missing]
-
-            question_sets: list[QuestionSet] = []
-            for item in extracted_with_missing:
-                decision_model = item["decision_model"]
-                qset = generate_question_set(decision_model)
-                if qset:
-                    qset.decisionRef.decisionId = item["decision"].decisionId
-                    qset.decisionRef.title = item["decision"].title
-                    question_sets.append(qset)
+            # the diff base lives with the meeting, so any instance sees what the API last applied
+            incremental = self.settings.meeting_incremental_enabled
+            base = meeting.extracted.blocks if incremental and meeting.extracted else None
+            with run.step("extract"):
+                delta = self._structure_changed(raw_text, meeting.title, candidates, base)
+                extracted_decisions = [entry.decision for entry in delta.emitted]
+                question_sets = [entry.question_set for entry in delta.emitted if entry.question_set]
 
             callback = MeetingStructurerCallback(
                 projectId=task.projectId,
@@ -67,34 +102,56 @@ class MeetingStructurerWorkflow:
                 extracted=MeetingStructurerExtracted(
                     decisions=extracted_decisions,
                     questionSets=question_sets,
+                    unchangedDecisionIds=delta.unchanged_ids if delta.incremental else None,
+                    removedDecisionIds=delta.removed_ids if delta.incremental else None,
+                    blocks=delta.blocks if incremental else None,
                 ),
+                meta=run.callback_meta(),
             )
 
-            out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
-            await self._log(task, run, f"callback posted, decisions={len(extracted_decisions)}, questions={len(question_sets)}")
+            with run.step("post_callback"):
+                out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
+            await self._log(
+                task,
+                run,
+                f"callback posted, decisions={len(extracted_decisions)}, questions={len(question_sets)}, "
+                f"unchanged={len(delta.unchanged_ids)}, removed={len(delta.removed_ids)}",
+            )
 
             return {
                 "ok": True,
                 "runId": run.run_id,
                 "decisions": len(extracted_decisions),
                 "questionSets": len(question_sets),
+                "unchanged": len(delta.unchanged_ids),
+                "removed": len(delta.removed_ids),
                 "callback": out,
             }
-        except Exception as exc:  # noqa: BLE001
+        except (Exception, asyncio.CancelledError) as exc:  # noqa: BLE001
+            # cancellation (deadline or caller gone) still reports FAILED before propagating
             self.logger.exception("meeting_structurer_failed", run_id=run.run_id, project_id=task.projectId)
-            failed = MeetingStructurerCallback(
-                projectId=task.projectId,
-                runId=run.run_id,
-                idempotencyKey=task.idempotencyKey,
-                kind="meeting_structurer",
-                status="FAILED",
-                meetingId=task.meetingId,
-                error=str(exc),
-                extracted=MeetingStructurerExtracted(decisions=[], questionSets=[]),
-            )
-            await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+            await self.report_failed(task, run, str(exc) or type(exc).__name__)
             raise
 
+    async def report_failed(self, task: TaskMeetingStructurerRequest, run: RunContext, error: str) -> None:
+        failed = MeetingStructurerCallback(
+            projectId=task.projectId,
+            runId=run.run_id,
+            idempotencyKey=task.idempotencyKey,
+            kind="meeting_structurer",
+            status="FAILED",
+            meetingId=task.meetingId,
+            error=error,
+            extracted=MeetingStructurerExtracted(decisions=[], questionSets=[]),
+            meta=run.callback_meta(),
+        )
+        await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+
+    def warm_up(self) -> None:
+        """Exercise the extraction path once so first-request latency excludes lazy imports and model setup."""
+        for item in self._extract_from_text(_WARM_UP_MEMO, "warm-up", []):
+            generate_question_set(item["decision_model"])
+
     async def _log(self, task: TaskMeetingStructurerRequest, run: RunContext, line: str) -> None:
         self.logger.info(
             "meeting_structurer_log",
@@ -108,71 +165,134 @@ class MeetingStructurerWorkflow:
         except Exception:  # noqa: BLE001
             self.logger.warning("meeting_log_post_failed", run_id=run.run_id, line=line)
 
+    def _structure_changed(
+        self,
+        raw_text: str,
+        meeting_title: str,
+        candidates: list[Any],
+        base: list[MeetingBlockRef] | None,
+    ) -> _BlockDelta:
+        """Structure only the blocks whose fingerprint is not in `base`.
+
+        Each base block can stand for one current block, so repeated blocks are all kept. A new
+        block whose title matches a base block left unmatched keeps that block's decisionId (an
+        edit); any other unseen block is new, and base blocks matched by neither are reported
+        as removed.
+        """
+        current = [(block_fingerprint(block), block) for block in self._meeting_blocks(raw_text, meeting_title)]
+        known = base or []
+        by_fingerprint: dict[str, deque[MeetingBlockRef]] = defaultdict(deque)
+        for ref in known:
+            by_fingerprint[ref.fingerprint].append(ref)
+        matches = [by_fingerprint[fp].popleft() if by_fingerprint.get(fp) else None for fp, _ in current]
+
+        edited: dict[str, MeetingBlockRef] = {}
+        for refs in by_fingerprint.values():
+            for ref in refs:
+                edited.setdefault(ref.title, ref)
+        blocks: list[MeetingBlockRef] = []
+        emitted: list[_StructuredBlock] = []
+        unchanged: list[str] = []
+        for (fingerprint, block), match in zip(current, matches):
+            title = self._norm(block["title"])
+            if match is not None:
+                decision_id = match.decisionId
+                unchanged.append(decision_id)
+                metrics.MEETING_BLOCKS.inc("unchanged")
+            else:
+                earlier = edited.pop(title, None)
+                item = self._structure_block(block, candidates, earlier.decisionId if earlier else None)
+                decision_id = item["decision"].decisionId
+                emitted.append(_StructuredBlock(decision=item["decision"], question_set=self._question_set(item)))
+                metrics.MEETING_BLOCKS.inc("changed" if earlier else "added")
+            blocks.append(MeetingBlockRef(fingerprint=fingerprint, decisionId=decision_id, title=title))
+
+        kept = {ref.decisionId for ref in blocks}
+        removed = [ref.decisionId for ref in known if ref.decisionId not in kept]
+        if removed:
+            metrics.MEETING_BLOCKS.inc("removed", amount=len(removed))
+        return _BlockDelta(
+            emitted=emitted,
+            unchanged_ids=list(dict.fromkeys(unchanged)),
+            removed_ids=list(dict.fromkeys(removed)),
+            blocks=blocks,
+            incremental=base is not None,
+        )
+
+    def _question_set(self, item: dict[str, Any]) -> QuestionSet | None:
+        qset = generate_question_set(item["decision_model"])
+        if qset:
+            qset.decisionRef.decisionId = item["decision"].decisionId
+            qset.decisionRef.title = item["decision"].title
+        return qset
+
     def _extract_from_text(self, raw_text: str, meeting_title: str, candidates: list[Any]) -> list[dict[str, Any]]:
+        return [self._structure_block(block, candidates) for block in self._meeting_blocks(raw_text, meeting_title)]
+
+    def _meeting_blocks(self, raw_text: str, meeting_title: str) -> list[dict[str, Any]]:
         blocks = self._extract_blocks(raw_text)
         if not blocks:
             blocks = [{"title": f"{meeting_title} の決裁", "notes": [truncate(raw_text, 280)]}]
+        return blocks
 
-        results: list[dict[str, Any]] = []
-        for block in blocks:
+    def _structure_block(self, block: dict[str, Any], candidates: list[Any], decision_id: str | None = None) -> dict[str, Any]:
+        if not decision_id:
             decision_id = self._match_existing_decision(block["title"], candidates)
-            if not decision_id:
-                decision_id = f"dcs_{uuid.uuid4().hex[:12]}"
-
-            options = [DecisionOption(label=o, recommended=(i == 0)) for i, o in enumerate(block.get("options", []))]
-            rationale = DecisionRationale(
-                pros=block.get("pros", []),
-                cons=block.get("cons", []),
-                conditions=block.get("conditions", []),
-            )
-
-            missing = self._missing_fields(
-                owner=block.get("owner"),
-                due_at=block.get("dueAt"),
-                criteria=block.get("criteria", []),
-                options=options,
-                rationale=rationale,
-            )
+        if not decision_id:
+            decision_id = f"dcs_{uuid.uuid4().hex[:12]}"
+
+        options = [DecisionOption(label=o, recommended=(i == 0)) for i, o in enumerate(block.get("options", []))]
+        rationale = DecisionRationale(
+            pros=block.get("pros", []),
+            cons=block.get("cons", []),
+            conditions=block.get("conditions", []),
+        )
 
-            extract = AgentDecisionExtract(
-                decisionId=decision_id,
-                title=block["title"],
-                summary=truncate(" ".join(block.get("notes", [])).strip(), 220) or None,
-                tags=block.get("tags") or None,
-                ownerDisplayName=block.get("owner"),
-                dueAt=block.get("dueAt"),
-                priority=self._infer_priority(block),
-                options=options or None,
-                criteria=block.get("criteria") or None,
-                assumptions=block.get("assumptions") or None,
-                reopenTriggers=block.get("reopenTriggers") or None,
-                rationale=rationale,
-            )
+        missing = self._missing_fields(
+            owner=block.get("owner"),
+            due_at=block.get("dueAt"),
+            criteria=block.get("criteria", []),
+            options=options,
+            rationale=rationale,
+        )
 
-            decision_model = Decision(
-                decisionId=decision_id,
-                projectId="project",
-                title=extract.title,
-                summary=extract.summary,
-                status="NEEDS_INFO" if missing else "READY_TO_DECIDE",
-                owner={"displayName": extract.ownerDisplayName} if extract.ownerDisplayName else None,
-                dueAt=extract.dueAt,
-                priority=extract.priority or "MEDIUM",
-                options=options,
-                criteria=extract.criteria,
-                assumptions=extract.assumptions or [],
-                reopenTriggers=extract.reopenTriggers or [],
-                rationale=rationale,
-                completeness=DecisionCompleteness(score=max(0, 100 - 20 * len(missing)), missingFields=missing),
-            )
+        extract = AgentDecisionExtract(
+            decisionId=decision_id,
+            title=block["title"],
+            summary=truncate(" ".join(block.get("notes", [])).strip(), 220) or None,
+            tags=block.get("tags") or None,
+            ownerDisplayName=block.get("owner"),
+            dueAt=block.get("dueAt"),
+            priority=self._infer_priority(block),
+            options=options or None,
+            criteria=block.get("criteria") or None,
+            assumptions=block.get("assumptions") or None,
+            reopenTriggers=block.get("reopenTriggers") or None,
+            rationale=rationale,
+        )
 
-            results.append({
-                "decision": extract,
-                "missing": missing,
-                "decision_model": decision_model,
-            })
+        decision_model = Decision(
+            decisionId=decision_id,
+            projectId="project",
+            title=extract.title,
+            summary=extract.summary,
+            status="NEEDS_INFO" if missing else "READY_TO_DECIDE",
+            owner={"displayName": extract.ownerDisplayName} if extract.ownerDisplayName else None,
+            dueAt=extract.dueAt,
+            priority=extract.priority or "MEDIUM",
+            options=options,
+            criteria=extract.criteria,
+            assumptions=extract.assumptions or [],
+            reopenTriggers=extract.reopenTriggers or [],
+            rationale=rationale,
+            completeness=DecisionCompleteness(score=max(0, 100 - 20 * len(missing)), missingFields=missing),
+        )
 
-        return results
+        return {
+            "decision": extract,
+            "missing": missing,
+            "decision_model": decision_model,
+        }
 
     def _extract_blocks(self, raw_text: str) -> list[dict[str, Any]]:
         lines = split_lines(raw_text)
@@ -258,12 +378,14 @@ class MeetingStructurerWorkflow:
         block["notes"].append(l)
 
     def _split_list(self, value: str) -> list[str]:
-        parts = re.split(r"[、,/]", value)
+        parts = _LIST_SEPARATOR.split(value)
         return [p.strip() for p in parts if p.strip()]
 
     def _to_iso(self, raw: str) -> str | None:
         if not raw:
             return None
+        from dateutil import parser as date_parser
+
         try:
             dt = date_parser.parse(raw)
             if dt.tzinfo is None:
@@ -310,12 +432,12 @@ class MeetingStructurerWorkflow:
                 return getattr(candidate, "decisionId", None)
 
         # loose match by token overlap
-        title_tokens = set(re.split(r"\W+", normalized_title)) - {"", "_"}
+        title_tokens = set(_NON_WORD.split(normalized_title)) - {"", "_"}
         best_score = 0.0
         best_id: str | None = None
         for candidate in candidates:
             c_title = self._norm(getattr(candidate, "title", ""))
-            c_tokens = set(re.split(r"\W+", c_title)) - {"", "_"}
+            c_tokens = set(_NON_WORD.split(c_title)) - {"", "_"}
             if not c_tokens:
                 continue
             score = len(title_tokens & c_tokens) / max(len(title_tokens | c_tokens), 1)
@@ -328,4 +450,4 @@ class MeetingStructurerWorkflow:
         return None
 
     def _norm(self, text: str) -> str:
-        return re.sub(r"\s+", "", text or "").lower()
+        return _WHITESPACE.sub("", text or "").lower()
@@ -1,18 +1,39 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import re
 from datetime import timezone
 from typing import Any
 
-from dateutil import parser as date_parser
-
 from src.config import Settings
-from src.models.schemas import ReplyIntegratorCallback, ReplyIntegratorPatch, TaskReplyIntegratorRequest
+from src.models.schemas import (
+    DecisionIdResponse,
+    ReplyIntegratorCallback,
+    ReplyIntegratorPatch,
+    TaskReplyIntegratorBatchRequest,
+    TaskReplyIntegratorRequest,
+)
 from src.observability.runlog import RunContext
 from src.tools.kimeboard_api_tools import KimeboardApiToolset
 from src.utils.text import split_lines
 
 
+_LIST_SEPARATOR = re.compile(r"[、,/]")
+_DATE_IN_TEXT = re.compile(r"(20\d{2}[-/]\d{1,2}[-/]\d{1,2})")
+
+
+def message_claim_key(message_id: str) -> str:
+    """Idempotency-store key of one answer message; single tasks and thread batches both claim it."""
+    return f"reply_integrator:{message_id}"
+
+
+def _batch_key(task: TaskReplyIntegratorBatchRequest, message_ids: list[str]) -> str:
+    # the callback covers only the messages this run claimed; a narrowed batch gets its own key
+    if task.idempotencyKey and message_ids == task.messageIds:
+        return task.idempotencyKey
+    return f"{task.threadId}:{','.join(message_ids)}"
+
+
 class ReplyIntegratorWorkflow:
     def __init__(self, tools: KimeboardApiToolset, settings: Settings, logger) -> None:
         self.tools = tools
@@ -21,12 +42,15 @@ class ReplyIntegratorWorkflow:
 
     async def run(self, task: TaskReplyIntegratorRequest, run: RunContext) -> dict[str, Any]:
         try:
-            decision_res = await self.tools.get_decision(task.projectId, task.decisionId)
-            message_res = await self.tools.get_message(task.threadId, task.messageId)
+            with run.step("fetch_decision"):
+                decision_res = await self.tools.get_decision(task.projectId, task.decisionId, DecisionIdResponse)
+            with run.step("fetch_message"):
+                message_res = await self.tools.get_message(task.threadId, task.messageId)
 
             decision = decision_res.decision
             message = message_res.message
-            patch = self._build_patch(decision, message)
+            with run.step("build_patch"):
+                patch = self._build_patch(decision, message)
 
             callback = ReplyIntegratorCallback(
                 projectId=task.projectId,
@@ -37,9 +61,11 @@ class ReplyIntegratorWorkflow:
                 decisionId=task.decisionId,
                 threadId=task.threadId,
                 appliedPatch=patch,
+                meta=run.callback_meta(),
             )
 
-            out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
+            with run.step("post_callback"):
+                out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
             self.logger.info(
                 "reply_integrator_succeeded",
                 run_id=run.run_id,
@@ -49,38 +75,120 @@ class ReplyIntegratorWorkflow:
             )
 
             return {"ok": True, "runId": run.run_id, "callback": out}
-        except Exception as exc:  # noqa: BLE001
+        except (Exception, asyncio.CancelledError) as exc:  # noqa: BLE001
+            # cancellation (deadline or caller gone) still reports FAILED before propagating
             self.logger.exception("reply_integrator_failed", run_id=run.run_id, project_id=task.projectId)
-            failed = ReplyIntegratorCallback(
+            await self.report_failed(task, run, str(exc) or type(exc).__name__)
+            raise
+
+    async def report_failed(self, task: TaskReplyIntegratorRequest, run: RunContext, error: str) -> None:
+        failed = ReplyIntegratorCallback(
+            projectId=task.projectId,
+            runId=run.run_id,
+            idempotencyKey=task.idempotencyKey or task.messageId,
+            kind="reply_integrator",
+            status="FAILED",
+            decisionId=task.decisionId,
+            threadId=task.threadId,
+            error=error,
+            appliedPatch=ReplyIntegratorPatch(),
+            meta=run.callback_meta(),
+        )
+        await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+
+    async def run_batch(
+        self, task: TaskReplyIntegratorBatchRequest, run: RunContext, message_ids: list[str] | None = None
+    ) -> dict[str, Any]:
+        """Fold several answer messages on one thread into a single patch and callback.
+
+        `message_ids` narrows the task to the messages this run claimed; the rest were
+        already integrated by an earlier delivery.
+        """
+        message_ids = message_ids or task.messageIds
+        idempotency_key = _batch_key(task, message_ids)
+        try:
+            with run.step("fetch_decision"):
+                decision_res = await self.tools.get_decision(task.projectId, task.decisionId, DecisionIdResponse)
+            with run.step("fetch_messages"):
+                message_res = await asyncio.gather(
+                    *(self.tools.get_message(task.threadId, message_id) for message_id in message_ids)
+                )
+
+            with run.step("build_patch"):
+                patch = self._build_consolidated_patch(decision_res.decision, [res.message for res in message_res])
+
+            callback = ReplyIntegratorCallback(
                 projectId=task.projectId,
                 runId=run.run_id,
-                idempotencyKey=task.idempotencyKey or task.messageId,
+                idempotencyKey=idempotency_key,
                 kind="reply_integrator",
-                status="FAILED",
+                status="SUCCEEDED",
                 decisionId=task.decisionId,
                 threadId=task.threadId,
-                error=str(exc),
-                appliedPatch=ReplyIntegratorPatch(),
+                messageIds=message_ids,
+                appliedPatch=patch,
+                meta=run.callback_meta(),
+            )
+
+            with run.step("post_callback"):
+                out = await self.tools.post_callback(callback.model_dump(mode="json", exclude_none=True))
+            self.logger.info(
+                "reply_integrator_batch_succeeded",
+                run_id=run.run_id,
+                project_id=task.projectId,
+                decision_id=task.decisionId,
+                messages=len(message_ids),
+                patch_fields=[k for k, v in patch.model_dump(exclude_none=True).items() if v not in (None, [], {})],
             )
-            await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+
+            return {"ok": True, "runId": run.run_id, "messageIds": message_ids, "callback": out}
+        except (Exception, asyncio.CancelledError) as exc:  # noqa: BLE001
+            self.logger.exception("reply_integrator_batch_failed", run_id=run.run_id, project_id=task.projectId)
+            await self.report_batch_failed(task, run, str(exc) or type(exc).__name__, message_ids)
             raise
 
-    def _build_patch(self, decision, message) -> ReplyIntegratorPatch:
+    async def report_batch_failed(
+        self, task: TaskReplyIntegratorBatchRequest, run: RunContext, error: str, message_ids: list[str] | None = None
+    ) -> None:
+        message_ids = message_ids or task.messageIds
+        failed = ReplyIntegratorCallback(
+            projectId=task.projectId,
+            runId=run.run_id,
+            idempotencyKey=_batch_key(task, message_ids),
+            kind="reply_integrator",
+            status="FAILED",
+            decisionId=task.decisionId,
+            threadId=task.threadId,
+            messageIds=message_ids,
+            error=error,
+            appliedPatch=ReplyIntegratorPatch(),
+            meta=run.callback_meta(),
+        )
+        await self.tools.post_callback(failed.model_dump(mode="json", exclude_none=True))
+
+    def warm_up(self) -> None:
+        """Prime the date parser and patch model before the first task."""
         patch: dict[str, Any] = {}
+        self._apply_from_free_text("owner: warm-up\n期限 2026-01-01\ncriteria: cost", patch)
+        ReplyIntegratorPatch.model_validate(patch)
 
-        answers = (message.metadata.answers if message.metadata else None) or []
-        for answer in answers:
-            field = self._field_from_qid(answer.qid)
-            value = answer.value
-            self._apply_answer(field, value, patch)
+    def _build_patch(self, decision, message) -> ReplyIntegratorPatch:
+        return self._build_consolidated_patch(decision, [message])
 
-        if not patch:
-            self._apply_from_free_text(message.content, patch)
+    def _build_consolidated_patch(self, decision, messages) -> ReplyIntegratorPatch:
+        patch: dict[str, Any] = {}
+        # the API replaces each field it is sent, so the last message to set a field wins,
+        # exactly as if the messages had been integrated one by one
+        for message in messages:
+            patch.update(self._message_patch(message))
 
         # guardrail for safe mode: keep patch minimal and explicit
         if self.settings.safe_mode and "options" in patch:
             patch["options"] = [opt for opt in patch["options"] if opt.get("label")]
 
+        # several messages may each list the same option; a single message's options pass through as sent
+        if len(messages) > 1 and "options" in patch:
+            patch["options"] = self._uniq_options(patch["options"])
         if "criteria" in patch:
             patch["criteria"] = self._uniq_list(patch["criteria"])
         if "assumptions" in patch:
@@ -91,6 +199,19 @@ class ReplyIntegratorWorkflow:
         # if still empty, no-op patch is valid
         return ReplyIntegratorPatch.model_validate(patch)
 
+    def _message_patch(self, message) -> dict[str, Any]:
+        patch: dict[str, Any] = {}
+
+        answers = (message.metadata.answers if message.metadata else None) or []
+        for answer in answers:
+            field = self._field_from_qid(answer.qid)
+            value = answer.value
+            self._apply_answer(field, value, patch)
+
+        if not patch:
+            self._apply_from_free_text(message.content, patch)
+        return patch
+
     def _field_from_qid(self, qid: str) -> str:
         # expected qid examples: owner:1, dueAt:1, criteria:1
         if ":" in qid:
@@ -145,7 +266,7 @@ class ReplyIntegratorWorkflow:
 
         for line in lines:
             if not patch.get("dueAt"):
-                match = re.search(r"(20\d{2}[-/]\d{1,2}[-/]\d{1,2})", line)
+                match = _DATE_IN_TEXT.search(line)
                 if match:
                     iso = self._to_iso(match.group(1))
                     if iso:
@@ -166,9 +287,11 @@ class ReplyIntegratorWorkflow:
                     patch.setdefault("options", []).append({"label": item})
 
     def _split_inline(self, value: str) -> list[str]:
-        return [x.strip() for x in re.split(r"[、,/]", value) if x.strip()]
+        return [x.strip() for x in _LIST_SEPARATOR.split(value) if x.strip()]
 
     def _to_iso(self, raw: str) -> str | None:
+        from dateutil import parser as date_parser
+
         try:
             dt = date_parser.parse(raw)
             if dt.tzinfo is None:
@@ -177,6 +300,17 @@ class ReplyIntegratorWorkflow:
         except Exception:  # noqa: BLE001
             return None
 
+    def _uniq_options(self, options: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        seen: set[str] = set()
+        out: list[dict[str, Any]] = []
+        for opt in options:
+            label = str(opt.get("label") or "").strip()
+            if label and label in seen:
+                continue
+            seen.add(label)
+            out.append(opt)
+        return out
+
     def _uniq_list(self, items: list[str]) -> list[str]:
         seen: set[str] = set()
         out: list[str] = []
@@ -0,0 +1,237 @@
+﻿from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+
+from src.observability.runlog import RunContext, current_run, now_iso
+
+CASSETTE_VERSION = 1
+REDACTED = "[REDACTED]"
+# differ on every run by construction; ignored when replayed writes are compared with recorded ones
+VOLATILE_KEYS = frozenset({"runId", "meta"})
+# describe the wire body; the recorded response is re-wrapped already decoded
+_WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+Redactor = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+class CassetteMiss(LookupError):
+    """A replayed run made a request the cassette has no response for."""
+
+
+def redact_fields(names: Iterable[str]) -> Redactor:
+    """Redactor that masks the values of the given keys anywhere in the cassette."""
+    hidden = frozenset(n for n in names if n)
+
+    def _mask(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: REDACTED if k in hidden else _mask(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [_mask(v) for v in value]
+        return value
+
+    return _mask
+
+
+def _body(content: bytes) -> Any:
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _query(request: httpx.Request) -> list[list[str]]:
+    return sorted([k, v] for k, v in request.url.params.multi_items())
+
+
+def _match_key(method: str, path: str, query: list[list[str]]) -> tuple[str, str, str]:
+    return method, path, "&".join(f"{k}={v}" for k, v in query)
+
+
+class CassetteRecorder:
+    """Collects the upstream traffic of each run and writes it to `<directory>/<runId>.json`.
+
+    Only request/response bodies, paths and query strings are kept; headers (and with them
+    the callback token) never reach the file. `redactors` run over the whole cassette before
+    it is written.
+    """
+
+    def __init__(self, directory: str, logger, redactors: list[Redactor] | None = None) -> None:
+        self.directory = directory
+        self.logger = logger
+        self._redactors = redactors or []
+        self._active: dict[str, list[dict[str, Any]]] = {}
+
+    def interactions_for(self, run: RunContext | None) -> list[dict[str, Any]] | None:
+        return self._active.get(run.run_id) if run is not None else None
+
+    @asynccontextmanager
+    async def record(self, run: RunContext, task: Any) -> AsyncIterator[None]:
+        interactions = self._active[run.run_id] = []
+        try:
+            yield
+        finally:
+            self._active.pop(run.run_id, None)
+            cassette = {
+                "version": CASSETTE_VERSION,
+                "workflow": run.workflow,
+                "runId": run.run_id,
+                "recordedAt": now_iso(),
+                "task": task.model_dump(mode="json", exclude_none=True) if task is not None else None,
+                "interactions": interactions,
+            }
+            for redactor in self._redactors:
+                cassette = redactor(cassette)
+            try:
+                path = await asyncio.to_thread(save_cassette, self.directory, cassette)
+                self.logger.info("run_recorded", run_id=run.run_id, path=path, interactions=len(interactions))
+            except Exception:  # noqa: BLE001
+                self.logger.exception("run_record_write_failed", run_id=run.run_id)
+
+
+def save_cassette(directory: str, cassette: dict[str, Any]) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{cassette['runId']}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(cassette, fh, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def load_cassette(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        cassette = json.load(fh)
+    if cassette.get("version") != CASSETTE_VERSION:
+        raise ValueError(f"Unsupported cassette version in {path}: {cassette.get('version')}")
+    return cassette
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests through to `inner` and appends them to the current run's cassette."""
+
+    def __init__(self, recorder: CassetteRecorder, inner: httpx.AsyncBaseTransport | None = None) -> None:
+        self._recorder = recorder
+        self._inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        interactions = self._recorder.interactions_for(current_run())
+        response = await self._inner.handle_async_request(request)
+        if interactions is None:
+            return response
+        content = await response.aread()
+        interactions.append(
+            {
+                "method": request.method,
+                "path": request.url.path,
+                "query": _query(request),
+                "request": _body(request.content),
+                "status": response.status_code,
+                "response": _body(content),
+            }
+        )
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[(k, v) for k, v in response.headers.multi_items() if k.lower() not in _WIRE_HEADERS],
+            content=content,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers requests from a cassette without touching the network.
+
+    Requests are matched on method, path and query; repeated requests to the same URL get
+    the recorded responses in order, and the last one again once those run out. Every
+    request is kept in `sent` so replayed writes can be compared with the recorded ones.
+    """
+
+    def __init__(self, cassette: dict[str, Any]) -> None:
+        self._responses: dict[tuple[str, str, str], deque[dict[str, Any]]] = defaultdict(deque)
+        for interaction in cassette["interactions"]:
+            key = _match_key(interaction["method"], interaction["path"], interaction["query"])
+            self._responses[key].append(interaction)
+        self.sent: list[dict[str, Any]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        query = _query(request)
+        self.sent.append(
+            {"method": request.method, "path": request.url.path, "query": query, "request": _body(request.content)}
+        )
+        queue = self._responses.get(_match_key(request.method, request.url.path, query))
+        if not queue:
+            raise CassetteMiss(f"No recorded response for {request.method} {request.url}")
+        interaction = queue.popleft() if len(queue) > 1 else queue[0]
+        body = interaction["response"]
+        if body is None:
+            return httpx.Response(interaction["status"])
+        if isinstance(body, str):
+            return httpx.Response(interaction["status"], text=body)
+        return httpx.Response(interaction["status"], json=body)
+
+
+def _strings(value: Any, out: set[str]) -> set[str]:
+    if isinstance(value, dict):
+        for v in value.values():
+            _strings(v, out)
+    elif isinstance(value, list):
+        for v in value:
+            _strings(v, out)
+    elif isinstance(value, str):
+        out.add(value)
+    return out
+
+
+def compare_writes(
+    recorded: list[dict[str, Any]],
+    replayed: list[dict[str, Any]],
+    ignore: frozenset[str] = VOLATILE_KEYS,
+) -> list[str]:
+    """Differences between the non-GET requests of a recorded run and of its replay.
+
+    Keys in `ignore` are skipped and redacted values match anything. IDs the agent minted
+    itself (`*Id` values that no recorded response contains) may differ between runs, as
+    long as each recorded ID always maps to the same replayed one.
+    """
+    upstream: set[str] = set()
+    for interaction in recorded:
+        _strings(interaction["response"], upstream)
+    aliases: dict[str, str] = {}
+    problems: list[str] = []
+
+    def _same(old: Any, new: Any, where: str, key: str) -> None:
+        if old == REDACTED or old == new:
+            return
+        if isinstance(old, dict) and isinstance(new, dict):
+            for k in sorted((old.keys() | new.keys()) - ignore):
+                _same(old.get(k), new.get(k), f"{where}.{k}", k)
+            return
+        if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+            for n, (o, r) in enumerate(zip(old, new)):
+                _same(o, r, f"{where}[{n}]", key)
+            return
+        if key.endswith("Id") and isinstance(old, str) and isinstance(new, str) and old not in upstream:
+            if aliases.setdefault(old, new) == new:
+                return
+        problems.append(f"{where}: recorded {old!r}, replayed {new!r}")
+
+    old_writes = [i for i in recorded if i["method"] != "GET"]
+    new_writes = [i for i in replayed if i["method"] != "GET"]
+    if len(old_writes) != len(new_writes):
+        problems.append(f"recorded {len(old_writes)} writes, replayed {len(new_writes)}")
+    for n, (old, new) in enumerate(zip(old_writes, new_writes)):
+        if (old["method"], old["path"]) != (new["method"], new["path"]):
+            problems.append(f"write[{n}]: recorded {old['method']} {old['path']}, replayed {new['method']} {new['path']}")
+        else:
+            _same(old["request"], new["request"], f"{old['method']} {old['path']}", "")
+    return problems
@@ -1,18 +1,49 @@
 ﻿from __future__ import annotations
 
-from typing import Any
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator, Iterable
+from contextlib import aclosing
+from typing import Any, TypeVar
 
 import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from pydantic import BaseModel, TypeAdapter
 
 from src.api_client import endpoints as ep
+from src.api_client.hedging import HedgePolicy
 from src.auth.oidc import build_agent_token_header
 from src.models.schemas import (
+    CandidateDecisionsResponse,
+    Decision,
+    DecisionSummary,
+    DecisionTitle,
     GetDecisionResponse,
     GetMeetingResponse,
     GetMessageResponse,
     ListDecisionsResponse,
+    ListProjectsResponse,
+    PartialModel,
+    projection,
 )
+from src.observability import metrics
+from src.observability.runlog import current_run
+
+
+FINAL_CALL_GRACE_SECONDS = 5.0
+CANDIDATE_STATUSES = ("NEEDS_INFO", "READY_TO_DECIDE", "REOPEN")
+
+P = TypeVar("P", bound=PartialModel)
+R = TypeVar("R", bound=BaseModel)
+_LISTED_DECISION = TypeAdapter(DecisionSummary | Decision)
+_DONE = object()
+
+
+async def _next_or_done(stream: AsyncIterator[Any]) -> Any:
+    try:
+        return await anext(stream)
+    except StopAsyncIteration:
+        return _DONE
 
 
 class ApiClient:
@@ -21,23 +52,98 @@ class ApiClient:
         base_url: str,
         callback_token: str,
         timeout_seconds: float = 30.0,
+        hedging: HedgePolicy | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
     ) -> None:
         self._base_url = base_url.rstrip("/")
+        self._hedging = hedging
         self._callback_headers = build_agent_token_header(callback_token)
-        self._http = httpx.AsyncClient(timeout=timeout_seconds)
+        self._timeout_seconds = timeout_seconds
+        # cassette recording/replay swaps the transport; everything above it stays the same
+        self._http = httpx.AsyncClient(timeout=timeout_seconds, transport=transport)
 
     async def close(self) -> None:
         await self._http.aclose()
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.TransportError, httpx.HTTPStatusError)),
-        reraise=True,
-    )
-    async def _request(self, method: str, path: str, *, params: dict[str, Any] | None = None, json: Any = None, headers: dict[str, str] | None = None) -> Any:
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        route: str | None = None,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        # metrics are labelled with the path template so IDs do not explode label cardinality
+        endpoint = route or path
+        async for attempt in self._retrying(self._remaining_budget()):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    metrics.API_RETRIES.inc(method, endpoint)
+                return await self._send(method, path, endpoint, params=params, json=json, headers=headers)
+
+    def _retrying(self, remaining: float | None):
+        # tenacity is imported on first use rather than at module import (cold start); warm_up
+        # calls this once so the first task finds it loaded
+        from tenacity import (
+            AsyncRetrying,
+            retry_if_exception_type,
+            stop_after_attempt,
+            stop_before_delay,
+            wait_exponential,
+        )
+
+        stop = stop_after_attempt(3)
+        if remaining is not None:
+            # no retry that would start after the run's deadline
+            stop = stop | stop_before_delay(remaining)
+        return AsyncRetrying(
+            stop=stop,
+            wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
+            retry=retry_if_exception_type((httpx.TimeoutException, httpx.TransportError, httpx.HTTPStatusError)),
+            reraise=True,
+        )
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        endpoint: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
         url = self._base_url + path
-        resp = await self._http.request(method, url, params=params, json=json, headers=headers)
+        run = current_run()
+        if run is not None:
+            headers = {**(headers or {}), "traceparent": run.traceparent()}
+        timeout = self._timeout_seconds
+        remaining = self._remaining_budget()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        status = "error"
+        hedged = self._hedging is not None and method == "GET"
+        metrics.API_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            if hedged:
+                # each racing attempt is counted on its own in _hedged_get
+                resp = await self._hedged_get(url, endpoint, params=params, headers=headers, timeout=timeout)
+            else:
+                resp = await self._http.request(method, url, params=params, json=json, headers=headers, timeout=timeout)
+            status = str(resp.status_code)
+        finally:
+            metrics.API_IN_FLIGHT.dec()
+            if not hedged:
+                metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - started, method, endpoint)
+                metrics.API_REQUESTS.inc(method, endpoint, status)
+            if run is not None:
+                run.record_step(f"{method} {endpoint}", started, run.current_step())
+        if json is not None:
+            metrics.API_REQUEST_BYTES.observe(len(resp.request.content), endpoint)
+        metrics.API_RESPONSE_BYTES.observe(len(resp.content), endpoint)
         if resp.status_code in (429, 500, 502, 503, 504):
             resp.raise_for_status()
         resp.raise_for_status()
@@ -45,60 +151,227 @@ class ApiClient:
             return {}
         return resp.json()
 
+    async def _hedged_get(
+        self,
+        url: str,
+        endpoint: str,
+        *,
+        params: dict[str, Any] | None,
+        headers: dict[str, str] | None,
+        timeout: float,
+    ) -> httpx.Response:
+        """GET that races a second request if the first is slower than the endpoint's recent p95."""
+        policy = self._hedging
+        policy.record_request()
+        started = time.perf_counter()
+
+        async def _get() -> httpx.Response:
+            status = "error"
+            attempt_started = time.perf_counter()
+            try:
+                resp = await self._http.get(url, params=params, headers=headers, timeout=timeout)
+                status = str(resp.status_code)
+                return resp
+            except asyncio.CancelledError:
+                status = "cancelled"  # the other attempt won
+                raise
+            finally:
+                metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - attempt_started, "GET", endpoint)
+                metrics.API_REQUESTS.inc("GET", endpoint, status)
+
+        def _attempt() -> asyncio.Task:
+            return asyncio.create_task(_get())
+
+        primary = _attempt()
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=policy.delay(endpoint))
+            if not done and policy.try_hedge():
+                metrics.API_HEDGES.inc(endpoint, "issued")
+                pending.add(_attempt())
+            while True:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    # a failed attempt only decides the outcome if nothing else is still running
+                    if task.exception() is None or not pending:
+                        resp = task.result()
+                        if task is not primary:
+                            metrics.API_HEDGES.inc(endpoint, "won")
+                        policy.observe(endpoint, time.perf_counter() - started)
+                        return resp
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _remaining_budget(self) -> float | None:
+        run = current_run()
+        remaining = run.remaining() if run is not None else None
+        if remaining is None:
+            return None
+        # past the deadline only the FAILED callback is still sent; give it a short final window
+        return remaining if remaining > 0 else FINAL_CALL_GRACE_SECONDS
+
+    async def warm_up(self) -> None:
+        """Load the retry machinery and open a pooled connection to the API before the first task arrives."""
+        # built, not run: a single probe without retries keeps startup fast when the API is down
+        self._retrying(None)
+        try:
+            await self._http.get(self._base_url + ep.PATH_HEALTHZ, timeout=2.0)
+        except httpx.HTTPError:
+            pass
+
+    async def list_projects(self) -> ListProjectsResponse:
+        data = await self._request("GET", ep.PATH_LIST_PROJECTS, route=ep.PATH_LIST_PROJECTS)
+        return ListProjectsResponse.model_validate(data)
+
     async def get_meeting(self, project_id: str, meeting_id: str) -> GetMeetingResponse:
         path = ep.PATH_GET_MEETING.format(project_id=project_id, meeting_id=meeting_id)
-        data = await self._request("GET", path)
+        data = await self._request("GET", path, route=ep.PATH_GET_MEETING)
         return GetMeetingResponse.model_validate(data)
 
-    async def list_candidate_decisions(self, project_id: str, limit: int = 10) -> ListDecisionsResponse:
+    async def list_decisions(self, project_id: str, limit: int = 20, status: str | None = None) -> ListDecisionsResponse:
         path = ep.PATH_LIST_DECISIONS.format(project_id=project_id)
-        data = await self._request("GET", path, params={"limit": limit})
-        parsed = ListDecisionsResponse.model_validate(data)
-        filtered = [d for d in parsed.decisions if getattr(d, "status", "") in {"NEEDS_INFO", "READY_TO_DECIDE", "REOPEN"}]
-        return ListDecisionsResponse(decisions=filtered[:limit])
+        params: dict[str, Any] = {"limit": limit}
+        if status:
+            params["status"] = status
+        data = await self._request("GET", path, route=ep.PATH_LIST_DECISIONS, params=params)
+        return ListDecisionsResponse.model_validate(data)
+
+    async def iter_decisions(
+        self,
+        project_id: str,
+        statuses: Iterable[str] | None = None,
+        page_size: int = 20,
+        view: type[P] | None = None,
+    ) -> AsyncIterator[P | DecisionSummary | Decision]:
+        """Page through a project's decisions, fetching the next page only when it is needed.
+
+        The API filters on a single status, so each status gets its own cursor-paged stream and
+        the streams are interleaved round-robin, advanced concurrently. Results are also filtered and de-duplicated
+        here, which covers APIs that ignore the filter. With a `view`, only its fields are
+        requested and validated. Close the iterator (`aclosing`) when stopping early.
+        """
+        wanted = tuple(dict.fromkeys(statuses or ()))
+        fields = None
+        if view is not None:
+            # status and decisionId are always needed for the filtering and de-duplication below
+            paths = dict.fromkeys(["decisionId", "status", *projection(view)])
+            fields = ",".join([*(f"decisions.{p}" for p in paths), "cursor"])
+        streams = [self._decision_pages(project_id, status, page_size, fields) for status in (wanted or (None,))]
+        seen: set[str] = set()
+        try:
+            while streams:
+                # advance every stream at once so the statuses' page requests overlap
+                round_ = await asyncio.gather(*(_next_or_done(stream) for stream in streams), return_exceptions=True)
+                for result in round_:
+                    if isinstance(result, BaseException):
+                        raise result
+                streams = [stream for stream, raw in zip(streams, round_) if raw is not _DONE]
+                for raw in round_:
+                    if raw is _DONE:
+                        continue
+                    if (wanted and raw.get("status") not in wanted) or raw.get("decisionId") in seen:
+                        continue
+                    seen.add(raw.get("decisionId"))
+                    yield view.model_validate(raw) if view is not None else _LISTED_DECISION.validate_python(raw)
+        finally:
+            for stream in streams:
+                await stream.aclose()
 
-    async def get_decision(self, project_id: str, decision_id: str) -> GetDecisionResponse:
+    async def _decision_pages(
+        self, project_id: str, status: str | None, page_size: int, fields: str | None
+    ) -> AsyncIterator[dict[str, Any]]:
+        path = ep.PATH_LIST_DECISIONS.format(project_id=project_id)
+        cursor: str | None = None
+        while True:
+            params: dict[str, Any] = {"limit": page_size}
+            if status:
+                params["status"] = status
+            if cursor:
+                params["cursor"] = cursor
+            if fields:
+                params["fields"] = fields
+            page = await self._request("GET", path, route=ep.PATH_LIST_DECISIONS, params=params)
+            decisions = page.get("decisions") or []
+            for decision in decisions:
+                yield decision
+            cursor = page.get("cursor")
+            if not cursor or not decisions:
+                return
+
+    async def collect_decisions(
+        self,
+        project_id: str,
+        statuses: Iterable[str] | None,
+        limit: int,
+        view: type[P] | None = None,
+    ) -> list[P | DecisionSummary | Decision]:
+        statuses = tuple(statuses or ())
+        # pages sized so that evenly spread statuses fill `limit` in one round of requests
+        page_size = max(1, math.ceil(limit / max(1, len(statuses))))
+        decisions: list[P | DecisionSummary | Decision] = []
+        if limit <= 0:
+            return decisions
+        async with aclosing(self.iter_decisions(project_id, statuses, page_size, view)) as stream:
+            async for decision in stream:
+                decisions.append(decision)
+                if len(decisions) >= limit:
+                    break
+        return decisions
+
+    async def list_candidate_decisions(self, project_id: str, limit: int = 10) -> CandidateDecisionsResponse:
+        decisions = await self.collect_decisions(project_id, CANDIDATE_STATUSES, limit, view=DecisionTitle)
+        return CandidateDecisionsResponse(decisions=decisions)
+
+    async def get_decision(self, project_id: str, decision_id: str, view: type[R] = GetDecisionResponse) -> R:
+        """Fetch a decision; a `PartialModel` view asks the API for only the fields it declares."""
         path = ep.PATH_GET_DECISION.format(project_id=project_id, decision_id=decision_id)
-        data = await self._request("GET", path)
-        return GetDecisionResponse.model_validate(data)
+        params = {"fields": ",".join(projection(view))} if issubclass(view, PartialModel) else None
+        data = await self._request("GET", path, route=ep.PATH_GET_DECISION, params=params)
+        return view.model_validate(data)
 
     async def get_message(self, thread_id: str, message_id: str) -> GetMessageResponse:
         path = ep.PATH_GET_MESSAGE.format(thread_id=thread_id, message_id=message_id)
-        data = await self._request("GET", path)
+        data = await self._request("GET", path, route=ep.PATH_GET_MESSAGE)
         return GetMessageResponse.model_validate(data)
 
     async def post_meeting_log(self, project_id: str, meeting_id: str, line: str) -> dict[str, Any]:
         path = ep.PATH_MEETING_LOG.format(project_id=project_id, meeting_id=meeting_id)
-        return await self._request("POST", path, json={"line": line})
+        return await self._request("POST", path, route=ep.PATH_MEETING_LOG, json={"line": line})
 
     async def post_callback(self, payload: dict[str, Any]) -> dict[str, Any]:
-        return await self._request("POST", ep.PATH_CALLBACK, json=payload, headers=self._callback_headers)
+        return await self._request("POST", ep.PATH_CALLBACK, route=ep.PATH_CALLBACK, json=payload, headers=self._callback_headers)
 
     async def create_decision(self, project_id: str, payload: dict[str, Any]) -> dict[str, Any]:
         path = ep.PATH_CREATE_DECISION.format(project_id=project_id)
-        return await self._request("POST", path, json=payload)
+        return await self._request("POST", path, route=ep.PATH_CREATE_DECISION, json=payload)
 
     async def patch_decision(self, project_id: str, decision_id: str, payload: dict[str, Any]) -> dict[str, Any]:
         path = ep.PATH_PATCH_DECISION.format(project_id=project_id, decision_id=decision_id)
-        return await self._request("PATCH", path, json=payload)
+        return await self._request("PATCH", path, route=ep.PATH_PATCH_DECISION, json=payload)
 
     async def link_meeting_to_decision(self, project_id: str, decision_id: str, meeting_id: str) -> dict[str, Any]:
         path = ep.PATH_LINK_MEETING.format(project_id=project_id, decision_id=decision_id)
-        return await self._request("POST", path, json={"meetingId": meeting_id})
+        return await self._request("POST", path, route=ep.PATH_LINK_MEETING, json={"meetingId": meeting_id})
 
     async def create_thread_if_needed(self, project_id: str, decision_id: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
         path = ep.PATH_CREATE_THREAD.format(project_id=project_id, decision_id=decision_id)
         body = payload or {"channel": "IN_APP"}
-        return await self._request("POST", path, json=body)
+        return await self._request("POST", path, route=ep.PATH_CREATE_THREAD, json=body)
 
     async def post_message(self, thread_id: str, payload: dict[str, Any]) -> dict[str, Any]:
         path = ep.PATH_POST_MESSAGE.format(thread_id=thread_id)
-        return await self._request("POST", path, json=payload)
+        return await self._request("POST", path, route=ep.PATH_POST_MESSAGE, json=payload)
 
     async def create_actions_bulk(self, project_id: str, decision_id: str, actions: list[dict[str, Any]]) -> dict[str, Any]:
         path = ep.PATH_ACTIONS_BULK.format(project_id=project_id, decision_id=decision_id)
-        return await self._request("POST", path, json={"actions": actions})
+        return await self._request("POST", path, route=ep.PATH_ACTIONS_BULK, json={"actions": actions})
+
+    async def create_project_actions_bulk(self, project_id: str, items: list[dict[str, Any]]) -> dict[str, Any]:
+        path = ep.PATH_PROJECT_ACTIONS_BULK.format(project_id=project_id)
+        return await self._request("POST", path, route=ep.PATH_PROJECT_ACTIONS_BULK, json={"items": items})
 
     async def notify_in_app(self, project_id: str, payload: dict[str, Any]) -> dict[str, Any]:
         path = ep.PATH_NOTIFY.format(project_id=project_id)
-        return await self._request("POST", path, json=payload)
+        return await self._request("POST", path, route=ep.PATH_NOTIFY, json=payload)
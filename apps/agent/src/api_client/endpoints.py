@@ -1,5 +1,7 @@
 ﻿API_ROOT = "/api"
 
+PATH_HEALTHZ = API_ROOT + "/healthz"
+PATH_LIST_PROJECTS = API_ROOT + "/projects"
 PATH_GET_MEETING = API_ROOT + "/projects/{project_id}/meetings/{meeting_id}"
 PATH_LIST_DECISIONS = API_ROOT + "/projects/{project_id}/decisions"
 PATH_GET_DECISION = API_ROOT + "/projects/{project_id}/decisions/{decision_id}"
@@ -11,5 +13,6 @@ PATH_POST_MESSAGE = API_ROOT + "/chat/threads/{thread_id}/messages"
 PATH_GET_MESSAGE = API_ROOT + "/chat/threads/{thread_id}/messages/{message_id}"
 PATH_MEETING_LOG = API_ROOT + "/projects/{project_id}/meetings/{meeting_id}/logs"
 PATH_ACTIONS_BULK = API_ROOT + "/projects/{project_id}/decisions/{decision_id}/actions/bulk"
+PATH_PROJECT_ACTIONS_BULK = API_ROOT + "/projects/{project_id}/actions/bulk"
 PATH_NOTIFY = API_ROOT + "/projects/{project_id}/notifications"
 PATH_CALLBACK = API_ROOT + "/internal/agent/callback"
@@ -0,0 +1,63 @@
+﻿from __future__ import annotations
+
+from collections import deque
+
+
+class HedgePolicy:
+    """Decides when a slow idempotent GET gets a second, racing request.
+
+    The hedge delay is the recent p95 latency of the endpoint once `min_samples` responses
+    have been seen (`fallback_delay` before that). Hedges draw from a token bucket that
+    every GET refills by `budget_ratio`, up to `burst` tokens, so hedges stay near
+    `budget_ratio` of recent GETs and a long quiet stretch cannot bank a hedge storm
+    for when the API slows down.
+    """
+
+    def __init__(
+        self,
+        fallback_delay: float = 0.5,
+        budget_ratio: float = 0.05,
+        min_samples: int = 50,
+        window: int = 500,
+        min_delay: float = 0.01,
+        burst: float = 10.0,
+    ) -> None:
+        self._fallback_delay = fallback_delay
+        self._budget_ratio = budget_ratio
+        self._min_samples = max(1, min_samples)
+        self._window = max(self._min_samples, window)
+        self._min_delay = min_delay
+        self._latencies: dict[str, deque[float]] = {}
+        self._delays: dict[str, float] = {}
+        self._burst = max(1.0, burst)
+        # one hedge of headroom so the first slow request can be hedged
+        self._tokens = 1.0
+        self._requests = 0
+        self._hedges = 0
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        samples = self._latencies.get(endpoint)
+        if samples is None:
+            samples = self._latencies[endpoint] = deque(maxlen=self._window)
+        samples.append(seconds)
+        # recompute the p95 every few samples rather than sorting on every request
+        if len(samples) >= self._min_samples and len(samples) % 10 == 0:
+            ordered = sorted(samples)
+            self._delays[endpoint] = max(self._min_delay, ordered[int(0.95 * (len(ordered) - 1))])
+
+    def delay(self, endpoint: str) -> float:
+        return self._delays.get(endpoint, self._fallback_delay)
+
+    def record_request(self) -> None:
+        self._requests += 1
+        self._tokens = min(self._burst, self._tokens + self._budget_ratio)
+
+    def try_hedge(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        self._hedges += 1
+        return True
+
+    def stats(self) -> dict[str, float | int]:
+        return {"requests": self._requests, "hedges": self._hedges}
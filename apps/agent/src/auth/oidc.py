@@ -1,6 +1,133 @@
-﻿from fastapi import HTTPException, Request
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
+﻿from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+import httpx
+from fastapi import HTTPException, Request
+
+
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+_GOOGLE_ISSUERS = {"accounts.google.com", "https://accounts.google.com"}
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _load_jwt():
+    # google-auth takes ~100 ms to import; start() loads it during lifespan, and only in OIDC mode
+    from google.auth import jwt
+
+    return jwt
+
+
+class OidcVerifier:
+    """Verifies Google-signed OIDC tokens against cached signing certs.
+
+    Certs are cached for their Cache-Control max-age and refreshed in the background;
+    verified claims are cached per token until `exp`, so the common case is a dict lookup.
+    Signature checks run in a worker thread to keep RSA off the event loop.
+    """
+
+    def __init__(
+        self,
+        audience: str | None,
+        certs_url: str = GOOGLE_OAUTH2_CERTS_URL,
+        http: httpx.AsyncClient | None = None,
+        max_cached_tokens: int = 1024,
+        default_max_age: float = 300.0,
+        refresh_margin: float = 60.0,
+    ) -> None:
+        self._audience = audience
+        self._certs_url = certs_url
+        self._http = http or httpx.AsyncClient(timeout=10.0)
+        self._owns_http = http is None
+        self._max_cached_tokens = max(1, max_cached_tokens)
+        self._default_max_age = default_max_age
+        self._refresh_margin = refresh_margin
+        self._certs: dict[str, str] = {}
+        self._certs_expire_at = 0.0
+        self._certs_fetched_at = 0.0
+        self._certs_lock = asyncio.Lock()
+        self._tokens: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._refresh_task: asyncio.Task | None = None
+        self._jwt = None
+
+    async def start(self) -> None:
+        self._jwt = _load_jwt()
+        await self._refresh_certs()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(), name="oidc-certs-refresh")
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._owns_http:
+            await self._http.aclose()
+
+    async def _refresh_certs(self) -> None:
+        resp = await self._http.get(self._certs_url)
+        resp.raise_for_status()
+        match = _MAX_AGE.search(resp.headers.get("cache-control", ""))
+        max_age = float(match.group(1)) if match else self._default_max_age
+        self._certs = resp.json()
+        self._certs_fetched_at = time.time()
+        self._certs_expire_at = self._certs_fetched_at + max_age
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            delay = max(self._certs_expire_at - time.time() - self._refresh_margin, 1.0)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh_certs()
+            except Exception:  # noqa: BLE001
+                # keep serving cached certs; _current_certs refetches once they expire
+                await asyncio.sleep(min(self._refresh_margin, 30.0))
+
+    def _certs_stale(self, kid: str | None) -> bool:
+        now = time.time()
+        if not self._certs or now >= self._certs_expire_at:
+            return True
+        # unknown kid usually means Google rotated keys; refetch at most every 30 s
+        return kid is not None and kid not in self._certs and now - self._certs_fetched_at > 30.0
+
+    async def _current_certs(self, kid: str | None) -> dict[str, str]:
+        if not self._certs_stale(kid):
+            return self._certs
+        async with self._certs_lock:
+            if self._certs_stale(kid):
+                await self._refresh_certs()
+        return self._certs
+
+    async def verify(self, token: str) -> dict[str, Any]:
+        cached = self._tokens.get(token)
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+
+        jwt = self._jwt or _load_jwt()
+        kid = jwt.decode_header(token).get("kid")
+        certs = await self._current_certs(kid)
+        claims = await asyncio.to_thread(self._decode, token, certs)
+
+        self._tokens[token] = (float(claims.get("exp", 0)), claims)
+        self._tokens.move_to_end(token)
+        while len(self._tokens) > self._max_cached_tokens:
+            self._tokens.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str, certs: dict[str, str]) -> dict[str, Any]:
+        jwt = self._jwt or _load_jwt()
+        # If audience is None, only issuer/signature/expiry are validated.
+        claims = dict(jwt.decode(token, certs=certs, audience=self._audience))
+        if claims.get("iss") not in _GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+        return claims
 
 
 def _bearer_token(request: Request) -> str:
@@ -10,7 +137,12 @@ def _bearer_token(request: Request) -> str:
     return auth.split(" ", 1)[1].strip()
 
 
-def verify_task_request(request: Request, mode: str, expected_token: str | None, audience: str | None) -> None:
+async def verify_task_request(
+    request: Request,
+    mode: str,
+    expected_token: str | None,
+    verifier: OidcVerifier | None = None,
+) -> None:
     auth_mode = (mode or "NONE").upper()
 
     if auth_mode == "NONE":
@@ -23,11 +155,11 @@ def verify_task_request(request: Request, mode: str, expected_token: str | None,
         return
 
     if auth_mode == "OIDC":
+        if verifier is None:
+            raise HTTPException(status_code=500, detail="OIDC verifier is not configured")
         token = _bearer_token(request)
-        req = google_requests.Request()
         try:
-            # If audience is None, google-auth validates issuer/signature only.
-            id_token.verify_oauth2_token(token, req, audience=audience)
+            await verifier.verify(token)
         except Exception as exc:  # noqa: BLE001
             raise HTTPException(status_code=401, detail=f"Invalid OIDC token: {exc}") from exc
         return
@@ -10,6 +10,10 @@ class Settings(BaseSettings):
     api_audience: str = Field(default="http://localhost:3001", alias="API_AUDIENCE")
     agent_callback_token: str = Field(default="", alias="AGENT_CALLBACK_TOKEN")
 
+    api_hedge_enabled: bool = Field(default=False, alias="API_HEDGE_ENABLED")
+    api_hedge_delay_ms: float = Field(default=500.0, alias="API_HEDGE_DELAY_MS")
+    api_hedge_budget_ratio: float = Field(default=0.05, alias="API_HEDGE_BUDGET_RATIO")
+
     task_auth_mode: str = Field(default="NONE", alias="TASK_AUTH_MODE")
     task_oidc_audience: str | None = Field(default=None, alias="TASK_OIDC_AUDIENCE")
     task_token: str | None = Field(default=None, alias="TASK_TOKEN")
@@ -25,7 +29,63 @@ class Settings(BaseSettings):
     temperature_questioner: float = Field(default=0.2, alias="TEMPERATURE_QUESTIONER")
     temperature_actions: float = Field(default=0.4, alias="TEMPERATURE_ACTIONS")
 
+    task_async_mode: bool = Field(default=False, alias="TASK_ASYNC_MODE")
+    task_async_workers: int = Field(default=4, alias="TASK_ASYNC_WORKERS")
+    task_async_queue_size: int = Field(default=100, alias="TASK_ASYNC_QUEUE_SIZE")
+    task_retry_after_seconds: int = Field(default=10, alias="TASK_RETRY_AFTER_SECONDS")
+    shutdown_drain_seconds: float = Field(default=8.0, alias="SHUTDOWN_DRAIN_SECONDS")
+    run_deadline_seconds: float = Field(default=0.0, alias="RUN_DEADLINE_SECONDS")
+
+    max_concurrent_runs: int = Field(default=8, alias="MAX_CONCURRENT_RUNS")
+    max_concurrent_runs_by_workflow: str = Field(default="", alias="MAX_CONCURRENT_RUNS_BY_WORKFLOW")
+    admission_max_waiting: int = Field(default=16, alias="ADMISSION_MAX_WAITING")
+    admission_wait_seconds: float = Field(default=5.0, alias="ADMISSION_WAIT_SECONDS")
+
+    scheduler_enabled: bool = Field(default=False, alias="SCHEDULER_ENABLED")
+    scheduler_slots: int = Field(default=8, alias="SCHEDULER_SLOTS")
+    scheduler_weights: str = Field(default="interactive=4,batch=1", alias="SCHEDULER_WEIGHTS")
+    scheduler_project_max_concurrency: int = Field(default=4, alias="SCHEDULER_PROJECT_MAX_CONCURRENCY")
+    scheduler_project_limits: str = Field(default="", alias="SCHEDULER_PROJECT_LIMITS")
+
+    idempotency_ttl_minutes: int = Field(default=180, alias="IDEMPOTENCY_TTL_MINUTES")
+    idempotency_max_entries: int = Field(default=100_000, alias="IDEMPOTENCY_MAX_ENTRIES")
+    idempotency_lease_seconds: float = Field(default=600.0, alias="IDEMPOTENCY_LEASE_SECONDS")
+    idempotency_backend: str = Field(default="MEMORY", alias="IDEMPOTENCY_BACKEND")
+    idempotency_sqlite_path: str = Field(default="/tmp/kimeboard-idempotency.db", alias="IDEMPOTENCY_SQLITE_PATH")
+    idempotency_redis_url: str = Field(default="redis://localhost:6379/0", alias="IDEMPOTENCY_REDIS_URL")
+
+    draft_actions_concurrency: int = Field(default=4, alias="DRAFT_ACTIONS_CONCURRENCY")
+    meeting_incremental_enabled: bool = Field(default=True, alias="MEETING_INCREMENTAL_ENABLED")
+
+    sweep_enabled: bool = Field(default=False, alias="SWEEP_ENABLED")
+    sweep_interval_seconds: float = Field(default=300.0, alias="SWEEP_INTERVAL_SECONDS")
+    sweep_jitter_seconds: float = Field(default=30.0, alias="SWEEP_JITTER_SECONDS")
+    sweep_budget_seconds: float = Field(default=60.0, alias="SWEEP_BUDGET_SECONDS")
+    sweep_concurrency: int = Field(default=4, alias="SWEEP_CONCURRENCY")
+    sweep_project_ids: str = Field(default="", alias="SWEEP_PROJECT_IDS")
+    sweep_state_path: str = Field(default=".sweep_state.json", alias="SWEEP_STATE_PATH")
+
+    warmup_enabled: bool = Field(default=True, alias="WARMUP_ENABLED")
+
+    loop_monitor_enabled: bool = Field(default=True, alias="LOOP_MONITOR_ENABLED")
+    loop_monitor_interval_ms: float = Field(default=100.0, alias="LOOP_MONITOR_INTERVAL_MS")
+    loop_stall_threshold_ms: float = Field(default=0.0, alias="LOOP_STALL_THRESHOLD_MS")
+
+    profiling_token: str | None = Field(default=None, alias="PROFILING_TOKEN")
+    profiling_dir: str = Field(default="/tmp/kimeboard-profiles", alias="PROFILING_DIR")
+    profiling_max_per_minute: int = Field(default=2, alias="PROFILING_MAX_PER_MINUTE")
+
+    memory_tracking_enabled: bool = Field(default=False, alias="MEMORY_TRACKING_ENABLED")
+    memory_trace_frames: int = Field(default=1, alias="MEMORY_TRACE_FRAMES")
+    admin_token: str | None = Field(default=None, alias="ADMIN_TOKEN")
+
+    api_cassette_dir: str | None = Field(default=None, alias="API_CASSETTE_DIR")
+    api_cassette_redact_fields: str = Field(default="", alias="API_CASSETTE_REDACT_FIELDS")
+
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_sample_rates: str = Field(default="", alias="LOG_SAMPLE_RATES")
+    log_rate_limits: str = Field(default="", alias="LOG_RATE_LIMITS")
+    log_queue_size: int = Field(default=10000, alias="LOG_QUEUE_SIZE")
     safe_mode: bool = Field(default=True, alias="SAFE_MODE")
 
 
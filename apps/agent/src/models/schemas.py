@@ -1,7 +1,7 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Literal
+from typing import Any, Literal, get_args
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
@@ -10,6 +10,28 @@ class ApiModel(BaseModel):
     model_config = ConfigDict(extra="allow")
 
 
+class PartialModel(ApiModel):
+    """A workflow's view of an API response: only the declared fields are requested and kept."""
+
+    model_config = ConfigDict(extra="ignore")
+
+
+def projection(model: type[BaseModel], prefix: str = "") -> list[str]:
+    """Dotted field paths a partial model reads (`decision.dueAt`); nested partial models expand."""
+    paths: list[str] = []
+    for name, info in model.model_fields.items():
+        nested = [arg for arg in (info.annotation, *get_args(info.annotation)) if _is_partial(arg)]
+        if nested:
+            paths.extend(projection(nested[0], f"{prefix}{name}."))
+        else:
+            paths.append(prefix + name)
+    return paths
+
+
+def _is_partial(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, PartialModel)
+
+
 class TaskMeetingStructurerRequest(ApiModel):
     projectId: str
     meetingId: str
@@ -24,24 +46,64 @@ class TaskReplyIntegratorRequest(ApiModel):
     idempotencyKey: str | None = None
 
 
+class TaskReplyIntegratorBatchRequest(ApiModel):
+    projectId: str
+    decisionId: str
+    threadId: str
+    messageIds: list[str] = Field(min_length=1)
+    idempotencyKey: str | None = None
+
+
 class TaskDraftActionsRequest(ApiModel):
     projectId: str
     decisionId: str
     idempotencyKey: str | None = None
 
 
+class TaskDraftActionsProjectRequest(ApiModel):
+    projectId: str
+    statuses: list[str] | None = None
+    limit: int | None = None
+    idempotencyKey: str | None = None
+
+
+class ProjectSummary(ApiModel):
+    projectId: str
+    name: str | None = None
+    status: str | None = None
+    lastDecisionUpdatedAt: str | None = None
+
+
+class ListProjectsResponse(ApiModel):
+    projects: list[ProjectSummary] = Field(default_factory=list)
+
+
 class MeetingRaw(ApiModel):
     storage: str | None = None
     text: str | None = None
     gcsUri: str | None = None
 
 
+class MeetingBlockRef(ApiModel):
+    """One structured memo block, as stored with the meeting for the next incremental run."""
+
+    fingerprint: str
+    decisionId: str
+    title: str  # normalized heading
+
+
+class MeetingExtractedState(ApiModel):
+    decisionIds: list[str] = Field(default_factory=list)
+    blocks: list[MeetingBlockRef] | None = None
+
+
 class Meeting(ApiModel):
     meetingId: str
     projectId: str
     title: str
     raw: MeetingRaw
     status: str
+    extracted: MeetingExtractedState | None = None
 
 
 class GetMeetingResponse(ApiModel):
@@ -102,6 +164,40 @@ class GetDecisionResponse(ApiModel):
     threadId: str | None = None
 
 
+class DecisionIdView(PartialModel):
+    decisionId: str
+
+
+class DecisionIdResponse(PartialModel):
+    # reply_integrator only checks that the decision exists
+    decision: DecisionIdView
+
+
+class DecisionForDrafts(PartialModel):
+    decisionId: str
+    dueAt: datetime | str | None = None
+    options: list[DecisionOption] = Field(default_factory=list)
+    completeness: DecisionCompleteness = Field(default_factory=DecisionCompleteness)
+
+
+class DecisionForDraftsResponse(PartialModel):
+    decision: DecisionForDrafts
+
+
+class DecisionForDraftsWithActionsResponse(DecisionForDraftsResponse):
+    actions: list[Action] = Field(default_factory=list)
+
+
+class DecisionTitle(PartialModel):
+    decisionId: str
+    title: str
+    status: str
+
+
+class CandidateDecisionsResponse(PartialModel):
+    decisions: list[DecisionTitle] = Field(default_factory=list)
+
+
 class DecisionSummary(ApiModel):
     decisionId: str
     title: str
@@ -192,6 +288,11 @@ class CallbackBase(ApiModel):
 class MeetingStructurerExtracted(ApiModel):
     decisions: list[AgentDecisionExtract] = Field(default_factory=list)
     questionSets: list[QuestionSet] = Field(default_factory=list)
+    # set on incremental re-runs: blocks left out because they did not change, and blocks gone from the memo
+    unchangedDecisionIds: list[str] | None = None
+    removedDecisionIds: list[str] | None = None
+    # every block of the memo as structured; stored with the meeting as the next run's diff base
+    blocks: list[MeetingBlockRef] | None = None
 
 
 class MeetingStructurerCallback(CallbackBase):
@@ -223,6 +324,8 @@ class ReplyIntegratorCallback(CallbackBase):
     kind: Literal["reply_integrator"]
     decisionId: str
     threadId: str
+    # thread batches only: the messages folded into appliedPatch, in order
+    messageIds: list[str] | None = None
     appliedPatch: ReplyIntegratorPatch = Field(default_factory=ReplyIntegratorPatch)
 
 
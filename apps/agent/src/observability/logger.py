@@ -1,19 +1,172 @@
-﻿import logging
+﻿import atexit
+import logging
+import logging.handlers
+import queue
+import random
 import sys
+import time
+from datetime import datetime, timezone
+
 import structlog
 
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _detach(value):
+    # the caller may mutate what it logged once the call returns; copy the containers it could
+    # still change and hand everything else (scalars, objects) to the writer thread as-is
+    if isinstance(value, dict):
+        return {key: _detach(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_detach(item) for item in value]
+    if type(value) is tuple:
+        return tuple(_detach(item) for item in value)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _record_timestamp(logger, method_name: str, event_dict: dict) -> dict:
+    # stdlib records are rendered on the writer thread; stamp them with when they were logged
+    record = event_dict.get("_record")
+    created = record.created if record is not None else time.time()
+    stamp = datetime.fromtimestamp(created, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    event_dict.setdefault("timestamp", stamp)
+    return event_dict
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread unformatted and drops them instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # JSON rendering happens on the listener thread; only snapshot what the caller could still change
+        if isinstance(record.msg, dict):
+            record.msg = {key: _detach(value) for key, value in record.msg.items()}
+        elif record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DeferredQueueHandler.dropped += 1
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # wait for room rather than failing when the queue is full at shutdown
+        self.queue.put(self._sentinel, timeout=5.0)
+
+
+class _EventSampler:
+    """structlog processor that samples and rate-limits chatty info/debug events by name."""
+
+    def __init__(self, sample_rates: dict[str, float], rate_limits: dict[str, float]) -> None:
+        self._sample_rates = sample_rates
+        self._rate_limits = rate_limits
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if method_name not in ("debug", "info"):
+            return event_dict
+        event = event_dict.get("event")
+        rate = self._sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            self._drop()
+        limit = self._rate_limits.get(event)
+        if limit is not None and not self._take(event, limit):
+            self._drop()
+        return event_dict
+
+    def _take(self, event: str, per_second: float) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.get(event, (per_second, now))
+        tokens = min(per_second, tokens + (now - last) * per_second)
+        if tokens < 1.0:
+            self._buckets[event] = (tokens, now)
+            return False
+        self._buckets[event] = (tokens - 1.0, now)
+        return True
+
+    @staticmethod
+    def _drop():
+        raise structlog.DropEvent
+
+
+def parse_event_rates(raw: str) -> dict[str, float]:
+    # "meeting_structurer_log=0.1,idempotent_skip=0.5"
+    rates: dict[str, float] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            rates[name.strip()] = float(value.strip())
+        except ValueError:
+            continue
+    return rates
+
+
+def _json_serializer():
+    try:
+        import orjson
+    except ImportError:
+        import json
+
+        return json.dumps
+
+    def _dumps(obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=kwargs.get("default") or str).decode()
+
+    return _dumps
+
+
+def configure_logging(
+    level: str = "INFO",
+    sample_rates: dict[str, float] | None = None,
+    rate_limits: dict[str, float] | None = None,
+    queue_size: int = 10000,
+) -> None:
+    """Route structlog and stdlib logging through a bounded queue to a writer thread.
+
+    The request path only builds the event dict and enqueues it; JSON rendering and the
+    stdout write happen on the listener thread. `shutdown_logging` flushes what is queued.
+    """
+    global _listener
+    shutdown_logging()
 
-def configure_logging(level: str = "INFO") -> None:
     numeric_level = getattr(logging, level.upper(), logging.INFO)
-    logging.basicConfig(level=numeric_level, format="%(message)s", stream=sys.stdout)
+    timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processor=structlog.processors.JSONRenderer(serializer=_json_serializer()),
+            foreign_pre_chain=[structlog.stdlib.add_log_level, _record_timestamp, structlog.processors.format_exc_info],
+        )
+    )
+    log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    _listener = _FlushingQueueListener(log_queue, writer, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(numeric_level)
 
     structlog.configure(
         processors=[
-            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            _EventSampler(sample_rates or {}, rate_limits or {}),
             structlog.processors.add_log_level,
+            timestamper,
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         wrapper_class=structlog.make_filtering_bound_logger(numeric_level),
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -21,5 +174,26 @@ def configure_logging(level: str = "INFO") -> None:
     )
 
 
+def shutdown_logging() -> None:
+    """Flush the queue and stop the writer thread; later records are written synchronously."""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+    root.handlers.extend(_listener.handlers)
+    _listener = None
+
+
+def dropped_log_records() -> int:
+    return _DeferredQueueHandler.dropped
+
+
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str):
     return structlog.get_logger(name)
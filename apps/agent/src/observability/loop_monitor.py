@@ -0,0 +1,97 @@
+﻿from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from src.observability import metrics
+from src.observability.runlog import RunContext
+
+
+def _run_id_in_stack(frame) -> str | None:
+    # the stalled callback runs inside some workflow coroutine; find the RunContext it holds
+    while frame is not None:
+        for value in frame.f_locals.values():
+            if isinstance(value, RunContext):
+                return value.run_id
+        frame = frame.f_back
+    return None
+
+
+class LoopLagMonitor:
+    """Measures event-loop scheduling delay and, optionally, reports callbacks that stall the loop.
+
+    A coroutine sleeps for `interval` and records how late it wakes up. With `stall_threshold`
+    set, a watchdog thread also checks the coroutine's heartbeat; when the loop has not run it
+    for longer than the threshold, the loop thread's current stack is logged with the runId
+    of the run it belongs to.
+    """
+
+    def __init__(self, interval: float, logger, stall_threshold: float | None = None) -> None:
+        self._interval = interval if not stall_threshold else min(interval, stall_threshold / 2)
+        self._stall_threshold = stall_threshold
+        self.logger = logger
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._loop = asyncio.get_running_loop()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample(), name="loop-lag-monitor")
+        if self._stall_threshold:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported = 0.0
+        while not self._stopped.wait(self._stall_threshold / 4):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self._interval
+            if stalled_for < self._stall_threshold or heartbeat == reported:
+                continue
+            reported = heartbeat  # one report per stall
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                # the metrics registry is single-threaded; count the stall on the loop once it frees up
+                self._loop.call_soon_threadsafe(metrics.EVENT_LOOP_STALLS.inc)
+            except RuntimeError:  # loop already closed
+                pass
+            self.logger.warning(
+                "event_loop_stall",
+                stalled_ms=int(stalled_for * 1000),
+                run_id=_run_id_in_stack(frame),
+                stack="".join(traceback.format_stack(frame)),
+            )
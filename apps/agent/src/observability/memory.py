@@ -0,0 +1,116 @@
+﻿from __future__ import annotations
+
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from src.observability import metrics
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class _RunSample:
+    current: int
+    starts: int
+    shared: bool
+
+
+class MemoryTracker:
+    """tracemalloc accounting of runs, plus named heap snapshots for the admin endpoints.
+
+    tracemalloc is process-wide, so a run that overlaps another one is reported with
+    `mem_shared=true`: its peak and net bytes include the other runs' allocations.
+    """
+
+    def __init__(self, frames: int = 1, max_snapshots: int = 8) -> None:
+        self._frames = max(1, frames)
+        self._max_snapshots = max(1, max_snapshots)
+        self._snapshots: OrderedDict[str, tracemalloc.Snapshot] = OrderedDict()
+        self._active = 0
+        self._starts = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+
+    def stop(self) -> None:
+        self._snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def begin(self) -> _RunSample:
+        if self._active == 0:
+            tracemalloc.reset_peak()
+        self._active += 1
+        self._starts += 1
+        current, _ = tracemalloc.get_traced_memory()
+        return _RunSample(current=current, starts=self._starts, shared=self._active > 1)
+
+    def end(self, sample: _RunSample, workflow: str) -> dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        self._active -= 1
+        peak_bytes = max(0, peak - sample.current)
+        metrics.WORKFLOW_RUN_PEAK_BYTES.observe(peak_bytes, workflow)
+        return {
+            "mem_peak_bytes": peak_bytes,
+            "mem_net_bytes": current - sample.current,
+            "mem_shared": sample.shared or self._starts != sample.starts,
+        }
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def snapshot(self, name: str) -> dict[str, Any]:
+        snap = self._take()
+        self._snapshots.pop(name, None)
+        self._snapshots[name] = snap
+        while len(self._snapshots) > self._max_snapshots:
+            self._snapshots.popitem(last=False)
+        return {"name": name, "tracedBytes": sum(stat.size for stat in snap.statistics("filename"))}
+
+    def snapshot_names(self) -> list[str]:
+        return list(self._snapshots)
+
+    def top(self, limit: int = 25, group_by: str = "lineno") -> dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        stats = self._take().statistics(group_by)
+        return {
+            "tracedBytes": current,
+            "peakBytes": peak,
+            "top": [
+                {"site": _site(stat.traceback), "sizeBytes": stat.size, "count": stat.count}
+                for stat in stats[:limit]
+            ],
+        }
+
+    def diff(self, base: str, target: str | None = None, limit: int = 25, group_by: str = "lineno") -> dict[str, Any]:
+        """Compare snapshot `base` with `target`, or with the live heap when `target` is None."""
+        old = self._snapshots[base]
+        new = self._snapshots[target] if target else self._take()
+        stats = new.compare_to(old, group_by)
+        return {
+            "base": base,
+            "target": target or "now",
+            "sizeDiffBytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "site": _site(stat.traceback),
+                    "sizeDiffBytes": stat.size_diff,
+                    "countDiff": stat.count_diff,
+                    "sizeBytes": stat.size,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
@@ -0,0 +1,220 @@
+﻿"""In-process metrics registry rendered in the Prometheus text format.
+
+Everything runs on the event loop thread, so updates are plain dict/float operations
+without locks; a histogram observation is one bisect plus two additions.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+_INF = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+
+    def _key(self, labels: tuple[str, ...]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> list[str]: ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[key] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def _samples(self) -> list[str]:
+        lines: list[str] = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, _INF)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"metric {metric.name} already registered as {existing.kind}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+WORKFLOW_RUNS = REGISTRY.counter(
+    "kimeboard_workflow_runs_total", "Workflow runs by outcome.", ("workflow", "outcome")
+)
+WORKFLOW_RUN_SECONDS = REGISTRY.histogram(
+    "kimeboard_workflow_run_seconds", "Workflow run latency, admission wait excluded.", ("workflow",)
+)
+WORKFLOW_IN_FLIGHT = REGISTRY.gauge("kimeboard_workflow_in_flight", "Workflow runs executing now.", ("workflow",))
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "kimeboard_scheduler_wait_seconds", "Time a run waited for a fair-scheduler slot.", ("project", "class")
+)
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "kimeboard_api_request_seconds", "Kimeboard API latency per attempt.", ("method", "endpoint")
+)
+API_REQUESTS = REGISTRY.counter(
+    "kimeboard_api_requests_total", "Kimeboard API attempts by status.", ("method", "endpoint", "status")
+)
+API_RETRIES = REGISTRY.counter("kimeboard_api_retries_total", "Kimeboard API retry attempts.", ("method", "endpoint"))
+API_HEDGES = REGISTRY.counter(
+    "kimeboard_api_hedges_total", "Hedged GET requests issued and won by the hedge.", ("endpoint", "outcome")
+)
+API_IN_FLIGHT = REGISTRY.gauge("kimeboard_api_in_flight", "Kimeboard API requests awaiting a response.")
+API_REQUEST_BYTES = REGISTRY.histogram(
+    "kimeboard_api_request_bytes", "Request body size of Kimeboard API writes.", ("endpoint",), SIZE_BUCKETS
+)
+API_RESPONSE_BYTES = REGISTRY.histogram(
+    "kimeboard_api_response_bytes", "Response body size of Kimeboard API calls.", ("endpoint",), SIZE_BUCKETS
+)
+WORKFLOW_RUN_PEAK_BYTES = REGISTRY.histogram(
+    "kimeboard_workflow_run_peak_bytes",
+    "Peak traced allocation above the run's starting heap (memory tracking only).",
+    ("workflow",),
+    buckets=(2**16, 2**18, 2**20, 2**22, 2**24, 2**26, 2**28),
+)
+MEETING_BLOCKS = REGISTRY.counter(
+    "kimeboard_meeting_blocks_total", "Meeting decision blocks by change since the last structuring.", ("outcome",)
+)
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "kimeboard_event_loop_lag_seconds",
+    "How late the event loop ran a timer that was due.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_STALLS = REGISTRY.counter("kimeboard_event_loop_stalls_total", "Loop stalls longer than the threshold.")
+RUN_QUEUE_DEPTH = REGISTRY.gauge("kimeboard_run_queue_depth", "Runs waiting in the async run queue.")
+IDEMPOTENCY_ENTRIES = REGISTRY.gauge("kimeboard_idempotency_entries", "Keys held by the idempotency store.")
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "kimeboard_log_records_dropped_total", "Log records dropped because the log queue was full."
+)
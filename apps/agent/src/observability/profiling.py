@@ -0,0 +1,63 @@
+﻿from __future__ import annotations
+
+import asyncio
+import io
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class RunProfiler:
+    """Opt-in cProfile capture for a single run, written to `<directory>/<runId>.pstats`.
+
+    At most one run is profiled at a time (cProfile is per thread, so concurrent runs on the
+    event loop show up in the same profile) and at most `max_per_minute` runs per minute.
+    """
+
+    def __init__(self, directory: str, max_per_minute: int, logger) -> None:
+        self.directory = directory
+        self._max_per_minute = max(1, max_per_minute)
+        self._recent: list[float] = []
+        self._active = False
+        self.logger = logger
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self._recent = [t for t in self._recent if now - t < 60.0]
+        if self._active or len(self._recent) >= self._max_per_minute:
+            return False
+        self._recent.append(now)
+        self._active = True
+        return True
+
+    @asynccontextmanager
+    async def profile(self, run_id: str) -> AsyncIterator[None]:
+        """Profile the enclosed block; the caller must hold a slot from `try_acquire`."""
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._active = False
+            try:
+                path = await asyncio.to_thread(self._write, profiler, run_id)
+                self.logger.info("run_profiled", run_id=run_id, path=path)
+            except Exception:  # noqa: BLE001
+                self.logger.exception("run_profile_write_failed", run_id=run_id)
+
+    def _write(self, profiler, run_id: str) -> str:
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{run_id}.pstats")
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+        with open(os.path.join(self.directory, f"{run_id}.txt"), "w", encoding="utf-8") as fh:
+            fh.write(summary.getvalue())
+        return path
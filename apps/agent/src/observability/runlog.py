@@ -1,6 +1,24 @@
-﻿from dataclasses import dataclass
-from datetime import datetime, timezone
+﻿from __future__ import annotations
+
+import os
+import time
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from src.utils.limits import MAX_RUN_STEPS
+
+
+_current_run: ContextVar[RunContext | None] = ContextVar("kimeboard_run", default=None)
+_current_step: ContextVar[str | None] = ContextVar("kimeboard_step", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a run outlives its deadline budget."""
 
 
 def new_run_id(prefix: str = "run") -> str:
@@ -11,6 +29,10 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def current_run() -> RunContext | None:
+    return _current_run.get()
+
+
 @dataclass
 class RunContext:
     run_id: str
@@ -19,3 +41,66 @@ class RunContext:
     idempotency_key: str | None = None
     meeting_id: str | None = None
     decision_id: str | None = None
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started: float = field(default_factory=time.perf_counter)
+    # finished steps in completion order: {"name", "parent", "startMs", "durationMs"}
+    steps: list[dict[str, Any]] = field(default_factory=list)
+    # time.monotonic() value after which nobody waits for this run
+    deadline: float | None = None
+
+    def set_deadline(self, seconds: float | None) -> None:
+        if seconds and seconds > 0 and self.deadline is None:
+            self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    @contextmanager
+    def bind(self) -> Iterator[RunContext]:
+        """Make this run current so nested API calls record spans against it."""
+        token = _current_run.set(self)
+        try:
+            yield self
+        finally:
+            _current_run.reset(token)
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        parent = _current_step.get()
+        token = _current_step.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_step.reset(token)
+            self.record_step(name, started, parent)
+
+    def record_step(self, name: str, started: float, parent: str | None = None) -> None:
+        if len(self.steps) >= MAX_RUN_STEPS:
+            return
+        self.steps.append(
+            {
+                "name": name,
+                "parent": parent,
+                "startMs": round((started - self.started) * 1000, 1),
+                "durationMs": round((time.perf_counter() - started) * 1000, 1),
+            }
+        )
+
+    def current_step(self) -> str | None:
+        return _current_step.get()
+
+    def step_durations(self) -> dict[str, float]:
+        totals: dict[str, float] = {}
+        for item in self.steps:
+            totals[item["name"]] = round(totals.get(item["name"], 0.0) + item["durationMs"], 1)
+        return totals
+
+    def traceparent(self) -> str:
+        # W3C Trace Context; each outbound request gets its own parent span id
+        return f"00-{self.trace_id}-{os.urandom(8).hex()}-01"
+
+    def callback_meta(self) -> dict[str, Any]:
+        return {"traceId": self.trace_id, "steps": list(self.steps)}
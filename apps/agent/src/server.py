@@ -1,49 +1,231 @@
 ﻿from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import time
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from src.agents.admission import AdmissionController, AdmissionRejected, parse_limits
 from src.agents.root_agent import KimeboardRootAgent
+from src.agents.run_queue import QueueFullError, RunQueue
+from src.agents.scheduler import FairScheduler
+from src.agents.sweeper import DecisionSweeper
 from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
 from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
 from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow
+from src.api_client.cassette import CassetteRecorder, RecordingTransport, redact_fields
 from src.api_client.client import ApiClient
-from src.auth.oidc import verify_task_request
+from src.api_client.hedging import HedgePolicy
+from src.auth.oidc import OidcVerifier, verify_task_request
 from src.config import Settings, get_settings
 from src.models.schemas import (
+    TaskDraftActionsProjectRequest,
     TaskDraftActionsRequest,
     TaskMeetingStructurerRequest,
+    TaskReplyIntegratorBatchRequest,
     TaskReplyIntegratorRequest,
 )
-from src.observability.logger import configure_logging, get_logger
+from src.observability import metrics
+from src.observability.logger import (
+    configure_logging,
+    dropped_log_records,
+    get_logger,
+    parse_event_rates,
+    shutdown_logging,
+)
+from src.observability.loop_monitor import LoopLagMonitor
+from src.observability.memory import MemoryTracker
+from src.observability.profiling import RunProfiler
+from src.observability.runlog import DeadlineExceeded
 from src.tools.kimeboard_api_tools import KimeboardApiToolset
-from src.utils.idempotency import InMemoryIdempotencyStore
+from src.utils.idempotency import (
+    IdempotencyBackend,
+    InMemoryIdempotencyStore,
+    RedisIdempotencyBackend,
+    SqliteIdempotencyBackend,
+)
+
+
+DISCONNECT_POLL_SECONDS = 1.0
+
+
+def _idempotency_backend(settings: Settings) -> IdempotencyBackend | None:
+    mode = (settings.idempotency_backend or "MEMORY").upper()
+    if mode == "MEMORY":
+        return None
+    if mode == "SQLITE":
+        return SqliteIdempotencyBackend(
+            settings.idempotency_sqlite_path,
+            ttl_seconds=settings.idempotency_ttl_minutes * 60.0,
+        )
+    if mode == "REDIS":
+        return RedisIdempotencyBackend(
+            settings.idempotency_redis_url,
+            ttl_seconds=settings.idempotency_ttl_minutes * 60.0,
+        )
+    raise ValueError(f"Unsupported IDEMPOTENCY_BACKEND: {settings.idempotency_backend}")
 
 
 class AgentApp:
     def __init__(self, settings: Settings) -> None:
-        configure_logging(settings.log_level)
+        configure_logging(
+            settings.log_level,
+            sample_rates=parse_event_rates(settings.log_sample_rates),
+            rate_limits=parse_event_rates(settings.log_rate_limits),
+            queue_size=settings.log_queue_size,
+        )
         self.logger = get_logger("kimeboard-agent")
         self.settings = settings
 
+        self.recorder = (
+            CassetteRecorder(
+                settings.api_cassette_dir,
+                self.logger,
+                redactors=[redact_fields(f.strip() for f in settings.api_cassette_redact_fields.split(","))],
+            )
+            if settings.api_cassette_dir
+            else None
+        )
         self.client = ApiClient(
             base_url=settings.api_base_url,
             callback_token=settings.agent_callback_token,
+            hedging=(
+                HedgePolicy(
+                    fallback_delay=settings.api_hedge_delay_ms / 1000,
+                    budget_ratio=settings.api_hedge_budget_ratio,
+                )
+                if settings.api_hedge_enabled
+                else None
+            ),
+            transport=RecordingTransport(self.recorder) if self.recorder else None,
         )
         self.tools = KimeboardApiToolset(self.client)
-        self.idempotency = InMemoryIdempotencyStore(ttl_minutes=180)
+        self.oidc_verifier = (
+            OidcVerifier(audience=settings.task_oidc_audience)
+            if (settings.task_auth_mode or "").upper() == "OIDC"
+            else None
+        )
+        self.idempotency = InMemoryIdempotencyStore(
+            ttl_minutes=settings.idempotency_ttl_minutes,
+            max_entries=settings.idempotency_max_entries,
+            backend=_idempotency_backend(settings),
+        )
+
+        self.scheduler = (
+            FairScheduler(
+                slots=settings.scheduler_slots,
+                weights=parse_limits(settings.scheduler_weights),
+                project_limit=settings.scheduler_project_max_concurrency,
+                project_limits=parse_limits(settings.scheduler_project_limits),
+            )
+            if settings.scheduler_enabled
+            else None
+        )
+
+        # with the scheduler enabled it, not arrival order, picks the next queued async run
+        self.run_queue = (
+            RunQueue(
+                settings.task_async_workers,
+                settings.task_async_queue_size,
+                self.logger,
+                scheduler=self.scheduler,
+            )
+            if settings.task_async_mode
+            else None
+        )
+
+        self.admission = AdmissionController(
+            default_limit=settings.max_concurrent_runs,
+            max_waiting=settings.admission_max_waiting,
+            wait_seconds=settings.admission_wait_seconds,
+            limits=parse_limits(settings.max_concurrent_runs_by_workflow),
+        )
 
+        self.loop_monitor = (
+            LoopLagMonitor(
+                interval=settings.loop_monitor_interval_ms / 1000,
+                logger=self.logger,
+                stall_threshold=settings.loop_stall_threshold_ms / 1000 or None,
+            )
+            if settings.loop_monitor_enabled
+            else None
+        )
+        self.memory = MemoryTracker(frames=settings.memory_trace_frames) if settings.memory_tracking_enabled else None
+        self.profiler = (
+            RunProfiler(settings.profiling_dir, settings.profiling_max_per_minute, self.logger)
+            if settings.profiling_token
+            else None
+        )
+
+        draft_actions = DraftActionsSkillWorkflow(self.tools, settings, self.logger)
         self.root_agent = KimeboardRootAgent(
             meeting_structurer=MeetingStructurerWorkflow(self.tools, settings, self.logger),
             reply_integrator=ReplyIntegratorWorkflow(self.tools, settings, self.logger),
-            draft_actions=DraftActionsSkillWorkflow(self.tools, settings, self.logger),
+            draft_actions=draft_actions,
             idempotency_store=self.idempotency,
             logger=self.logger,
+            lease_seconds=settings.idempotency_lease_seconds,
+            run_queue=self.run_queue,
+            admission=self.admission,
+            profiler=self.profiler,
+            scheduler=self.scheduler,
+            memory=self.memory,
+            recorder=self.recorder,
         )
+        self.sweeper = (
+            DecisionSweeper(self.tools, draft_actions, settings, self.logger, idempotency_store=self.idempotency)
+            if settings.sweep_enabled
+            else None
+        )
+
+    async def startup(self) -> None:
+        if self.memory:
+            self.memory.start()
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        if self.oidc_verifier:
+            try:
+                await self.oidc_verifier.start()
+            except Exception:  # noqa: BLE001
+                # certs are fetched again on the first verification
+                self.logger.exception("oidc_certs_prefetch_failed")
+        if self.settings.warmup_enabled:
+            await self.warm_up()
+        if self.run_queue:
+            self.run_queue.start()
+        if self.sweeper:
+            self.sweeper.start()
+
+    async def warm_up(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.root_agent.meeting_structurer.warm_up()
+            self.root_agent.reply_integrator.warm_up()
+        except Exception:  # noqa: BLE001
+            self.logger.exception("warm_up_failed")
+        await self.client.warm_up()
+        self.logger.info("warm_up_completed", elapsed_ms=int((time.perf_counter() - started) * 1000))
 
     async def shutdown(self) -> None:
+        if self.sweeper:
+            await self.sweeper.stop()
+        if self.run_queue:
+            await self.run_queue.drain(self.settings.shutdown_drain_seconds)
+        if self.oidc_verifier:
+            await self.oidc_verifier.close()
         await self.client.close()
+        if self.loop_monitor:
+            await self.loop_monitor.stop()
+        close_backend = getattr(self.idempotency.backend, "close", None)
+        if close_backend:
+            close_backend()
+        if self.memory:
+            self.memory.stop()
+        shutdown_logging()
 
 
 @asynccontextmanager
@@ -51,6 +233,7 @@ async def lifespan(app: FastAPI):
     settings = get_settings()
     state = AgentApp(settings)
     app.state.agent = state
+    await state.startup()
     try:
         yield
     finally:
@@ -60,12 +243,85 @@ async def lifespan(app: FastAPI):
 app = FastAPI(title="kimeboard-agent", version="0.1.0", lifespan=lifespan)
 
 
-def _authorize_task(request: Request, settings: Settings) -> None:
-    verify_task_request(
+async def _authorize_task(request: Request, state: AgentApp) -> None:
+    await verify_task_request(
         request=request,
-        mode=settings.task_auth_mode,
-        expected_token=settings.task_token,
-        audience=settings.task_oidc_audience,
+        mode=state.settings.task_auth_mode,
+        expected_token=state.settings.task_token,
+        verifier=state.oidc_verifier,
+    )
+
+
+def _profile_requested(request: Request, state: AgentApp) -> bool:
+    got = request.headers.get("x-profile-token")
+    expected = state.settings.profiling_token
+    if got is None or not expected:
+        # with profiling disabled the header is ignored rather than failing the task
+        return False
+    if not hmac.compare_digest(got, expected):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+    return True
+
+
+def _authorize_admin(request: Request, state: AgentApp) -> MemoryTracker:
+    expected = state.settings.admin_token
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not found")
+    got = request.headers.get("x-admin-token") or ""
+    if not hmac.compare_digest(got, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if state.memory is None:
+        raise HTTPException(status_code=409, detail="Memory tracking is disabled")
+    return state.memory
+
+
+def _heap_group_by(group_by: str) -> str:
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="groupBy must be lineno, filename or traceback")
+    return group_by
+
+
+def _deadline_seconds(request: Request, settings: Settings) -> float | None:
+    budgets = [settings.run_deadline_seconds]
+    raw = request.headers.get("x-run-deadline-seconds")
+    if raw:
+        try:
+            budgets.append(float(raw))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="Invalid X-Run-Deadline-Seconds") from exc
+    positive = [b for b in budgets if b and b > 0]
+    return min(positive) if positive else None
+
+
+async def _until_disconnect(request: Request, run: Awaitable[dict]) -> dict:
+    """Await a synchronous run, cancelling it if the caller goes away first."""
+    task = asyncio.ensure_future(run)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+                raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def _accepted(out: dict):
+    if out.get("accepted"):
+        return JSONResponse(status_code=202, content=out)
+    return {"ok": True, **out}
+
+
+def _overloaded(exc: QueueFullError | AdmissionRejected, settings: Settings) -> HTTPException:
+    return HTTPException(
+        status_code=getattr(exc, "status_code", 503),
+        detail=str(exc),
+        headers={"Retry-After": str(settings.task_retry_after_seconds)},
     )
 
 
@@ -76,18 +332,43 @@ async def healthz(request: Request):
         "ok": True,
         "service": "kimeboard-agent",
         "taskAuthMode": state.settings.task_auth_mode,
+        "idempotency": await state.idempotency.stats(),
+        "admission": state.admission.stats(),
+        "scheduler": state.scheduler.stats() if state.scheduler else None,
+        "runQueueDepth": state.run_queue.depth if state.run_queue else 0,
     }
 
 
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    state: AgentApp = request.app.state.agent
+    # point-in-time gauges are sampled on scrape rather than on every change
+    metrics.RUN_QUEUE_DEPTH.set(state.run_queue.depth if state.run_queue else 0)
+    metrics.IDEMPOTENCY_ENTRIES.set((await state.idempotency.stats()).get("size", 0))
+    # drops are counted on whichever thread logged; the counter catches up with that total here
+    dropped = dropped_log_records() - metrics.LOG_RECORDS_DROPPED.value()
+    if dropped > 0:
+        metrics.LOG_RECORDS_DROPPED.inc(amount=dropped)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/tasks/meeting_structurer")
 async def task_meeting_structurer(payload: TaskMeetingStructurerRequest, request: Request):
     state: AgentApp = request.app.state.agent
-    _authorize_task(request, state.settings)
+    await _authorize_task(request, state)
+    profile = _profile_requested(request, state)
+    deadline = _deadline_seconds(request, state.settings)
     try:
-        out = await state.root_agent.run_meeting_structurer(payload)
+        if state.run_queue:
+            return _accepted(await state.root_agent.submit_meeting_structurer(payload, profile=profile, deadline_seconds=deadline))
+        out = await _until_disconnect(request, state.root_agent.run_meeting_structurer(payload, profile=profile, deadline_seconds=deadline))
         return {"ok": True, **out}
     except HTTPException:
         raise
+    except DeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except (QueueFullError, AdmissionRejected) as exc:
+        raise _overloaded(exc, state.settings) from exc
     except Exception as exc:  # noqa: BLE001
         state.logger.exception("task_meeting_structurer_failed")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -96,26 +377,121 @@ async def task_meeting_structurer(payload: TaskMeetingStructurerRequest, request
 @app.post("/tasks/reply_integrator")
 async def task_reply_integrator(payload: TaskReplyIntegratorRequest, request: Request):
     state: AgentApp = request.app.state.agent
-    _authorize_task(request, state.settings)
+    await _authorize_task(request, state)
+    profile = _profile_requested(request, state)
+    deadline = _deadline_seconds(request, state.settings)
     try:
-        out = await state.root_agent.run_reply_integrator(payload)
+        if state.run_queue:
+            return _accepted(await state.root_agent.submit_reply_integrator(payload, profile=profile, deadline_seconds=deadline))
+        out = await _until_disconnect(request, state.root_agent.run_reply_integrator(payload, profile=profile, deadline_seconds=deadline))
         return {"ok": True, **out}
     except HTTPException:
         raise
+    except DeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except (QueueFullError, AdmissionRejected) as exc:
+        raise _overloaded(exc, state.settings) from exc
     except Exception as exc:  # noqa: BLE001
         state.logger.exception("task_reply_integrator_failed")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.post("/tasks/reply_integrator_batch")
+async def task_reply_integrator_batch(payload: TaskReplyIntegratorBatchRequest, request: Request):
+    state: AgentApp = request.app.state.agent
+    await _authorize_task(request, state)
+    profile = _profile_requested(request, state)
+    deadline = _deadline_seconds(request, state.settings)
+    try:
+        if state.run_queue:
+            return _accepted(await state.root_agent.submit_reply_integrator_batch(payload, profile=profile, deadline_seconds=deadline))
+        out = await _until_disconnect(request, state.root_agent.run_reply_integrator_batch(payload, profile=profile, deadline_seconds=deadline))
+        return {"ok": True, **out}
+    except HTTPException:
+        raise
+    except DeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except (QueueFullError, AdmissionRejected) as exc:
+        raise _overloaded(exc, state.settings) from exc
+    except Exception as exc:  # noqa: BLE001
+        state.logger.exception("task_reply_integrator_batch_failed")
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
 @app.post("/tasks/draft_actions_skill")
 async def task_draft_actions_skill(payload: TaskDraftActionsRequest, request: Request):
     state: AgentApp = request.app.state.agent
-    _authorize_task(request, state.settings)
+    await _authorize_task(request, state)
+    profile = _profile_requested(request, state)
+    deadline = _deadline_seconds(request, state.settings)
     try:
-        out = await state.root_agent.run_draft_actions(payload)
+        if state.run_queue:
+            return _accepted(await state.root_agent.submit_draft_actions(payload, profile=profile, deadline_seconds=deadline))
+        out = await _until_disconnect(request, state.root_agent.run_draft_actions(payload, profile=profile, deadline_seconds=deadline))
         return {"ok": True, **out}
     except HTTPException:
         raise
+    except DeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except (QueueFullError, AdmissionRejected) as exc:
+        raise _overloaded(exc, state.settings) from exc
     except Exception as exc:  # noqa: BLE001
         state.logger.exception("task_draft_actions_failed")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.post("/tasks/draft_actions_project")
+async def task_draft_actions_project(payload: TaskDraftActionsProjectRequest, request: Request):
+    state: AgentApp = request.app.state.agent
+    await _authorize_task(request, state)
+    profile = _profile_requested(request, state)
+    deadline = _deadline_seconds(request, state.settings)
+    try:
+        if state.run_queue:
+            return _accepted(await state.root_agent.submit_draft_actions_project(payload, profile=profile, deadline_seconds=deadline))
+        out = await _until_disconnect(request, state.root_agent.run_draft_actions_project(payload, profile=profile, deadline_seconds=deadline))
+        return {"ok": True, **out}
+    except HTTPException:
+        raise
+    except DeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except (QueueFullError, AdmissionRejected) as exc:
+        raise _overloaded(exc, state.settings) from exc
+    except Exception as exc:  # noqa: BLE001
+        state.logger.exception("task_draft_actions_project_failed")
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str, request: Request):
+    state: AgentApp = request.app.state.agent
+    await _authorize_task(request, state)
+    record = state.run_queue.get(run_id) if state.run_queue else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"ok": True, "run": record.to_dict()}
+
+
+@app.get("/admin/heap")
+async def admin_heap(request: Request, limit: int = 25, groupBy: str = "lineno"):
+    memory = _authorize_admin(request, request.app.state.agent)
+    # snapshots walk every traced block; keep that off the event loop
+    heap = await asyncio.to_thread(memory.top, limit, _heap_group_by(groupBy))
+    return {"ok": True, "snapshots": memory.snapshot_names(), **heap}
+
+
+@app.post("/admin/heap/snapshots/{name}")
+async def admin_heap_snapshot(name: str, request: Request):
+    memory = _authorize_admin(request, request.app.state.agent)
+    return {"ok": True, **(await asyncio.to_thread(memory.snapshot, name))}
+
+
+@app.get("/admin/heap/diff")
+async def admin_heap_diff(request: Request, base: str, target: str | None = None, limit: int = 25, groupBy: str = "lineno"):
+    memory = _authorize_admin(request, request.app.state.agent)
+    names = memory.snapshot_names()
+    for name in (base, target):
+        if name and name not in names:
+            raise HTTPException(status_code=404, detail=f"Unknown snapshot: {name}")
+    diff = await asyncio.to_thread(memory.diff, base, target, limit, _heap_group_by(groupBy))
+    return {"ok": True, **diff}
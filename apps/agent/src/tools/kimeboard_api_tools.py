@@ -1,19 +1,33 @@
 ﻿from __future__ import annotations
 
+from collections.abc import Iterable
 from typing import Any
 
 from src.api_client.client import ApiClient
+from src.models.schemas import GetDecisionResponse
 
 
 class KimeboardApiToolset:
     def __init__(self, client: ApiClient) -> None:
         self.client = client
 
+    async def list_projects(self):
+        return await self.client.list_projects()
+
     async def get_meeting(self, project_id: str, meeting_id: str):
         return await self.client.get_meeting(project_id, meeting_id)
 
-    async def get_decision(self, project_id: str, decision_id: str):
-        return await self.client.get_decision(project_id, decision_id)
+    async def get_decision(self, project_id: str, decision_id: str, view=GetDecisionResponse):
+        return await self.client.get_decision(project_id, decision_id, view)
+
+    async def list_decisions(self, project_id: str, limit: int = 20, status: str | None = None):
+        return await self.client.list_decisions(project_id, limit, status)
+
+    def iter_decisions(self, project_id: str, statuses: Iterable[str] | None = None, page_size: int = 20, view=None):
+        return self.client.iter_decisions(project_id, statuses, page_size, view)
+
+    async def collect_decisions(self, project_id: str, statuses: Iterable[str] | None, limit: int, view=None):
+        return await self.client.collect_decisions(project_id, statuses, limit, view)
 
     async def list_candidate_decisions(self, project_id: str, limit: int = 10):
         return await self.client.list_candidate_decisions(project_id, limit)
@@ -42,6 +56,10 @@ class KimeboardApiToolset:
     async def create_actions_bulk(self, project_id: str, decision_id: str, actions: list[dict[str, Any]]):
         return await self.client.create_actions_bulk(project_id, decision_id, actions)
 
+    async def create_project_actions_bulk(self, project_id: str, items: list[dict[str, Any]]):
+        # items: [{"decisionId": ..., "actions": [...]}, ...]
+        return await self.client.create_project_actions_bulk(project_id, items)
+
     async def notify_in_app(self, project_id: str, payload: dict[str, Any]):
         return await self.client.notify_in_app(project_id, payload)
 
@@ -1,26 +1,530 @@
-﻿from datetime import datetime, timedelta, timezone
+﻿import asyncio
+import json
+import socket
+import sqlite3
+import ssl
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
 from threading import Lock
+from typing import Any, Literal, Protocol
+from urllib.parse import unquote, urlsplit
 
 
-class InMemoryIdempotencyStore:
-    def __init__(self, ttl_minutes: int = 120) -> None:
-        self._ttl = timedelta(minutes=ttl_minutes)
-        self._data: dict[str, datetime] = {}
+@dataclass(frozen=True)
+class ClaimResult:
+    status: Literal["claimed", "in_flight", "completed"]
+    result: dict[str, Any] | None = None
+    lease_remaining: float = 0.0
+    # fencing token of a granted claim; complete/release with it only act while the claim is still ours
+    token: str | None = None
+
+
+class IdempotencyBackend(Protocol):
+    """Storage behind InMemoryIdempotencyStore; claim must be atomic across all callers sharing the backend.
+
+    With a token, complete and release apply only if the key is still held under that token
+    (they return False otherwise); without one they apply unconditionally.
+    """
+
+    def claim(self, key: str, lease_seconds: float) -> ClaimResult: ...
+
+    def complete(self, key: str, result: str | None, token: str | None = None) -> bool: ...
+
+    def release(self, key: str, token: str | None = None) -> bool: ...
+
+    def contains(self, key: str) -> bool: ...
+
+    def purge_expired(self, limit: int = 1000) -> int: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+def _decode(result: str | None) -> dict[str, Any] | None:
+    return json.loads(result) if result else None
+
+
+def _new_token() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass
+class _Entry:
+    marked_at: float
+    lease_until: float | None = None
+    result: str | None = None
+    token: str | None = None
+
+
+class MemoryIdempotencyBackend:
+    """Keys kept in least-recently-used order: a read or write moves the key to the back.
+
+    Size eviction pops the front in O(1). Expiry also pops from the front and stops at the
+    first live key; an expired key behind it is dropped when it is read or reaches the front.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 100_000) -> None:
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._data: OrderedDict[str, _Entry] = OrderedDict()
         self._lock = Lock()
+        self._expired = 0
+        self._evicted = 0
+
+    def _expire(self, now: float, limit: int | None = None) -> int:
+        data = self._data
+        removed = 0
+        while data and (limit is None or removed < limit):
+            key, entry = next(iter(data.items()))
+            if now - entry.marked_at <= self._ttl:
+                break
+            data.popitem(last=False)
+            removed += 1
+        self._expired += removed
+        return removed
+
+    def _live(self, key: str, now: float) -> _Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if now - entry.marked_at > self._ttl:
+            del self._data[key]
+            self._expired += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
 
-    def _cleanup(self, now: datetime) -> None:
-        expired = [k for k, v in self._data.items() if now - v > self._ttl]
-        for key in expired:
-            self._data.pop(key, None)
+    def _put(self, key: str, entry: _Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+            self._evicted += 1
 
-    def seen(self, key: str) -> bool:
-        now = datetime.now(timezone.utc)
+    def claim(self, key: str, lease_seconds: float) -> ClaimResult:
+        now = time.monotonic()
         with self._lock:
-            self._cleanup(now)
-            return key in self._data
+            self._expire(now)
+            entry = self._live(key, now)
+            if entry is not None and entry.lease_until is None:
+                return ClaimResult(status="completed", result=_decode(entry.result))
+            if entry is not None and entry.lease_until > now:
+                return ClaimResult(status="in_flight", lease_remaining=entry.lease_until - now)
+            token = _new_token()
+            self._put(key, _Entry(marked_at=now, lease_until=now + lease_seconds, token=token))
+        return ClaimResult(status="claimed", lease_remaining=lease_seconds, token=token)
 
-    def mark(self, key: str) -> None:
-        now = datetime.now(timezone.utc)
+    def complete(self, key: str, result: str | None, token: str | None = None) -> bool:
+        now = time.monotonic()
         with self._lock:
-            self._cleanup(now)
-            self._data[key] = now
+            self._expire(now)
+            if token is not None:
+                entry = self._live(key, now)
+                if entry is None or entry.token != token:
+                    return False
+            self._put(key, _Entry(marked_at=now, result=result, token=token))
+        return True
+
+    def release(self, key: str, token: str | None = None) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.lease_until is None or (token is not None and entry.token != token):
+                return False
+            del self._data[key]
+        return True
+
+    def contains(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            return self._live(key, now) is not None
+
+    def purge_expired(self, limit: int = 1000) -> int:
+        with self._lock:
+            return self._expire(time.monotonic(), limit)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxEntries": self._max_entries,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+
+class SqliteIdempotencyBackend:
+    """SQLite (WAL) file shared by the processes of one host.
+
+    WAL relies on a shared-memory index, so the file must sit on a local disk: it is not
+    safe on network or mounted filesystems and cannot coordinate separate instances.
+    Expired rows are ignored on read and deleted in batches every `purge_every` writes.
+    """
+
+    # calls wait on disk and on other processes' locks; the store runs them in a worker thread
+    blocking = True
+
+    def __init__(self, path: str, ttl_seconds: float, purge_every: int = 256, purge_batch: int = 1000) -> None:
+        self._ttl = ttl_seconds
+        self._purge_every = max(1, purge_every)
+        self._purge_batch = purge_batch
+        self._writes = 0
+        self._expired = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY,"
+            " expires_at REAL NOT NULL,"
+            " lease_until REAL,"
+            " result TEXT,"
+            " token TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(idempotency)")}
+        if "token" not in columns:
+            # files created before claims carried fencing tokens
+            self._conn.execute("ALTER TABLE idempotency ADD COLUMN token TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idempotency_expires_at ON idempotency (expires_at)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _after_write(self) -> None:
+        self._writes += 1
+        if self._writes % self._purge_every == 0:
+            self._expired += self._purge(time.time(), self._purge_batch)
+
+    def _purge(self, now: float, limit: int) -> int:
+        cur = self._conn.execute(
+            "DELETE FROM idempotency WHERE rowid IN"
+            " (SELECT rowid FROM idempotency WHERE expires_at <= ? LIMIT ?)",
+            (now, limit),
+        )
+        return cur.rowcount
+
+    def claim(self, key: str, lease_seconds: float) -> ClaimResult:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT lease_until, result FROM idempotency WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None and row[0] is None:
+                    self._conn.execute("COMMIT")
+                    return ClaimResult(status="completed", result=_decode(row[1]))
+                if row is not None and row[0] > now:
+                    self._conn.execute("COMMIT")
+                    return ClaimResult(status="in_flight", lease_remaining=row[0] - now)
+                token = _new_token()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, expires_at, lease_until, result, token)"
+                    " VALUES (?, ?, ?, NULL, ?)",
+                    (key, now + self._ttl, now + lease_seconds, token),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._after_write()
+        return ClaimResult(status="claimed", lease_remaining=lease_seconds, token=token)
+
+    def complete(self, key: str, result: str | None, token: str | None = None) -> bool:
+        now = time.time()
+        with self._lock:
+            if token is None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, expires_at, lease_until, result, token)"
+                    " VALUES (?, ?, NULL, ?, NULL)",
+                    (key, now + self._ttl, result),
+                )
+            else:
+                cur = self._conn.execute(
+                    "UPDATE idempotency SET expires_at = ?, lease_until = NULL, result = ?"
+                    " WHERE key = ? AND token = ? AND expires_at > ?",
+                    (now + self._ttl, result, key, token, now),
+                )
+                if cur.rowcount == 0:
+                    return False
+            self._after_write()
+        return True
+
+    def release(self, key: str, token: str | None = None) -> bool:
+        with self._lock:
+            if token is None:
+                cur = self._conn.execute("DELETE FROM idempotency WHERE key = ? AND lease_until IS NOT NULL", (key,))
+            else:
+                cur = self._conn.execute(
+                    "DELETE FROM idempotency WHERE key = ? AND lease_until IS NOT NULL AND token = ?",
+                    (key, token),
+                )
+        return cur.rowcount > 0
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM idempotency WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def purge_expired(self, limit: int = 1000) -> int:
+        with self._lock:
+            removed = self._purge(time.time(), limit)
+            self._expired += removed
+            return removed
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+        return {"size": size, "expired": self._expired}
+
+
+class RedisProtocolError(RuntimeError):
+    """The server answered a command with an error reply."""
+
+
+class _RedisConnection:
+    """Minimal blocking RESP2 client: enough commands for the idempotency backend, no dependency."""
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported Redis URL scheme: {parts.scheme}")
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or 6379
+        self._tls = parts.scheme == "rediss"
+        self._username = unquote(parts.username) if parts.username else None
+        self._password = unquote(parts.password) if parts.password else None
+        self._db = int(parts.path.lstrip("/") or 0)
+        self._timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader = None
+
+    def _connect(self) -> None:
+        sock = socket.create_connection((self._host, self._port), timeout=self._timeout)
+        if self._tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self._host)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        if self._password is not None:
+            auth = ("AUTH", self._username, self._password) if self._username else ("AUTH", self._password)
+            self._roundtrip(*auth)
+        if self._db:
+            self._roundtrip("SELECT", self._db)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = self._reader = None
+
+    def _roundtrip(self, *args: Any) -> Any:
+        out = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(out))
+        return self._read()
+
+    def _read(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisProtocolError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._reader.read(size + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RedisProtocolError(f"unexpected reply: {line!r}")
+
+    def command(self, *args: Any, retry: bool = True) -> Any:
+        """Run one command; a dropped connection is re-opened once for commands safe to resend."""
+        if self._sock is None:
+            self._connect()
+        try:
+            return self._roundtrip(*args)
+        except (ConnectionError, OSError):
+            self.close()
+            if not retry:
+                raise
+            self._connect()
+            return self._roundtrip(*args)
+
+
+class RedisIdempotencyBackend:
+    """Keys on a Redis-protocol server (Redis, Valkey, Memorystore) reachable by every instance.
+
+    A claim is `SET key NX PX lease`, so the server expires a lapsed lease by itself and the
+    next delivery's claim simply succeeds; a completed run is re-set with the full TTL.
+    complete/release check the fencing token under WATCH/MULTI/EXEC, so a claim that lost its
+    key cannot overwrite the newer one. Expiry is the server's job: `purge_expired` is a no-op.
+    """
+
+    # every call is a network round trip; the store runs them in a worker thread
+    blocking = True
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "kimeboard:idem:", timeout: float = 5.0) -> None:
+        self._ttl_ms = max(1, int(ttl_seconds * 1000))
+        self._prefix = prefix
+        self._conn = _RedisConnection(url, timeout)
+        self._lock = Lock()
+        self._conflicts = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    def claim(self, key: str, lease_seconds: float) -> ClaimResult:
+        name = self._key(key)
+        token = _new_token()
+        lease_ms = max(1, int(lease_seconds * 1000))
+        with self._lock:
+            while True:
+                if self._conn.command("SET", name, json.dumps({"token": token}), "NX", "PX", lease_ms) == "OK":
+                    return ClaimResult(status="claimed", lease_remaining=lease_seconds, token=token)
+                raw = self._conn.command("GET", name)
+                if raw is None:
+                    continue  # expired or released between the two commands
+                entry = json.loads(raw)
+                if entry.get("done"):
+                    return ClaimResult(status="completed", result=_decode(entry.get("result")))
+                remaining = self._conn.command("PTTL", name)
+                return ClaimResult(status="in_flight", lease_remaining=max(remaining, 0) / 1000)
+
+    def _fenced(self, name: str, token: str | None, *write: Any) -> bool:
+        """Run `write` in a transaction only while `name` is still a lease (held under `token`, if given)."""
+        conn = self._conn
+        conn.command("WATCH", name)
+        try:
+            raw = conn.command("GET", name, retry=False)
+            entry = json.loads(raw) if raw is not None else None
+            if entry is None or entry.get("done") or (token is not None and entry.get("token") != token):
+                conn.command("UNWATCH", retry=False)
+                return False
+            conn.command("MULTI", retry=False)
+            conn.command(*write, retry=False)
+            applied = conn.command("EXEC", retry=False) is not None
+        except (ConnectionError, OSError):
+            conn.close()
+            raise
+        if not applied:
+            self._conflicts += 1
+        return applied
+
+    def complete(self, key: str, result: str | None, token: str | None = None) -> bool:
+        name = self._key(key)
+        done = json.dumps({"done": True, "result": result})
+        with self._lock:
+            if token is None:
+                self._conn.command("SET", name, done, "PX", self._ttl_ms)
+                return True
+            return self._fenced(name, token, "SET", name, done, "PX", self._ttl_ms)
+
+    def release(self, key: str, token: str | None = None) -> bool:
+        name = self._key(key)
+        with self._lock:
+            return self._fenced(name, token, "DEL", name)
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.command("EXISTS", self._key(key)) > 0
+
+    def purge_expired(self, limit: int = 1000) -> int:
+        return 0
+
+    def stats(self) -> dict[str, int]:
+        return {"conflicts": self._conflicts}
+
+
+class InMemoryIdempotencyStore:
+    """Claim/lease idempotency over a pluggable backend (process memory by default).
+
+    An entry is either an in-flight claim (with a lease that lapses if the worker dies)
+    or a completed run whose result is kept as compact JSON for replay. Waiters in this
+    process are woken directly; a duplicate claimed elsewhere (another process on a SQLite
+    file, another instance on Redis) is polled for through the backend.
+    """
+
+    def __init__(
+        self,
+        ttl_minutes: int = 120,
+        max_entries: int = 100_000,
+        backend: IdempotencyBackend | None = None,
+    ) -> None:
+        self._backend = backend or MemoryIdempotencyBackend(ttl_minutes * 60.0, max_entries)
+        self._offload = getattr(self._backend, "blocking", False)
+        self._waiters: dict[str, asyncio.Event] = {}
+
+    @property
+    def backend(self) -> IdempotencyBackend:
+        return self._backend
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._offload:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def seen(self, key: str) -> bool:
+        return await self._call(self._backend.contains, key)
+
+    async def mark(self, key: str) -> None:
+        await self._call(self._backend.complete, key, None)
+
+    async def claim(self, key: str, lease_seconds: float) -> ClaimResult:
+        claim = await self._call(self._backend.claim, key, lease_seconds)
+        if claim.status == "claimed":
+            self._waiters.setdefault(key, asyncio.Event())
+        return claim
+
+    async def complete(self, key: str, result: dict[str, Any] | None = None, token: str | None = None) -> bool:
+        """Store the run's result; with `token`, only while the claim it came from still holds the key."""
+        encoded = json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str) if result is not None else None
+        applied = await self._call(self._backend.complete, key, encoded, token)
+        if applied:
+            self._wake(key)
+        return applied
+
+    async def release(self, key: str, token: str | None = None) -> bool:
+        released = await self._call(self._backend.release, key, token)
+        if released:
+            self._wake(key)
+        return released
+
+    async def wait(self, key: str, timeout: float) -> None:
+        event = self._waiters.get(key)
+        if event is None:
+            await asyncio.sleep(min(max(timeout, 0.0), 0.25))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=max(timeout, 0.0))
+        except TimeoutError:
+            pass
+
+    def _wake(self, key: str) -> None:
+        event = self._waiters.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def stats(self) -> dict[str, int]:
+        return {**await self._call(self._backend.stats), "inFlight": len(self._waiters)}
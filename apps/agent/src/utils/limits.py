@@ -3,3 +3,6 @@ MAX_ACTIONS_TOTAL = 8
 MAX_PREP_ACTIONS = 5
 MAX_EXEC_ACTIONS = 3
 MAX_MEETING_RAW_CHARS = 20000
+MAX_PROJECT_DECISIONS = 100
+MAX_BULK_ACTIONS = 500
+MAX_RUN_STEPS = 200
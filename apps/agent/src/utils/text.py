@@ -1,10 +1,15 @@
 ﻿import re
 
 
+_INLINE_SPACE = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}(T.*Z)?$")
+
+
 def normalize_text(text: str) -> str:
     text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _INLINE_SPACE.sub(" ", text)
+    text = _BLANK_LINES.sub("\n\n", text)
     return text.strip()
 
 
@@ -19,4 +24,4 @@ def split_lines(text: str) -> list[str]:
 
 
 def looks_like_iso_date(value: str) -> bool:
-    return bool(re.match(r"^\d{4}-\d{2}-\d{2}(T.*Z)?$", value.strip()))
+    return bool(_ISO_DATE.match(value.strip()))
@@ -0,0 +1,41 @@
+﻿import asyncio
+
+import pytest
+
+from src.agents.admission import AdmissionController, AdmissionRejected, parse_limits
+
+
+async def test_admission_queues_then_sheds() -> None:
+    controller = AdmissionController(default_limit=1, max_waiting=1, wait_seconds=0.05)
+    gate = asyncio.Event()
+
+    async def _hold():
+        async with controller.admit("meeting_structurer"):
+            await gate.wait()
+
+    holder = asyncio.create_task(_hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as full:
+        async with controller.admit("meeting_structurer"):
+            pass
+    assert full.value.status_code == 429
+
+    try:
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiter
+        assert timed_out.value.status_code == 503
+    finally:
+        gate.set()
+        await holder
+    stats = controller.stats()["meeting_structurer"]
+    assert (stats["active"], stats["waiting"], stats["admitted"], stats["shed"]) == (0, 0, 1, 2)
+
+
+def test_parse_limits() -> None:
+    assert parse_limits("meeting_structurer=2, reply_integrator=8,bad") == {
+        "meeting_structurer": 2,
+        "reply_integrator": 8,
+    }
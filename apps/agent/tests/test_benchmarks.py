@@ -0,0 +1,20 @@
+﻿from benchmarks.corpus import build_corpus
+from benchmarks.micro import compare
+
+
+def test_corpus_is_deterministic_per_seed() -> None:
+    first = build_corpus("small", seed=7)
+    second = build_corpus("small", seed=7)
+    other = build_corpus("small", seed=8)
+
+    assert first.memo == second.memo
+    assert first.candidates == second.candidates
+    assert first.memo != other.memo
+    assert len(first.titles) == 3
+
+
+def test_compare_flags_cases_beyond_threshold() -> None:
+    baseline = {"results": {"a[small]": {"usPerCall": 10.0}, "b[small]": {"usPerCall": 10.0}}}
+    current = {"results": {"a[small]": {"usPerCall": 12.0}, "b[small]": {"usPerCall": 14.0}}}
+
+    assert compare(current, baseline, threshold=0.25) == ["b[small]"]
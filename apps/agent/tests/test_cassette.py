@@ -0,0 +1,85 @@
+﻿import gzip
+import json
+
+import httpx
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from benchmarks.replay import replay_once
+from src.agents.root_agent import KimeboardRootAgent
+from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
+from src.api_client.cassette import REDACTED, CassetteRecorder, RecordingTransport, compare_writes, load_cassette, redact_fields
+from src.api_client.client import ApiClient
+from src.config import Settings
+from src.models.schemas import TaskMeetingStructurerRequest
+from src.observability.logger import get_logger
+from src.observability.runlog import RunContext
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+async def test_recorded_run_replays_offline_with_the_same_writes(tmp_path) -> None:
+    settings = Settings(API_BASE_URL="http://mock", AGENT_CALLBACK_TOKEN="secret-token")
+    logger = get_logger("test")
+    recorder = CassetteRecorder(str(tmp_path), logger, redactors=[redact_fields(["title"])])
+    api = create_mock_api(MockConfig(latency_ms=0, jitter_ms=0, memo_blocks=3))
+    client = ApiClient(
+        settings.api_base_url,
+        settings.agent_callback_token,
+        transport=RecordingTransport(recorder, inner=httpx.ASGITransport(app=api)),
+    )
+    tools = KimeboardApiToolset(client)
+    agent = KimeboardRootAgent(
+        meeting_structurer=MeetingStructurerWorkflow(tools, settings, logger),
+        reply_integrator=None,
+        draft_actions=None,
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=5),
+        logger=logger,
+        recorder=recorder,
+    )
+    try:
+        out = await agent.run_meeting_structurer(TaskMeetingStructurerRequest(projectId="prj_1", meetingId="mtg_1"))
+    finally:
+        await client.close()
+
+    path = tmp_path / f"{out['runId']}.json"
+    raw = path.read_text(encoding="utf-8")
+    assert "secret-token" not in raw
+    cassette = load_cassette(str(path))
+    assert cassette["workflow"] == "meeting_structurer"
+    assert cassette["task"]["meetingId"] == "mtg_1"
+    meeting = next(i for i in cassette["interactions"] if i["path"].endswith("/meetings/mtg_1"))
+    assert meeting["response"]["meeting"]["title"] == REDACTED
+    assert any(i["path"].endswith("/callback") for i in cassette["interactions"])
+
+    # the API is gone: every response now comes from the file
+    api.state.stats.calls.clear()
+    _, transport = await replay_once(json.loads(raw), settings)
+    assert api.state.stats.to_dict()["totalCalls"] == 0
+    assert compare_writes(cassette["interactions"], transport.sent) == []
+
+    tampered = [dict(i, request={**i["request"], "status": "FAILED"}) if i["path"].endswith("/callback") else i for i in transport.sent]
+    assert compare_writes(cassette["interactions"], tampered) == [
+        "POST /api/internal/agent/callback.status: recorded 'SUCCEEDED', replayed 'FAILED'"
+    ]
+
+
+async def test_recording_passes_gzip_responses_through(tmp_path) -> None:
+    body = json.dumps({"projects": [{"projectId": "prj_1", "name": "定例"}]}).encode()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        compressed = gzip.compress(body)
+        return httpx.Response(200, headers={"Content-Encoding": "gzip", "Content-Length": str(len(compressed))}, content=compressed)
+
+    recorder = CassetteRecorder(str(tmp_path), get_logger("test"))
+    client = httpx.AsyncClient(transport=RecordingTransport(recorder, inner=httpx.MockTransport(handler)))
+    run = RunContext(run_id="run_gzip", workflow="test", project_id="prj_1")
+    try:
+        with run.bind():
+            async with recorder.record(run, None):
+                resp = await client.get("http://api/api/internal/projects")
+                assert resp.json() == json.loads(body)
+    finally:
+        await client.aclose()
+
+    cassette = load_cassette(str(tmp_path / "run_gzip.json"))
+    assert cassette["interactions"][0]["response"] == json.loads(body)
@@ -0,0 +1,46 @@
+﻿import asyncio
+import time
+
+import pytest
+
+from src.agents.root_agent import KimeboardRootAgent
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.config import Settings
+from src.models.schemas import TaskDraftActionsRequest
+from src.observability.logger import get_logger
+from src.observability.runlog import DeadlineExceeded
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+class HangingTools:
+    def __init__(self) -> None:
+        self.callbacks: list[dict] = []
+
+    async def get_decision(self, project_id: str, decision_id: str, view=None):
+        await asyncio.sleep(30)
+
+    async def post_callback(self, payload: dict):
+        self.callbacks.append(payload)
+        return {"ok": True}
+
+
+async def test_run_past_deadline_is_cancelled_and_reports_failed() -> None:
+    tools = HangingTools()
+    store = InMemoryIdempotencyStore(ttl_minutes=5)
+    agent = KimeboardRootAgent(
+        meeting_structurer=None,
+        reply_integrator=None,
+        draft_actions=DraftActionsSkillWorkflow(tools, Settings(), get_logger("test")),
+        idempotency_store=store,
+        logger=get_logger("test"),
+    )
+    task = TaskDraftActionsRequest(projectId="p1", decisionId="d1")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        await agent.run_draft_actions(task, deadline_seconds=0.1)
+
+    assert time.monotonic() - started < 2
+    assert [cb["status"] for cb in tools.callbacks] == ["FAILED"]
+    assert tools.callbacks[0]["error"] == "CancelledError"
+    assert (await store.claim("draft_actions_skill:d1", 60)).status == "claimed"
@@ -0,0 +1,77 @@
+﻿import asyncio
+
+import httpx
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from src.api_client import endpoints as ep
+from src.api_client.client import CANDIDATE_STATUSES, ApiClient
+
+
+def _client(api) -> ApiClient:
+    client = ApiClient(base_url="http://mock", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+    return client
+
+
+async def test_candidates_page_per_status_and_stop_once_enough() -> None:
+    api = create_mock_api(MockConfig(latency_ms=0, jitter_ms=0, candidates=200))
+    client = _client(api)
+    try:
+        everything = [d async for d in client.iter_decisions("prj_1", CANDIDATE_STATUSES, page_size=7)]
+        api.state.stats.calls.clear()
+        candidates = await client.list_candidate_decisions("prj_1", limit=12)
+    finally:
+        await client.close()
+
+    assert len({d.decisionId for d in everything}) == len(everything)
+    assert {d.status for d in everything} <= set(CANDIDATE_STATUSES)
+    assert len(candidates.decisions) == 12
+    assert {d.status for d in candidates.decisions} == set(CANDIDATE_STATUSES)
+    # one 4-item page per status covers 12 candidates; no page beyond what was consumed
+    assert api.state.stats.calls[ep.PATH_LIST_DECISIONS] == 3
+
+
+async def test_status_filter_ignored_by_api_falls_back_to_client_side() -> None:
+    listed = [{"decisionId": f"d{i}", "title": "t", "status": s} for i, s in enumerate(["DECIDED", "REOPEN", "NEEDS_INFO"] * 3)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        # an API that neither filters by status nor paginates
+        return httpx.Response(200, json={"decisions": listed})
+
+    client = ApiClient(base_url="http://api", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        candidates = await client.list_candidate_decisions("p1", limit=10)
+    finally:
+        await client.close()
+
+    assert [d.decisionId for d in candidates.decisions] == ["d1", "d2", "d4", "d5", "d7", "d8"]
+
+
+async def test_uneven_statuses_follow_cursors_and_fetch_first_pages_together() -> None:
+    listed = [{"decisionId": f"d{i}", "title": "t", "status": "NEEDS_INFO"} for i in range(30)]
+    in_flight = peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        params = request.url.params
+        matching = [d for d in listed if d["status"] == params["status"]]
+        start, limit = int(params.get("cursor", 0)), int(params["limit"])
+        page = {"decisions": matching[start : start + limit]}
+        if start + limit < len(matching):
+            page["cursor"] = str(start + limit)
+        return httpx.Response(200, json=page)
+
+    client = ApiClient(base_url="http://api", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        candidates = await client.list_candidate_decisions("p1", limit=12)
+    finally:
+        await client.close()
+
+    assert [d.decisionId for d in candidates.decisions] == [f"d{i}" for i in range(12)]
+    assert peak == len(CANDIDATE_STATUSES)
@@ -0,0 +1,84 @@
+﻿from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow, _bulk_chunks
+from src.config import Settings
+from src.models.schemas import GetDecisionResponse, ListDecisionsResponse, TaskDraftActionsProjectRequest
+from src.observability.logger import get_logger
+from src.observability.runlog import RunContext
+
+
+class FakeTools:
+    def __init__(self) -> None:
+        self.bulk_calls: list[list[dict]] = []
+        self.get_calls = 0
+
+    async def list_decisions(self, project_id: str, limit: int = 20, status: str | None = None):
+        return ListDecisionsResponse.model_validate({
+            "decisions": [
+                {"decisionId": "d1", "title": "A", "status": "NEEDS_INFO"},
+                {"decisionId": "d2", "title": "B", "status": "DECIDED"},
+                {"decisionId": "d3", "title": "C", "status": "REOPEN"},
+                {"decisionId": "d4", "title": "D", "status": "READY_TO_DECIDE"},
+            ]
+        })
+
+    async def collect_decisions(self, project_id: str, statuses, limit: int, view=None):
+        listed = await self.list_decisions(project_id, limit)
+        wanted = set(statuses or ())
+        return [d for d in listed.decisions if not wanted or d.status in wanted][:limit]
+
+    async def get_decision(self, project_id: str, decision_id: str, view=None):
+        self.get_calls += 1
+        if decision_id == "d4":
+            raise RuntimeError("boom")
+        actions = [{"actionId": "a1", "type": "PREP", "title": "x", "status": "TODO"}] if decision_id == "d3" else []
+        return GetDecisionResponse.model_validate({
+            "decision": {
+                "decisionId": decision_id,
+                "projectId": project_id,
+                "title": decision_id,
+                "status": "NEEDS_INFO",
+                "completeness": {"score": 40, "missingFields": ["owner", "criteria"]},
+            },
+            "actions": actions,
+        })
+
+    async def create_project_actions_bulk(self, project_id: str, items: list[dict]):
+        self.bulk_calls.append(items)
+        results = [{"decisionId": item["decisionId"], "created": len(item["actions"])} for item in items]
+        return {"created": sum(r["created"] for r in results), "results": results}
+
+
+async def test_run_project_drafts_and_bulk_creates_across_decisions() -> None:
+    tools = FakeTools()
+    workflow = DraftActionsSkillWorkflow(tools, Settings(), get_logger("test"))
+    run = RunContext(run_id="run_test", workflow="draft_actions_project", project_id="p1")
+
+    out = await workflow.run_project(TaskDraftActionsProjectRequest(projectId="p1"), run)
+
+    assert tools.get_calls == 3
+    assert [[item["decisionId"] for item in items] for items in tools.bulk_calls] == [["d1"]]
+    assert all("assigneeDisplayName" not in action for action in tools.bulk_calls[0][0]["actions"])
+    by_id = {item["decisionId"]: item for item in out["results"]}
+    assert by_id["d1"]["status"] == "CREATED"
+    assert by_id["d3"]["status"] == "SKIPPED"
+    assert by_id["d4"]["status"] == "FAILED"
+    assert (out["created"], out["skipped"], out["failed"]) == (1, 1, 1)
+
+
+async def test_run_project_writes_every_decision_in_one_request() -> None:
+    tools = FakeTools()
+    workflow = DraftActionsSkillWorkflow(tools, Settings(), get_logger("test"))
+    run = RunContext(run_id="run_test", workflow="draft_actions_project", project_id="p1")
+
+    task = TaskDraftActionsProjectRequest(projectId="p1", statuses=["NEEDS_INFO", "DECIDED"])
+    out = await workflow.run_project(task, run)
+
+    assert [[item["decisionId"] for item in items] for items in tools.bulk_calls] == [["d1", "d2"]]
+    assert out["created"] == 2
+
+
+def test_bulk_chunks_keep_each_decision_whole() -> None:
+    pending = [("d1", [{}] * 3), ("d2", [{}] * 3), ("d3", [{}] * 2), ("d4", [{}] * 5)]
+
+    chunks = [[decision_id for decision_id, _ in chunk] for chunk in _bulk_chunks(pending, 5)]
+
+    assert chunks == [["d1"], ["d2", "d3"], ["d4"]]
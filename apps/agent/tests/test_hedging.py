@@ -0,0 +1,76 @@
+﻿import asyncio
+import time
+
+import httpx
+
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.api_client.hedging import HedgePolicy
+from src.observability import metrics
+
+
+def _client(policy: HedgePolicy, handler) -> ApiClient:
+    client = ApiClient(base_url="http://api", callback_token="", hedging=policy)
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+async def test_slow_get_is_hedged_and_loser_cancelled() -> None:
+    calls = 0
+    cancelled = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return httpx.Response(200, json={"decisions": []})
+
+    client = _client(HedgePolicy(fallback_delay=0.05), handler)
+    won_before = metrics.API_HEDGES.value(ep.PATH_LIST_DECISIONS, "won")
+    ok_before = metrics.API_REQUESTS.value("GET", ep.PATH_LIST_DECISIONS, "200")
+    cancelled_before = metrics.API_REQUESTS.value("GET", ep.PATH_LIST_DECISIONS, "cancelled")
+    started = time.perf_counter()
+    try:
+        await client.list_decisions("p1")
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+    finally:
+        await client.close()
+
+    assert time.perf_counter() - started < 1
+    assert calls == 2
+    assert metrics.API_HEDGES.value(ep.PATH_LIST_DECISIONS, "won") == won_before + 1
+    # both attempts reach the request metrics
+    assert metrics.API_REQUESTS.value("GET", ep.PATH_LIST_DECISIONS, "200") == ok_before + 1
+    assert metrics.API_REQUESTS.value("GET", ep.PATH_LIST_DECISIONS, "cancelled") == cancelled_before + 1
+
+
+def test_hedge_budget_and_adaptive_delay() -> None:
+    policy = HedgePolicy(fallback_delay=0.5, budget_ratio=0.0, min_samples=10)
+    assert policy.try_hedge() is True
+    assert policy.try_hedge() is False
+
+    for i in range(20):
+        policy.observe("/x", 0.01 * (i + 1))
+    assert 0.15 <= policy.delay("/x") <= 0.2
+    assert policy.delay("/other") == 0.5
+
+
+def test_hedge_budget_refills_per_request_up_to_the_burst() -> None:
+    policy = HedgePolicy(budget_ratio=0.25, burst=3)
+    assert policy.try_hedge() is True
+    assert policy.try_hedge() is False
+
+    for _ in range(4):
+        policy.record_request()
+    assert policy.try_hedge() is True
+    assert policy.try_hedge() is False
+
+    # a long quiet stretch banks at most `burst` hedges
+    for _ in range(10_000):
+        policy.record_request()
+    assert [policy.try_hedge() for _ in range(5)] == [True, True, True, False, False]
@@ -1,19 +1,252 @@
-﻿import time
+﻿import asyncio
+import socketserver
+import threading
+import time
 
-from src.utils.idempotency import InMemoryIdempotencyStore
+import pytest
 
+from src.utils.idempotency import InMemoryIdempotencyStore, RedisIdempotencyBackend, SqliteIdempotencyBackend
 
-def test_idempotency_mark_and_seen() -> None:
+
+class LocalRedis:
+    """In-process stand-in for a Redis server: the RESP commands the idempotency backend uses."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, tuple[str, float | None]] = {}
+        self.versions: dict[str, int] = {}
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                session = {"watched": {}, "queued": None}
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    args = []
+                    for _ in range(int(line[1:])):
+                        size = int(self.rfile.readline()[1:])
+                        args.append(self.rfile.read(size + 2)[:-2].decode())
+                    self.wfile.write(standin.execute(session, args))
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"redis://127.0.0.1:{self.server.server_address[1]}/0"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _live(self, key: str) -> str | None:
+        value, expires = self.data.get(key, (None, None))
+        if value is not None and expires is not None and expires <= time.time():
+            del self.data[key]
+            self._touch(key)
+            return None
+        return value
+
+    def _touch(self, key: str) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _apply(self, args: list[str]) -> bytes:
+        cmd, rest = args[0].upper(), args[1:]
+        if cmd == "SET":
+            key, value, opts = rest[0], rest[1], [o.upper() for o in rest[2:]]
+            if "NX" in opts and self._live(key) is not None:
+                return b"$-1\r\n"
+            ttl = int(rest[2 + opts.index("PX") + 1]) / 1000 if "PX" in opts else None
+            self.data[key] = (value, time.time() + ttl if ttl is not None else None)
+            self._touch(key)
+            return b"+OK\r\n"
+        if cmd == "GET":
+            value = self._live(rest[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value.encode()), value.encode())
+        if cmd == "DEL":
+            found = self._live(rest[0]) is not None
+            self.data.pop(rest[0], None)
+            self._touch(rest[0])
+            return b":%d\r\n" % found
+        if cmd == "EXISTS":
+            return b":%d\r\n" % (self._live(rest[0]) is not None)
+        if cmd == "PTTL":
+            if self._live(rest[0]) is None:
+                return b":-2\r\n"
+            return b":%d\r\n" % int((self.data[rest[0]][1] - time.time()) * 1000)
+        return b"-ERR unknown command\r\n"
+
+    def execute(self, session: dict, args: list[str]) -> bytes:
+        cmd = args[0].upper()
+        with self.lock:
+            if cmd == "WATCH":
+                self._live(args[1])
+                session["watched"][args[1]] = self.versions.get(args[1], 0)
+                return b"+OK\r\n"
+            if cmd == "UNWATCH":
+                session["watched"] = {}
+                return b"+OK\r\n"
+            if cmd == "MULTI":
+                session["queued"] = []
+                return b"+OK\r\n"
+            if cmd == "EXEC":
+                queued, watched = session["queued"], session["watched"]
+                session["queued"], session["watched"] = None, {}
+                for key in watched:
+                    self._live(key)
+                if any(self.versions.get(key, 0) != version for key, version in watched.items()):
+                    return b"*-1\r\n"
+                replies = [self._apply(q) for q in queued]
+                return b"*%d\r\n%s" % (len(replies), b"".join(replies))
+            if session["queued"] is not None:
+                session["queued"].append(args)
+                return b"+QUEUED\r\n"
+            return self._apply(args)
+
+
+@pytest.fixture
+def local_redis():
+    standin = LocalRedis()
+    yield standin
+    standin.close()
+
+
+async def test_idempotency_mark_and_seen() -> None:
     store = InMemoryIdempotencyStore(ttl_minutes=5)
     key = "workflow:test"
-    assert store.seen(key) is False
-    store.mark(key)
-    assert store.seen(key) is True
+    assert await store.seen(key) is False
+    await store.mark(key)
+    assert await store.seen(key) is True
 
 
-def test_idempotency_expires() -> None:
+async def test_idempotency_expires() -> None:
     store = InMemoryIdempotencyStore(ttl_minutes=0)
     key = "workflow:test-expire"
-    store.mark(key)
+    await store.mark(key)
+    time.sleep(0.01)
+    assert await store.seen(key) is False
+
+
+async def test_idempotency_evicts_oldest_over_max_entries() -> None:
+    store = InMemoryIdempotencyStore(ttl_minutes=5, max_entries=2)
+    await store.mark("a")
+    await store.mark("b")
+    await store.mark("a")
+    await store.mark("c")
+    assert await store.seen("b") is False
+    assert await store.seen("a") is True
+    assert await store.seen("c") is True
+    assert (await store.stats())["evicted"] == 1
+    assert (await store.stats())["size"] == 2
+
+
+async def test_idempotency_read_keeps_key_from_eviction() -> None:
+    store = InMemoryIdempotencyStore(ttl_minutes=5, max_entries=2)
+    await store.mark("a")
+    await store.mark("b")
+    assert await store.seen("a") is True
+    await store.mark("c")
+    assert await store.seen("b") is False
+    assert await store.seen("a") is True
+    assert await store.seen("c") is True
+
+
+async def test_idempotency_counts_expired() -> None:
+    store = InMemoryIdempotencyStore(ttl_minutes=0)
+    await store.mark("a")
+    await store.mark("b")
     time.sleep(0.01)
-    assert store.seen(key) is False
+    await store.seen("a")
+    assert await store.stats() == {"size": 0, "maxEntries": 100_000, "inFlight": 0, "expired": 2, "evicted": 0}
+
+
+async def test_sqlite_backend_claims_atomically_across_stores(tmp_path) -> None:
+    path = str(tmp_path / "idem.db")
+    first = InMemoryIdempotencyStore(backend=SqliteIdempotencyBackend(path, ttl_seconds=300))
+    second = InMemoryIdempotencyStore(backend=SqliteIdempotencyBackend(path, ttl_seconds=300))
+
+    assert (await first.claim("k", lease_seconds=60)).status == "claimed"
+    assert (await second.claim("k", lease_seconds=60)).status == "in_flight"
+    await first.complete("k", {"runId": "run_1"})
+    replay = await second.claim("k", lease_seconds=60)
+    assert replay.status == "completed"
+    assert replay.result == {"runId": "run_1"}
+    assert await second.seen("k") is True
+
+
+async def test_sqlite_backend_purges_expired_in_batches(tmp_path) -> None:
+    backend = SqliteIdempotencyBackend(str(tmp_path / "idem.db"), ttl_seconds=0)
+    store = InMemoryIdempotencyStore(backend=backend)
+    for i in range(5):
+        await store.mark(f"k{i}")
+    time.sleep(0.01)
+    assert await store.seen("k0") is False
+    assert backend.purge_expired(limit=3) == 3
+    assert backend.purge_expired(limit=3) == 2
+    assert backend.stats()["size"] == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+async def test_stale_claimant_cannot_release_or_complete_a_newer_claim(backend, tmp_path, request) -> None:
+    if backend == "sqlite":
+        store = InMemoryIdempotencyStore(backend=SqliteIdempotencyBackend(str(tmp_path / "idem.db"), ttl_seconds=300))
+    elif backend == "redis":
+        url = request.getfixturevalue("local_redis").url
+        store = InMemoryIdempotencyStore(backend=RedisIdempotencyBackend(url, ttl_seconds=300))
+    else:
+        store = InMemoryIdempotencyStore()
+    stale = await store.claim("k", lease_seconds=0)
+    time.sleep(0.01)
+    fresh = await store.claim("k", lease_seconds=60)
+    assert fresh.status == "claimed" and fresh.token != stale.token
+
+    assert await store.release("k", stale.token) is False
+    assert await store.complete("k", {"runId": "run_stale"}, stale.token) is False
+    assert (await store.claim("k", lease_seconds=60)).status == "in_flight"
+
+    assert await store.complete("k", {"runId": "run_fresh"}, fresh.token) is True
+    assert (await store.claim("k", lease_seconds=60)).result == {"runId": "run_fresh"}
+
+
+async def test_sqlite_calls_wait_off_the_event_loop(tmp_path) -> None:
+    backend = SqliteIdempotencyBackend(str(tmp_path / "idem.db"), ttl_seconds=300)
+    store = InMemoryIdempotencyStore(backend=backend)
+    backend._lock.acquire()  # another caller mid-transaction
+    claim = asyncio.create_task(store.claim("k", lease_seconds=60))
+    await asyncio.sleep(0.05)  # would never resume if claim blocked the loop
+    assert not claim.done()
+    backend._lock.release()
+    assert (await claim).status == "claimed"
+
+
+async def test_redis_backend_shares_claims_across_instances(local_redis) -> None:
+    first = InMemoryIdempotencyStore(backend=RedisIdempotencyBackend(local_redis.url, ttl_seconds=300))
+    second = InMemoryIdempotencyStore(backend=RedisIdempotencyBackend(local_redis.url, ttl_seconds=300))
+
+    claims = await asyncio.gather(*(store.claim("k", lease_seconds=60) for store in (first, second) * 4))
+    assert [c.status for c in claims].count("claimed") == 1
+    winner = next(c for c in claims if c.status == "claimed")
+    owner = first if claims.index(winner) % 2 == 0 else second
+    other = second if owner is first else first
+    assert 0 < (await other.claim("k", lease_seconds=60)).lease_remaining <= 60
+
+    assert await owner.complete("k", {"runId": "run_1"}, winner.token) is True
+    replay = await other.claim("k", lease_seconds=60)
+    assert (replay.status, replay.result) == ("completed", {"runId": "run_1"})
+    assert await other.seen("k") is True
+    assert await other.release("k") is False  # a completed key is not a claim
+
+    # a released claim is immediately claimable from the other instance
+    lease = await other.claim("k2", lease_seconds=60)
+    assert await other.release("k2", lease.token) is True
+    assert (await owner.claim("k2", lease_seconds=60)).status == "claimed"
+
+
+async def test_redis_backend_expires_keys_on_the_server(local_redis) -> None:
+    backend = RedisIdempotencyBackend(local_redis.url, ttl_seconds=0.01)
+    store = InMemoryIdempotencyStore(backend=backend)
+    await store.mark("k")
+    time.sleep(0.02)
+    assert await store.seen("k") is False
+    assert backend.purge_expired() == 0
+    assert (await store.claim("k", lease_seconds=60)).status == "claimed"
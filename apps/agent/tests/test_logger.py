@@ -0,0 +1,67 @@
+﻿import json
+import logging
+
+import pytest
+import structlog
+
+from src.observability.logger import (
+    _record_timestamp,
+    configure_logging,
+    get_logger,
+    parse_event_rates,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def queued_logging():
+    yield
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    structlog.reset_defaults()
+
+
+def test_parse_event_rates_skips_malformed_entries() -> None:
+    assert parse_event_rates("a=0.5, b=x,c,d=20") == {"a": 0.5, "d": 20.0}
+
+
+def test_queued_events_are_sampled_rate_limited_and_flushed(queued_logging, capsys) -> None:
+    configure_logging("INFO", sample_rates={"chatty": 0.0}, rate_limits={"burst": 3})
+    logger = get_logger("test")
+
+    logger.info("chatty")
+    for i in range(10):
+        logger.info("burst", i=i)
+    logger.warning("chatty", kept=True)
+    shutdown_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert [line["i"] for line in lines if line["event"] == "burst"] == [0, 1, 2]
+    assert [line.get("kept") for line in lines if line["event"] == "chatty"] == [True]
+
+
+def test_foreign_tracebacks_survive_and_logged_values_are_snapshotted(queued_logging, capsys) -> None:
+    configure_logging("INFO")
+    payload = {"ids": ["a"]}
+    get_logger("test").info("snapshot", payload=payload)
+    payload["ids"].append("b")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("uvicorn.error").exception("stdlib %s", "failure")
+    shutdown_logging()
+
+    lines = {line["event"]: line for line in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert lines["snapshot"]["payload"] == {"ids": ["a"]}
+    assert "ValueError: boom" in lines["stdlib failure"]["exception"]
+
+
+def test_foreign_records_are_stamped_when_logged_not_when_written() -> None:
+    record = logging.LogRecord("uvicorn.error", logging.INFO, __file__, 1, "late", None, None)
+    record.created = 1700000000.25
+
+    event_dict = _record_timestamp(None, "info", {"event": "late", "_record": record})
+
+    assert event_dict["timestamp"] == "2023-11-14T22:13:20.250000Z"
@@ -0,0 +1,39 @@
+﻿import asyncio
+import time
+
+from src.observability import metrics
+from src.observability.loop_monitor import LoopLagMonitor
+from src.observability.runlog import RunContext
+
+
+class RecordingLogger:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    def warning(self, event: str, **kw) -> None:
+        self.events.append((event, kw))
+
+
+def _blocking_step(run: RunContext) -> None:
+    time.sleep(0.3)
+
+
+async def test_stall_is_reported_with_stack_and_run_id() -> None:
+    logger = RecordingLogger()
+    monitor = LoopLagMonitor(interval=0.01, logger=logger, stall_threshold=0.1)
+    lag_before = metrics.EVENT_LOOP_LAG_SECONDS.count()
+    stalls_before = metrics.EVENT_LOOP_STALLS.value()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _blocking_step(RunContext(run_id="run_stall", workflow="w", project_id="p"))
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert metrics.EVENT_LOOP_LAG_SECONDS.count() > lag_before
+    assert metrics.EVENT_LOOP_STALLS.value() == stalls_before + 1
+    stalls = [kw for event, kw in logger.events if event == "event_loop_stall"]
+    assert len(stalls) == 1
+    assert stalls[0]["run_id"] == "run_stall"
+    assert "_blocking_step" in stalls[0]["stack"]
@@ -0,0 +1,122 @@
+﻿from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
+from src.config import Settings
+from src.models.schemas import CandidateDecisionsResponse, GetMeetingResponse, TaskMeetingStructurerRequest
+from src.observability.logger import get_logger
+from src.observability.runlog import RunContext
+
+MEMO = """決裁: 採用ツール
+選択肢: A, B
+基準: コスト
+決裁者: 佐藤
+期限: 2026-01-10
+理由+: 安い
+
+決裁: 開催場所
+選択肢: 東京, 大阪
+
+決裁: 予算上限
+選択肢: 100万, 200万"""
+
+
+class FakeTools:
+    """Keeps the meeting's stored blocks the way the API's callback route does."""
+
+    def __init__(self, memo: str) -> None:
+        self.memo = memo
+        self.callbacks: list[dict] = []
+        self.extracted: dict = {}
+
+    async def get_meeting(self, project_id: str, meeting_id: str):
+        return GetMeetingResponse.model_validate({
+            "meeting": {
+                "meetingId": meeting_id,
+                "projectId": project_id,
+                "title": "定例",
+                "status": "UPLOADED",
+                "raw": {"storage": "INLINE", "text": self.memo},
+                "extracted": self.extracted,
+            }
+        })
+
+    async def list_candidate_decisions(self, project_id: str, limit: int):
+        return CandidateDecisionsResponse(decisions=[])
+
+    async def post_agent_log(self, project_id: str, meeting_id: str, line: str):
+        return {}
+
+    async def post_callback(self, payload: dict):
+        self.callbacks.append(payload)
+        if "blocks" in payload["extracted"]:
+            self.extracted = {"blocks": payload["extracted"]["blocks"]}
+        return {"ok": True}
+
+
+async def _run(workflow: MeetingStructurerWorkflow) -> dict:
+    task = TaskMeetingStructurerRequest(projectId="p1", meetingId="m1")
+    return await workflow.run(task, RunContext(run_id="run_test", workflow="meeting_structurer", project_id="p1"))
+
+
+async def test_rerun_emits_only_changed_blocks() -> None:
+    tools = FakeTools(MEMO)
+    workflow = MeetingStructurerWorkflow(tools, Settings(), get_logger("test"))
+
+    first = await _run(workflow)
+    ids = {d["title"]: d["decisionId"] for d in tools.callbacks[0]["extracted"]["decisions"]}
+    assert first["decisions"] == 3
+    assert "unchangedDecisionIds" not in tools.callbacks[0]["extracted"]
+
+    tools.memo = MEMO.replace("東京, 大阪", "東京, 大阪, 福岡").replace("決裁: 予算上限\n選択肢: 100万, 200万", "決裁: 懇親会\n選択肢: する, しない")
+    second = await _run(workflow)
+    extracted = tools.callbacks[1]["extracted"]
+
+    assert (second["decisions"], second["unchanged"], second["removed"]) == (2, 1, 1)
+    emitted = {d["title"]: d["decisionId"] for d in extracted["decisions"]}
+    assert set(emitted) == {"開催場所", "懇親会"}
+    assert emitted["開催場所"] == ids["開催場所"]  # an edited block keeps its decision
+    assert {q["decisionRef"]["title"] for q in extracted["questionSets"]} <= {"開催場所", "懇親会"}
+    assert extracted["unchangedDecisionIds"] == [ids["採用ツール"]]
+    assert extracted["removedDecisionIds"] == [ids["予算上限"]]
+
+    third = await _run(workflow)
+    assert (third["decisions"], third["questionSets"], third["unchanged"]) == (0, 0, 3)
+
+
+async def test_incremental_disabled_restructures_every_block() -> None:
+    tools = FakeTools(MEMO)
+    workflow = MeetingStructurerWorkflow(tools, Settings(MEETING_INCREMENTAL_ENABLED=False), get_logger("test"))
+
+    await _run(workflow)
+    again = await _run(workflow)
+
+    assert again["decisions"] == 3
+    assert "blocks" not in tools.callbacks[0]["extracted"]
+    assert "removedDecisionIds" not in tools.callbacks[1]["extracted"]
+
+
+async def test_diff_base_comes_from_the_meeting_not_the_instance() -> None:
+    tools = FakeTools(MEMO)
+    first, second = (MeetingStructurerWorkflow(tools, Settings(), get_logger("test")) for _ in range(2))
+    edited = MEMO.replace("東京, 大阪", "東京, 大阪, 福岡")
+
+    await _run(first)
+    tools.memo = edited
+    await _run(second)
+    # back to the first version, on the instance that structured it
+    tools.memo = MEMO
+    out = await _run(first)
+
+    assert (out["decisions"], out["unchanged"]) == (1, 2)
+    assert [d["title"] for d in tools.callbacks[2]["extracted"]["decisions"]] == ["開催場所"]
+
+
+async def test_repeated_blocks_are_all_sent() -> None:
+    memo = MEMO + "\n\n決裁: 開催場所\n選択肢: 東京, 大阪"
+    tools = FakeTools(memo)
+    workflow = MeetingStructurerWorkflow(tools, Settings(), get_logger("test"))
+
+    first = await _run(workflow)
+    again = await _run(workflow)
+
+    assert first["decisions"] == 4
+    assert len(tools.callbacks[0]["extracted"]["blocks"]) == 4
+    assert (again["decisions"], again["unchanged"], again["removed"]) == (0, 4, 0)
@@ -0,0 +1,64 @@
+﻿from src.agents.root_agent import KimeboardRootAgent
+from src.models.schemas import TaskDraftActionsRequest
+from src.observability.memory import MemoryTracker
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+class RecordingLogger:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    def info(self, event: str, **kw) -> None:
+        self.events.append((event, kw))
+
+
+class HoardingDraftActions:
+    def __init__(self) -> None:
+        self.kept: list[bytes] = []
+
+    async def run(self, task, run):
+        scratch = [bytes(1024) for _ in range(256)]
+        self.kept.append(bytes(64 * 1024))
+        del scratch
+        return {"ok": True, "runId": run.run_id}
+
+
+async def test_run_log_carries_peak_and_net_bytes() -> None:
+    memory = MemoryTracker()
+    memory.start()
+    logger = RecordingLogger()
+    agent = KimeboardRootAgent(
+        meeting_structurer=None,
+        reply_integrator=None,
+        draft_actions=HoardingDraftActions(),
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=5),
+        logger=logger,
+        memory=memory,
+    )
+    try:
+        await agent.run_draft_actions(TaskDraftActionsRequest(projectId="p1", decisionId="d1"))
+    finally:
+        memory.stop()
+
+    finished = next(kw for event, kw in logger.events if event == "run_finished")
+    assert finished["mem_peak_bytes"] >= 256 * 1024
+    assert 64 * 1024 <= finished["mem_net_bytes"] < finished["mem_peak_bytes"]
+    assert finished["mem_shared"] is False
+
+
+def test_snapshot_diff_points_at_the_growing_site() -> None:
+    memory = MemoryTracker()
+    memory.start()
+    try:
+        memory.snapshot("before")
+        grown = [bytearray(4096) for _ in range(100)]
+        diff = memory.diff("before", limit=5)
+        top = memory.top(limit=5)
+    finally:
+        memory.stop()
+
+    assert diff["target"] == "now"
+    assert "test_memory.py" in diff["top"][0]["site"]
+    assert diff["top"][0]["sizeDiffBytes"] >= 100 * 4096
+    assert top["top"] and top["tracedBytes"] > 0
+    assert len(grown) == 100
@@ -0,0 +1,37 @@
+﻿import httpx
+
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.observability import metrics
+from src.observability.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    hist = registry.histogram("demo_seconds", "Demo.", ("workflow",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "w")
+    hist.observe(0.5, "w")
+    hist.observe(5.0, "w")
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{workflow="w",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{workflow="w",le="1"} 2' in text
+    assert 'demo_seconds_bucket{workflow="w",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{workflow="w"} 3' in text
+
+
+async def test_api_client_records_latency_by_route_template() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"meeting": {"meetingId": "m1", "projectId": "p1"}})
+
+    client = ApiClient(base_url="http://api", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    before = metrics.API_REQUEST_SECONDS.count("GET", ep.PATH_GET_MEETING)
+    try:
+        await client._request("GET", "/projects/p1/meetings/m1", route=ep.PATH_GET_MEETING)
+    finally:
+        await client.close()
+
+    assert metrics.API_REQUEST_SECONDS.count("GET", ep.PATH_GET_MEETING) == before + 1
+    assert metrics.API_REQUESTS.value("GET", ep.PATH_GET_MEETING, "200") >= 1
+    assert metrics.API_IN_FLIGHT.value() == 0
@@ -0,0 +1,22 @@
+﻿import httpx
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from src.api_client.client import ApiClient
+
+
+async def test_mock_api_serves_client_paths_and_counts_callbacks() -> None:
+    api = create_mock_api(MockConfig(latency_ms=0, jitter_ms=0, memo_blocks=3))
+    client = ApiClient(base_url="http://mock", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+    try:
+        meeting = await client.get_meeting("prj_1", "mtg_1")
+        decision = await client.get_decision("prj_1", "dcs_1")
+        await client.post_callback({"kind": "draft_actions_skill", "status": "SUCCEEDED", "projectId": "prj_1"})
+    finally:
+        await client.close()
+
+    assert "決裁" in meeting.meeting.raw.text or "Decision" in meeting.meeting.raw.text
+    assert decision.decision.decisionId == "dcs_1"
+    stats = api.state.stats.to_dict()
+    assert stats["totalCalls"] == 3
+    assert stats["callbacks"] == {"draft_actions_skill:SUCCEEDED": 1}
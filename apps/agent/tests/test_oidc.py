@@ -0,0 +1,86 @@
+﻿import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from src.auth.oidc import OidcVerifier
+
+
+def _signing_material(kid: str):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "local-certs")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(1)
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    signer = crypt.RSASigner.from_string(key_pem, key_id=kid)
+    return signer, {kid: cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+
+class LocalCerts:
+    """Stand-in for Google's certs endpoint."""
+
+    def __init__(self, certs: dict[str, str]) -> None:
+        self.certs = certs
+        self.hits = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.hits += 1
+        return httpx.Response(200, json=self.certs, headers={"cache-control": "public, max-age=3600"})
+
+
+def _token(signer, audience: str, iss: str = "https://accounts.google.com") -> str:
+    now = int(time.time())
+    payload = {"iss": iss, "aud": audience, "iat": now, "exp": now + 600, "email": "tasks@example.com"}
+    return jwt.encode(signer, payload).decode()
+
+
+async def test_verifier_caches_certs_and_claims() -> None:
+    signer, certs = _signing_material("kid-1")
+    local = LocalCerts(certs)
+    http = httpx.AsyncClient(transport=httpx.MockTransport(local.handler))
+    verifier = OidcVerifier(audience="https://agent", http=http)
+    decodes = 0
+    original = verifier._decode
+
+    def counting_decode(token, certs):
+        nonlocal decodes
+        decodes += 1
+        return original(token, certs)
+
+    verifier._decode = counting_decode
+    await verifier.start()
+    assert verifier._jwt is not None  # loaded during startup, not by the first task
+    try:
+        token = _token(signer, "https://agent")
+        first = await verifier.verify(token)
+        second = await verifier.verify(token)
+        assert first["email"] == second["email"] == "tasks@example.com"
+        assert decodes == 1
+        assert local.hits == 1
+
+        with pytest.raises(ValueError):
+            await verifier.verify(_token(signer, "https://other"))
+        with pytest.raises(ValueError):
+            await verifier.verify(_token(signer, "https://agent", iss="https://evil.example"))
+    finally:
+        await verifier.close()
+        await http.aclose()
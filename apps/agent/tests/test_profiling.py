@@ -0,0 +1,55 @@
+﻿import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.agents.root_agent import KimeboardRootAgent
+from src.models.schemas import TaskDraftActionsRequest
+from src.observability.logger import get_logger
+from src.observability.profiling import RunProfiler
+from src.server import _profile_requested
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+class BusyDraftActions:
+    async def run(self, task, run):
+        await asyncio.sleep(0)
+        sum(i * i for i in range(10_000))
+        return {"ok": True, "runId": run.run_id}
+
+
+def _agent(profiler: RunProfiler) -> KimeboardRootAgent:
+    return KimeboardRootAgent(
+        meeting_structurer=None,
+        reply_integrator=None,
+        draft_actions=BusyDraftActions(),
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=5),
+        logger=get_logger("test"),
+        profiler=profiler,
+    )
+
+
+async def test_profile_is_written_per_run_and_rate_limited(tmp_path) -> None:
+    agent = _agent(RunProfiler(str(tmp_path), max_per_minute=1, logger=get_logger("test")))
+
+    first = await agent.run_draft_actions(TaskDraftActionsRequest(projectId="p1", decisionId="d1"), profile=True)
+    second = await agent.run_draft_actions(TaskDraftActionsRequest(projectId="p1", decisionId="d2"), profile=True)
+    plain = await agent.run_draft_actions(TaskDraftActionsRequest(projectId="p1", decisionId="d3"))
+
+    assert (tmp_path / f"{first['runId']}.pstats").exists()
+    assert "cumulative" in (tmp_path / f"{first['runId']}.txt").read_text(encoding="utf-8")
+    assert not (tmp_path / f"{second['runId']}.pstats").exists()
+    assert not (tmp_path / f"{plain['runId']}.pstats").exists()
+
+
+def test_profile_header_is_ignored_while_profiling_is_disabled() -> None:
+    def _check(token: str | None, header: str | None) -> bool:
+        request = SimpleNamespace(headers={"x-profile-token": header} if header is not None else {})
+        return _profile_requested(request, SimpleNamespace(settings=SimpleNamespace(profiling_token=token)))
+
+    assert _check(None, "anything") is False
+    assert _check("secret", None) is False
+    assert _check("secret", "secret") is True
+    with pytest.raises(HTTPException):
+        _check("secret", "wrong")
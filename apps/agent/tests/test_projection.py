@@ -0,0 +1,44 @@
+﻿import httpx
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.models.schemas import DecisionForDraftsWithActionsResponse, DecisionIdView, GetDecisionResponse, projection
+
+
+def test_projection_expands_nested_partial_models() -> None:
+    assert projection(DecisionForDraftsWithActionsResponse) == [
+        "decision.decisionId",
+        "decision.dueAt",
+        "decision.options",
+        "decision.completeness",
+        "actions",
+    ]
+
+
+async def test_views_request_only_their_fields() -> None:
+    api = create_mock_api(MockConfig(latency_ms=0, jitter_ms=0))
+    sent: list[httpx.Request] = []
+    inner = httpx.ASGITransport(app=api)
+
+    class Spy(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            sent.append(request)
+            return await inner.handle_async_request(request)
+
+    client = ApiClient(base_url="http://mock", callback_token="", transport=Spy())
+    try:
+        full = await client.get_decision("prj_1", "dcs_1")
+        partial = await client.get_decision("prj_1", "dcs_1", DecisionForDraftsWithActionsResponse)
+        refs = await client.collect_decisions("prj_1", ["NEEDS_INFO"], 3, DecisionIdView)
+    finally:
+        await client.close()
+
+    assert isinstance(full, GetDecisionResponse) and full.decision.title
+    assert partial.decision.completeness == full.decision.completeness
+    assert not hasattr(partial.decision, "title")
+    assert "fields" not in sent[0].url.params
+    assert sent[1].url.params["fields"] == ",".join(projection(DecisionForDraftsWithActionsResponse))
+    assert len(refs) == 3 and all(isinstance(d, DecisionIdView) for d in refs)
+    assert sent[2].url.path == ep.PATH_LIST_DECISIONS.format(project_id="prj_1")
+    assert sent[2].url.params["fields"] == "decisions.decisionId,decisions.status,cursor"
@@ -0,0 +1,93 @@
+﻿import httpx
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from src.agents.root_agent import KimeboardRootAgent
+from src.agents.workflows.reply_integrator import ReplyIntegratorWorkflow, _batch_key
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.config import Settings
+from src.models.schemas import Message, TaskReplyIntegratorBatchRequest, TaskReplyIntegratorRequest
+from src.observability.logger import get_logger
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+def _message(message_id: str, answers: list[dict]) -> Message:
+    return Message.model_validate(
+        {
+            "messageId": message_id,
+            "threadId": "thr_1",
+            "senderType": "USER",
+            "format": "ANSWER_SET",
+            "content": "",
+            "metadata": {"answers": answers},
+        }
+    )
+
+
+def test_consolidated_patch_applies_answers_in_order() -> None:
+    workflow = ReplyIntegratorWorkflow(None, Settings(), get_logger("test"))
+    patch = workflow._build_consolidated_patch(
+        None,
+        [
+            _message("m1", [{"qid": "owner:1", "value": "佐藤"}, {"qid": "criteria:1", "value": ["コスト"]}]),
+            _message("m2", [{"qid": "owner:1", "value": "高橋"}, {"qid": "criteria:1", "value": ["納期", "コスト"]}]),
+            _message("m3", [{"qid": "options:1", "value": ["A案", "B案", "A案"]}]),
+        ],
+    )
+
+    # the last message to set a field wins, as the API would leave it after three single runs
+    assert patch.ownerDisplayName == "高橋"
+    assert patch.criteria == ["納期", "コスト"]
+    assert [opt.label for opt in patch.options] == ["A案", "B案"]
+
+
+def test_single_message_options_pass_through_as_sent() -> None:
+    workflow = ReplyIntegratorWorkflow(None, Settings(), get_logger("test"))
+    patch = workflow._build_patch(None, _message("m1", [{"qid": "options:1", "value": ["A案", "A案"]}]))
+
+    assert [opt.label for opt in patch.options] == ["A案", "A案"]
+
+
+def test_narrowed_batch_callback_key_covers_only_claimed_messages() -> None:
+    batch = TaskReplyIntegratorBatchRequest(
+        projectId="prj_1", decisionId="dcs_1", threadId="thr_1", messageIds=["msg_1", "msg_2"], idempotencyKey="k1"
+    )
+
+    assert _batch_key(batch, ["msg_1", "msg_2"]) == "k1"
+    assert _batch_key(batch, ["msg_2"]) == "thr_1:msg_2"
+
+
+async def test_batch_fetches_decision_once_and_claims_per_message() -> None:
+    api = create_mock_api(MockConfig(latency_ms=0, jitter_ms=0))
+    client = ApiClient(base_url="http://mock", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+    logger = get_logger("test")
+    agent = KimeboardRootAgent(
+        meeting_structurer=None,
+        reply_integrator=ReplyIntegratorWorkflow(KimeboardApiToolset(client), Settings(), logger),
+        draft_actions=None,
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=5),
+        logger=logger,
+    )
+    batch = TaskReplyIntegratorBatchRequest(
+        projectId="prj_1", decisionId="dcs_1", threadId="thr_1", messageIds=["msg_1", "msg_2", "msg_3"]
+    )
+    try:
+        first = await agent.run_reply_integrator_batch(batch)
+        calls = dict(api.state.stats.calls)
+        overlap = await agent.run_reply_integrator_batch(batch.model_copy(update={"messageIds": ["msg_3", "msg_4"]}))
+        single = await agent.run_reply_integrator(
+            TaskReplyIntegratorRequest(
+                projectId="prj_1", decisionId="dcs_1", threadId="thr_1", messageId="msg_2", idempotencyKey="redelivery"
+            )
+        )
+    finally:
+        await client.close()
+
+    assert calls == {ep.PATH_GET_DECISION: 1, ep.PATH_GET_MESSAGE: 3, ep.PATH_CALLBACK: 1}
+    assert first["messageIds"] == ["msg_1", "msg_2", "msg_3"]
+    assert overlap["messageIds"] == ["msg_4"]
+    assert overlap["skippedMessageIds"] == ["msg_3"]
+    assert single["skipped"] is True
+    assert single["runId"] == first["runId"]
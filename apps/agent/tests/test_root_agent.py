@@ -0,0 +1,66 @@
+﻿import asyncio
+
+import pytest
+
+from src.agents.root_agent import KimeboardRootAgent
+from src.models.schemas import TaskDraftActionsRequest
+from src.observability.logger import get_logger
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+class SlowDraftActions:
+    def __init__(self, fail_first: bool = False) -> None:
+        self.calls = 0
+        self.fail_first = fail_first
+
+    async def run(self, task, run):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("boom")
+        return {"ok": True, "runId": run.run_id, "actions": 2}
+
+
+def _agent(workflow, lease_seconds: float = 600.0) -> KimeboardRootAgent:
+    return KimeboardRootAgent(
+        meeting_structurer=None,
+        reply_integrator=None,
+        draft_actions=workflow,
+        idempotency_store=InMemoryIdempotencyStore(ttl_minutes=5),
+        logger=get_logger("test"),
+        lease_seconds=lease_seconds,
+    )
+
+
+async def test_concurrent_duplicates_share_one_run_and_replay_result() -> None:
+    workflow = SlowDraftActions()
+    agent = _agent(workflow)
+    task = TaskDraftActionsRequest(projectId="p1", decisionId="d1")
+
+    first, second = await asyncio.gather(agent.run_draft_actions(task), agent.run_draft_actions(task))
+    later = await agent.run_draft_actions(task)
+
+    assert workflow.calls == 1
+    assert first["runId"] == second["runId"] == later["runId"]
+    assert later["skipped"] is True
+    assert later["actions"] == 2
+
+
+async def test_failed_run_releases_claim_for_retry() -> None:
+    workflow = SlowDraftActions(fail_first=True)
+    agent = _agent(workflow)
+    task = TaskDraftActionsRequest(projectId="p1", decisionId="d1")
+
+    with pytest.raises(RuntimeError):
+        await agent.run_draft_actions(task)
+    out = await agent.run_draft_actions(task)
+
+    assert workflow.calls == 2
+    assert "skipped" not in out
+
+
+async def test_expired_lease_can_be_reclaimed() -> None:
+    store = InMemoryIdempotencyStore(ttl_minutes=5)
+    assert (await store.claim("k", lease_seconds=0)).status == "claimed"
+    assert (await store.claim("k", lease_seconds=60)).status == "claimed"
+    assert (await store.claim("k", lease_seconds=60)).status == "in_flight"
@@ -0,0 +1,138 @@
+﻿import asyncio
+import json
+
+import httpx
+import pytest
+
+from benchmarks.mock_api import MockConfig, create_mock_api
+from src.agents.root_agent import KimeboardRootAgent
+from src.agents.run_queue import QueueFullError, RunQueue
+from src.agents.scheduler import FairScheduler
+from src.agents.workflows.meeting_structurer import MeetingStructurerWorkflow
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.config import Settings
+from src.models.schemas import TaskMeetingStructurerRequest
+from src.observability.logger import get_logger
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+async def test_run_queue_reports_status_and_timings() -> None:
+    queue = RunQueue(workers=1, max_queue=4, logger=get_logger("test"))
+    queue.start()
+
+    async def _ok():
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    record = queue.submit("run_1", "draft_actions_skill", _ok)
+    assert queue.get("run_1").status == "QUEUED"
+    await queue.drain(timeout=1.0)
+
+    out = record.to_dict()
+    assert out["status"] == "SUCCEEDED"
+    assert out["result"] == {"ok": True}
+    assert set(out["timings"]) == {"queueMs", "runMs"}
+
+
+async def test_run_queue_sheds_when_full_and_abandons_on_drain() -> None:
+    queue = RunQueue(workers=1, max_queue=1, logger=get_logger("test"))
+    queue.start()
+    gate = asyncio.Event()
+    released: list[str] = []
+
+    async def _blocked():
+        await gate.wait()
+        return {}
+
+    queue.submit("run_1", "w", _blocked)
+    await asyncio.sleep(0)
+    async def _release() -> None:
+        released.append("run_2")
+
+    queue.submit("run_2", "w", _blocked, on_abandon=_release)
+    with pytest.raises(QueueFullError):
+        queue.submit("run_3", "w", _blocked)
+
+    await queue.drain(timeout=0.01)
+
+    assert queue.get("run_2").status == "ABANDONED"
+    assert released == ["run_2"]
+    assert queue.get("run_1").status == "CANCELLED"
+
+
+class _CapturingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self.inner = inner
+        self.callbacks: list[dict] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == ep.PATH_CALLBACK:
+            self.callbacks.append(json.loads(request.content))
+        return await self.inner.handle_async_request(request)
+
+
+async def test_drain_reports_abandoned_runs_to_the_api() -> None:
+    # every upstream call takes 200ms, so the single worker is still on the first run at drain time
+    transport = _CapturingTransport(httpx.ASGITransport(app=create_mock_api(MockConfig(latency_ms=200, jitter_ms=0))))
+    client = ApiClient(base_url="http://mock", callback_token="", transport=transport)
+    logger = get_logger("test")
+    store = InMemoryIdempotencyStore(ttl_minutes=5)
+    queue = RunQueue(workers=1, max_queue=4, logger=logger)
+    agent = KimeboardRootAgent(
+        meeting_structurer=MeetingStructurerWorkflow(KimeboardApiToolset(client), Settings(), logger),
+        reply_integrator=None,
+        draft_actions=None,
+        idempotency_store=store,
+        logger=logger,
+        run_queue=queue,
+    )
+    queue.start()
+    try:
+        accepted = [
+            await agent.submit_meeting_structurer(TaskMeetingStructurerRequest(projectId="prj_1", meetingId=f"mtg_{i}"))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        await queue.drain(timeout=0.01)
+    finally:
+        await client.close()
+
+    assert [queue.get(out["runId"]).status for out in accepted] == ["CANCELLED", "ABANDONED", "ABANDONED"]
+    failed = {cb["runId"]: cb for cb in transport.callbacks if cb["status"] == "FAILED"}
+    assert set(failed) == {out["runId"] for out in accepted}
+    assert all(failed[out["runId"]]["error"].startswith("abandoned") for out in accepted[1:])
+    for i in range(3):
+        assert (await store.claim(f"meeting_structurer:mtg_{i}", 60)).status == "claimed"
+
+
+async def test_scheduler_picks_the_next_queued_run() -> None:
+    scheduler = FairScheduler(slots=2, project_limit=1)
+    queue = RunQueue(workers=8, max_queue=16, logger=get_logger("test"), scheduler=scheduler)
+    queue.start()
+    gate = asyncio.Event()
+    order: list[str] = []
+
+    def _work(name: str):
+        async def _run():
+            order.append(name)
+            await gate.wait()
+            return {}
+
+        return _run
+
+    # a capped project's backlog queued first must not hold up other projects
+    for i in range(4):
+        queue.submit(f"bulk_{i}", "meeting_structurer", _work(f"bulk_{i}"), project_id="bulk")
+    queue.submit("reply", "reply_integrator", _work("reply"), project_id="other")
+    await asyncio.sleep(0.01)
+
+    assert order == ["bulk_0", "reply"]
+    assert queue.depth == 3
+    assert queue.get("reply").status == "RUNNING"
+
+    gate.set()
+    await queue.drain(timeout=1.0)
+    assert order[2:] == ["bulk_1", "bulk_2", "bulk_3"]
+    assert scheduler.stats()["active"] == 0
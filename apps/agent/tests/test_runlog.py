@@ -0,0 +1,52 @@
+﻿import json
+
+import httpx
+
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.api_client import endpoints as ep
+from src.api_client.client import ApiClient
+from src.config import Settings
+from src.models.schemas import TaskDraftActionsRequest
+from src.observability.logger import get_logger
+from src.observability.runlog import RunContext
+from src.tools.kimeboard_api_tools import KimeboardApiToolset
+
+
+async def test_steps_cover_api_calls_and_reach_callback_meta() -> None:
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if request.method == "GET":
+            return httpx.Response(200, json={
+                "decision": {
+                    "decisionId": "d1",
+                    "projectId": "p1",
+                    "title": "Vendor",
+                    "status": "NEEDS_INFO",
+                    "completeness": {"score": 40, "missingFields": ["owner"]},
+                },
+            })
+        return httpx.Response(200, json={"ok": True})
+
+    client = ApiClient(base_url="http://api", callback_token="")
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    workflow = DraftActionsSkillWorkflow(KimeboardApiToolset(client), Settings(), get_logger("test"))
+    run = RunContext(run_id="run_test", workflow="draft_actions_skill", project_id="p1")
+    try:
+        with run.bind():
+            await workflow.run(TaskDraftActionsRequest(projectId="p1", decisionId="d1"), run)
+    finally:
+        await client.close()
+
+    assert all(r.headers["traceparent"].startswith(f"00-{run.trace_id}-") for r in seen)
+    by_name = {step["name"]: step for step in run.steps}
+    assert by_name[f"GET {ep.PATH_GET_DECISION}"]["parent"] == "fetch_decision"
+    assert {"fetch_decision", "build_drafts", "post_callback"} <= set(by_name)
+
+    callback = json.loads(seen[-1].content)
+    assert callback["meta"]["traceId"] == run.trace_id
+    assert [step["name"] for step in callback["meta"]["steps"]][:2] == [
+        f"GET {ep.PATH_GET_DECISION}",
+        "fetch_decision",
+    ]
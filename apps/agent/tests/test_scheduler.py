@@ -0,0 +1,48 @@
+﻿import asyncio
+
+from src.agents.scheduler import FairScheduler
+
+
+async def _run(scheduler: FairScheduler, project: str, workflow: str, order: list[str], gate: asyncio.Event) -> None:
+    async with scheduler.slot(project, workflow):
+        order.append(f"{project}:{workflow}")
+        await gate.wait()
+
+
+async def test_interactive_runs_overtake_a_bulk_backlog() -> None:
+    scheduler = FairScheduler(slots=1, project_limit=1)
+    order: list[str] = []
+    gates = [asyncio.Event() for _ in range(7)]
+
+    tasks = [asyncio.create_task(_run(scheduler, "bulk", "meeting_structurer", order, gates[i])) for i in range(5)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(_run(scheduler, "other", "reply_integrator", order, gates[5 + i])) for i in range(2)]
+    await asyncio.sleep(0)
+
+    for gate in gates:
+        gate.set()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+    # both replies run before the bulk project's backlog drains
+    assert order.index("other:reply_integrator") < 3
+    assert order.count("other:reply_integrator") == 2
+    assert order.count("bulk:meeting_structurer") == 5
+
+
+async def test_project_cap_leaves_slots_for_other_projects() -> None:
+    scheduler = FairScheduler(slots=4, project_limit=1, project_limits={"vip": 2})
+    gate = asyncio.Event()
+    order: list[str] = []
+    tasks = [asyncio.create_task(_run(scheduler, "a", "meeting_structurer", order, gate)) for _ in range(3)]
+    tasks += [asyncio.create_task(_run(scheduler, "vip", "meeting_structurer", order, gate)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    stats = scheduler.stats()
+    assert stats["activeByProject"] == {"a": 1, "vip": 2}
+    assert stats["waiting"] == {"a:batch": 2, "vip:batch": 1}
+
+    tasks[0].cancel()
+    gate.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert scheduler.stats()["active"] == 0
@@ -0,0 +1,44 @@
+﻿import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+STARTUP_BUDGET_SECONDS = 3.0
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.main
+from fastapi.testclient import TestClient
+with TestClient(src.main.app) as client:
+    client.get("/healthz")
+print(json.dumps({
+    "elapsed": time.perf_counter() - started,
+    "google_auth_loaded": "google.oauth2" in sys.modules,
+    "tenacity_loaded": "tenacity" in sys.modules,
+}))
+"""
+
+
+def test_import_and_startup_within_budget() -> None:
+    env = {
+        **os.environ,
+        "TASK_AUTH_MODE": "NONE",
+        "API_BASE_URL": "http://127.0.0.1:9",
+        "LOG_LEVEL": "WARNING",
+    }
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert out["google_auth_loaded"] is False
+    # the warm-up loads the API client's retry machinery, so the first task does not
+    assert out["tenacity_loaded"] is True
+    assert out["elapsed"] < STARTUP_BUDGET_SECONDS
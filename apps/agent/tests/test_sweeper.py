@@ -0,0 +1,105 @@
+﻿from src.agents.sweeper import DecisionSweeper
+from src.agents.workflows.draft_actions_skill import DraftActionsSkillWorkflow
+from src.config import Settings
+from src.models.schemas import DecisionSummary, GetDecisionResponse, ListProjectsResponse
+from src.observability.logger import get_logger
+from src.utils.idempotency import InMemoryIdempotencyStore
+
+
+class FakeTools:
+    def __init__(self) -> None:
+        self.decisions = {
+            "d1": {"decisionId": "d1", "projectId": "p1", "title": "A", "status": "NEEDS_INFO", "updatedAt": "v1"},
+            "d2": {"decisionId": "d2", "projectId": "p1", "title": "B", "status": "REOPEN", "updatedAt": "v1"},
+        }
+        self.project_marker = "m1"
+        self.fetched: list[str] = []
+        self.posted: list[str] = []
+        self.bulk: list[str] = []
+        self.pages = 0
+
+    async def list_projects(self):
+        return ListProjectsResponse.model_validate({
+            "projects": [{"projectId": "p1", "lastDecisionUpdatedAt": self.project_marker}]
+        })
+
+    async def iter_decisions(self, project_id: str, statuses=None, page_size: int = 20, view=None):
+        # one decision per page: everything past the first page must still be swept
+        for decision in self.decisions.values():
+            if decision["status"] in statuses:
+                self.pages += 1
+                yield DecisionSummary.model_validate(decision)
+
+    async def get_decision(self, project_id: str, decision_id: str):
+        self.fetched.append(decision_id)
+        return GetDecisionResponse.model_validate({"decision": self.decisions[decision_id], "threadId": "t1"})
+
+    async def post_question_set(self, thread_id: str, payload: dict):
+        self.posted.append(payload["relatesTo"]["decisionId"])
+        return {"messageId": "m"}
+
+    async def create_actions_bulk(self, project_id: str, decision_id: str, actions: list[dict]):
+        self.bulk.append(decision_id)
+        return {"created": len(actions)}
+
+
+async def test_sweep_processes_only_changed_decisions(tmp_path) -> None:
+    settings = Settings(SWEEP_STATE_PATH=str(tmp_path / "sweep.json"))
+    tools = FakeTools()
+    logger = get_logger("test")
+    sweeper = DecisionSweeper(tools, DraftActionsSkillWorkflow(tools, settings, logger), settings, logger)
+
+    first = await sweeper.sweep_once()
+    assert first["processed"] == 2
+    assert tools.posted == ["d1"]
+    assert tools.bulk == ["d2"]
+
+    # unchanged project watermark: no listing, no fetches
+    await sweeper.sweep_once()
+    assert tools.fetched == ["d1", "d2"]
+
+    tools.project_marker = "m2"
+    tools.decisions["d1"]["updatedAt"] = "v2"
+    restarted = DecisionSweeper(tools, sweeper.draft_actions, settings, logger)
+    restarted.state.load()
+    third = await restarted.sweep_once()
+    assert third["changed"] == 1
+    assert tools.fetched == ["d1", "d2", "d1"]
+
+
+async def test_sweep_pages_through_every_decision(tmp_path) -> None:
+    settings = Settings(SWEEP_STATE_PATH=str(tmp_path / "sweep.json"))
+    tools = FakeTools()
+    for i in range(3, 6):
+        tools.decisions[f"d{i}"] = {"decisionId": f"d{i}", "projectId": "p1", "title": f"T{i}", "status": "NEEDS_INFO"}
+    logger = get_logger("test")
+    sweeper = DecisionSweeper(tools, DraftActionsSkillWorkflow(tools, settings, logger), settings, logger)
+
+    stats = await sweeper.sweep_once()
+
+    assert stats["processed"] == 5
+    assert sorted(tools.posted) == ["d1", "d3", "d4", "d5"]
+
+
+async def test_cold_instance_skips_what_another_instance_swept(tmp_path) -> None:
+    tools = FakeTools()
+    logger = get_logger("test")
+    shared = InMemoryIdempotencyStore(ttl_minutes=60)
+
+    def _sweeper(name: str) -> DecisionSweeper:
+        settings = Settings(SWEEP_STATE_PATH=str(tmp_path / f"{name}.json"))
+        return DecisionSweeper(tools, DraftActionsSkillWorkflow(tools, settings, logger), settings, logger, idempotency_store=shared)
+
+    await _sweeper("a").sweep_once()
+    pages = tools.pages
+
+    # a new instance with no watermark file: the shared marker skips the project outright
+    cold = await _sweeper("b").sweep_once()
+    assert (cold["projectsSkipped"], tools.pages) == (1, pages)
+
+    # the project moved on but the decisions did not: listed, not re-processed
+    tools.project_marker = "m2"
+    moved = await _sweeper("c").sweep_once()
+    assert (moved["changed"], moved["processed"], moved["sweptElsewhere"]) == (2, 0, 2)
+    assert tools.posted == ["d1"]
+    assert tools.bulk == ["d2"]
@@ -73,6 +73,13 @@ export const AgentMeetingStructurerCallback = AgentCallbackBase.extend({
         })
       )
       .default([]),
+    // incremental re-runs only send changed blocks; these list the rest of the meeting's decisions
+    unchangedDecisionIds: z.array(z.string().min(1)).optional(),
+    removedDecisionIds: z.array(z.string().min(1)).optional(),
+    // stored with the meeting as the diff base of the next run
+    blocks: z
+      .array(z.object({ fingerprint: z.string().min(1), decisionId: z.string().min(1), title: z.string() }))
+      .optional(),
   }),
 });
 
@@ -80,6 +87,8 @@ export const AgentReplyIntegratorCallback = AgentCallbackBase.extend({
   kind: z.literal("reply_integrator"),
   decisionId: z.string().min(1),
   threadId: z.string().min(1),
+  // set by reply_integrator_batch: the messages consolidated into this patch
+  messageIds: z.array(z.string().min(1)).optional(),
   appliedPatch: z
     .object({
       ownerDisplayName: z.string().optional(),
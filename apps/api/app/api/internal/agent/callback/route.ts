@@ -29,10 +29,15 @@ export async function POST(req: Request) {
 
     if (input.kind === "meeting_structurer") {
       const decisionIds = await upsertDecisionsFromAgent(input.projectId, input.meetingId, input.extracted.decisions);
+      const meetingDecisionIds = Array.from(new Set([...decisionIds, ...(input.extracted.unchangedDecisionIds ?? [])]));
 
       await patchMeeting(input.projectId, input.meetingId, {
         status: "DONE",
-        extracted: { decisionIds },
+        extracted: {
+          decisionIds: meetingDecisionIds,
+          // replaced as a whole; a run without blocks leaves an empty base, so nothing stale is diffed against
+          blocks: input.extracted.blocks ?? [],
+        },
         agent: { lastRunStatus: "SUCCEEDED", lastRunAt: new Date().toISOString() },
       });
 
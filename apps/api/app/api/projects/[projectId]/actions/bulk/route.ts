@@ -0,0 +1,18 @@
+import { BulkCreateProjectActionsRequest } from "@/shared";
+import { parseJson, validate } from "@/lib/zod";
+import { jsonError, jsonOk, toApiError } from "@/lib/http";
+import { bulkCreateProjectActions } from "@/repo/actions";
+
+export const runtime = "nodejs";
+
+export async function POST(req: Request, ctx: { params: Promise<{ projectId: string }> }) {
+  try {
+    const { projectId } = await ctx.params;
+    const body = await parseJson(req);
+    const input = validate(BulkCreateProjectActionsRequest, body);
+    const out = await bulkCreateProjectActions(projectId, input.items);
+    return jsonOk({ created: out.created, results: out.results });
+  } catch (e) {
+    return jsonError(toApiError(e));
+  }
+}
@@ -1,21 +1,27 @@
 import { PatchDecisionRequest, PatchDecisionResponse } from "@/shared";
 import { parseJson, validate } from "@/lib/zod";
 import { jsonError, jsonOk, toApiError } from "@/lib/http";
+import { parseFields, projectFields, wantsField } from "@/lib/fields";
 import { getDecision, patchDecision } from "@/repo/decisions";
 import { listActionsByDecision } from "@/repo/actions";
 import { refs } from "@/lib/firestore";
 
 export const runtime = "nodejs";
 
-export async function GET(_req: Request, ctx: { params: Promise<{ projectId: string; decisionId: string }> }) {
+export async function GET(req: Request, ctx: { params: Promise<{ projectId: string; decisionId: string }> }) {
   try {
     const { projectId, decisionId } = await ctx.params;
+    const fields = parseFields(new URL(req.url).searchParams.get("fields"));
     const d = await getDecision(projectId, decisionId);
     if (!d) return jsonError({ code: "NOT_FOUND", message: "Decision not found", status: 404 });
-    const actions = await listActionsByDecision(projectId, decisionId);
-    const threadSnap = await refs.threads(projectId, decisionId).limit(1).get();
-    const threadId = threadSnap.empty ? undefined : (threadSnap.docs[0].data() as any).threadId;
-    return jsonOk({ decision: d, actions, threadId });
+    // skip the lookups a projection leaves out
+    const actions = wantsField(fields, "actions") ? await listActionsByDecision(projectId, decisionId) : undefined;
+    let threadId: string | undefined;
+    if (wantsField(fields, "threadId")) {
+      const threadSnap = await refs.threads(projectId, decisionId).limit(1).get();
+      threadId = threadSnap.empty ? undefined : (threadSnap.docs[0].data() as any).threadId;
+    }
+    return jsonOk(projectFields({ decision: d, actions, threadId }, fields));
   } catch (e) {
     return jsonError(toApiError(e));
   }
@@ -1,6 +1,7 @@
 import { jsonError, jsonOk, toApiError } from "@/lib/http";
 import { createDecision, listDecisionsByProject } from "@/repo/decisions";
 import { parseJson, validate } from "@/lib/zod";
+import { parseFields, projectFields } from "@/lib/fields";
 import { z } from "zod";
 
 export const runtime = "nodejs";
@@ -14,14 +15,22 @@ export async function GET(req: Request, ctx: { params: Promise<{ projectId: stri
     const dueBefore = url.searchParams.get("dueBefore") ?? undefined;
     const limitStr = url.searchParams.get("limit") ?? undefined;
     const limit = limitStr ? Math.min(100, Math.max(1, Number(limitStr))) : 20;
+    // opaque to callers: the offset of the next page in updatedAt order
+    const offset = Math.max(0, Number(url.searchParams.get("cursor") ?? 0) || 0);
+    const fields = parseFields(url.searchParams.get("fields"));
 
+    // one extra row tells whether another page follows
     const decisions = await listDecisionsByProject(projectId, {
       status: status ?? undefined,
       owner,
       dueBefore,
-      limit,
+      limit: limit + 1,
+      offset,
     });
-    return jsonOk({ decisions });
+    if (decisions.length > limit) {
+      return jsonOk(projectFields({ decisions: decisions.slice(0, limit), cursor: String(offset + limit) }, fields));
+    }
+    return jsonOk(projectFields({ decisions }, fields));
   } catch (e) {
     return jsonError(toApiError(e));
   }
@@ -0,0 +1,34 @@
+// `?fields=decision.dueAt,actions` projection: keep only the dotted paths asked for.
+// Lists apply the rest of the path to each item, so `decisions.status` works on a page.
+type FieldTree = { [key: string]: FieldTree };
+
+export const parseFields = (fields: string | null | undefined): FieldTree | null => {
+  if (!fields) return null;
+  const tree: FieldTree = {};
+  for (const path of fields.split(",")) {
+    let node = tree;
+    for (const part of path.trim().split(".")) {
+      if (!part) continue;
+      node = node[part] ??= {};
+    }
+  }
+  return Object.keys(tree).length ? tree : null;
+};
+
+const pick = (value: unknown, tree: FieldTree): unknown => {
+  if (!Object.keys(tree).length) return value;
+  if (Array.isArray(value)) return value.map((item) => pick(item, tree));
+  if (value && typeof value === "object") {
+    const out: Record<string, unknown> = {};
+    for (const [key, sub] of Object.entries(tree)) {
+      if (key in value) out[key] = pick((value as Record<string, unknown>)[key], sub);
+    }
+    return out;
+  }
+  return value;
+};
+
+export const projectFields = <T extends Record<string, unknown>>(payload: T, tree: FieldTree | null) =>
+  tree ? (pick(payload, tree) as Partial<T>) : payload;
+
+export const wantsField = (tree: FieldTree | null, key: string) => !tree || key in tree;
@@ -39,6 +39,26 @@ export const bulkCreateActions = async (projectId: string, decisionId: string, a
   return { created: actionIds.length, actionIds };
 };
 
+export const bulkCreateProjectActions = async (
+  projectId: string,
+  items: Array<{ decisionId: string; actions: Array<any> }>
+) => {
+  // one batch and one counter recompute for every decision in the request
+  const batch = db.batch();
+  const results = items.map(({ decisionId, actions }) => {
+    const actionIds: string[] = [];
+    for (const a of actions) {
+      const doc = makeAction(projectId, decisionId, a);
+      batch.set(refs.action(projectId, decisionId, doc.actionId), doc);
+      actionIds.push(doc.actionId);
+    }
+    return { decisionId, created: actionIds.length, actionIds };
+  });
+  await batch.commit();
+  await recomputeProjectCounters(projectId);
+  return { created: results.reduce((n, r) => n + r.created, 0), results };
+};
+
 export const listActionsByDecision = async (projectId: string, decisionId: string) => {
   const snap = await refs.actions(projectId, decisionId).orderBy("createdAt", "asc").get();
   return snap.docs.map((d) => Action.parse(d.data()));
@@ -58,7 +58,7 @@ export const getDecision = async (projectId: string, decisionId: string) => {
 
 export const listDecisionsByProject = async (
   projectId: string,
-  opts: { status?: string; owner?: string; dueBefore?: string; limit?: number } = {}
+  opts: { status?: string; owner?: string; dueBefore?: string; limit?: number; offset?: number } = {}
 ) => {
   const snap = await refs.decisions(projectId).get();
   let decisions = snap.docs.map((d) => Decision.parse(d.data()));
@@ -75,7 +75,8 @@ export const listDecisionsByProject = async (
   }
 
   decisions.sort((a, b) => Date.parse(b.updatedAt ?? "") - Date.parse(a.updatedAt ?? ""));
-  return decisions.slice(0, opts.limit ?? 20);
+  const offset = opts.offset ?? 0;
+  return decisions.slice(offset, offset + (opts.limit ?? 20));
 };
 
 export const patchDecision = async (projectId: string, decisionId: string, patch: Record<string, any>) => {
@@ -8,4 +8,8 @@ export const LIMITS = {
   chat: {
     maxQuestionsPerSet: 3,
   },
+  action: {
+    // one Firestore batch holds at most 500 writes
+    maxBulkActions: 500,
+  },
 } as const;
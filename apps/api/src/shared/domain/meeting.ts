@@ -26,6 +26,10 @@ export const MeetingExtracted = z
   .object({
     decisionIds: z.array(z.string()).optional(),
     mergeCandidates: z.array(z.any()).optional(),
+    // memo block fingerprints of the last agent run, the agent's base for incremental re-runs
+    blocks: z
+      .array(z.object({ fingerprint: z.string(), decisionId: z.string(), title: z.string() }))
+      .optional(),
   })
   .partial();
 
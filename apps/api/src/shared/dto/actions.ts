@@ -1,6 +1,7 @@
 import { z } from "zod";
 import { Action, ActionAssignee } from "../domain/action";
 import { ActionType } from "../constants/status";
+import { LIMITS } from "../constants/limits";
 
 export const CreateActionRequest = z.object({
   type: ActionType,
@@ -23,3 +24,20 @@ export const BulkCreateActionsResponse = z.object({
   created: z.number().int().nonnegative(),
   actions: z.array(Action).optional(),
 });
+
+// several decisions of one project in one write
+export const BulkCreateProjectActionsRequest = z
+  .object({
+    items: z
+      .array(
+        z.object({
+          decisionId: z.string().min(1),
+          actions: z.array(CreateActionRequest).min(1),
+        })
+      )
+      .min(1),
+  })
+  .refine((body) => body.items.reduce((n, item) => n + item.actions.length, 0) <= LIMITS.action.maxBulkActions, {
+    message: `at most ${LIMITS.action.maxBulkActions} actions per request`,
+  });
+export type BulkCreateProjectActionsRequest = z.infer<typeof BulkCreateProjectActionsRequest>;